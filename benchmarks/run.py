@@ -0,0 +1,242 @@
+"""Banc d'essai hors ligne du pipeline (serveurs locaux, aucun accès réseau).
+
+Chaque étape de `run_pipeline` est mesurée séparément (durée, produits et
+requêtes par seconde, pic mémoire Python via tracemalloc), puis le
+pipeline complet. Les résultats sont écrits en JSON et comparés à une
+référence :
+
+    python -m benchmarks.run --products 5000 --latency 0.02
+    python -m benchmarks.run --save-baseline   # nouvelle référence
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from .servers import StubConfig, StubServer, OpenFoodFactsHandler, AdresseHandler
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+# Métriques comparées à la référence (plus petit = meilleur)
+COMPARED_METRICS = ["seconds", "peak_memory_mb"]
+
+
+class StageRecorder:
+    """Mesure des étapes successives du pipeline."""
+
+    def __init__(self, servers: list[StubServer], memory: bool = True):
+        self.servers = servers
+        self.memory = memory
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Mesure le bloc ; le bloc renseigne `record["items"]`."""
+        record = {}
+        requests_before = sum(server.requests for server in self.servers)
+        if self.memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+
+        # Les messages du pipeline (print, tqdm, logs) ne polluent pas le rapport
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield record
+
+        seconds = time.perf_counter() - start
+        requests = sum(server.requests for server in self.servers) - requests_before
+        items = record.get("items", 0)
+        record.update({
+            "seconds": round(seconds, 4),
+            "items": items,
+            "items_per_second": round(items / seconds, 1) if seconds > 0 else None,
+            "requests": requests,
+            "requests_per_second": round(requests / seconds, 1) if seconds > 0 else None,
+        })
+        if self.memory:
+            record["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        self.stages[name] = record
+        print(f"   {name:<13} {seconds:8.3f}s  {items:>7} éléments  {requests:>5} requêtes")
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR.parent, capture_output=True, text=True, check=True,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    """Exécute toutes les étapes contre les serveurs locaux."""
+    # Les données du run vont dans un répertoire temporaire : le chemin doit
+    # être fixé avant l'import de `pipeline.config`.
+    os.environ["PIPELINE_DATA_DIR"] = tempfile.mkdtemp(prefix="pipeline-bench-")
+
+    import pandas as pd
+    from pipeline import config
+    from pipeline.enricher import DataEnricher
+    from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
+    from pipeline.main import run_pipeline, transform
+    from pipeline.quality import QualityAnalyzer
+    from pipeline.storage import save_parquet
+    from pipeline.validation import ProductValidator
+
+    stub_config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        payload_bytes=args.payload_bytes,
+        total_products=args.products,
+        stores=args.stores,
+    )
+    category = args.category
+
+    with (
+        StubServer(OpenFoodFactsHandler, stub_config) as off,
+        StubServer(AdresseHandler, stub_config) as adresse,
+    ):
+        config.OPENFOODFACTS_CONFIG.base_url = f"{off.url}/api/v2"
+        config.ADRESSE_CONFIG.base_url = adresse.url
+        config.HTTP_CACHE_MODE = "off"
+        if not args.respect_rate_limits:
+            # On mesure le code, pas le débit autorisé par les API réelles
+            config.OPENFOODFACTS_CONFIG.rate_limit = 0
+            config.ADRESSE_CONFIG.rate_limit = 0
+
+        if not args.no_memory:
+            tracemalloc.start()
+        recorder = StageRecorder([off, adresse], memory=not args.no_memory)
+        print(f"⏱️ Benchmark : {args.products} produits, latence {args.latency * 1000:.0f} ms, "
+              f"erreurs {args.error_rate:.0%}")
+
+        with recorder.stage("fetch") as record:
+            with OpenFoodFactsFetcher() as fetcher:
+                products = list(fetcher.fetch_all(category, args.products, verbose=False))
+            record["items"] = len(products)
+
+        with recorder.stage("validate") as record:
+            df = ProductValidator().validate(pd.DataFrame(products))
+            del products
+            record["items"] = len(df)
+
+        with recorder.stage("enrich") as record:
+            with DataEnricher(use_cache=False) as enricher:
+                addresses = enricher.extract_addresses(df, "stores")
+                geo_cache = enricher.build_geocoding_cache(addresses)
+                df = enricher.enrich_dataframe(df, geo_cache, {})
+            record["items"] = len(addresses)
+
+        with recorder.stage("transform") as record:
+            df_clean, _ = transform(df, copy=False)
+            record["items"] = len(df_clean)
+
+        with recorder.stage("quality") as record:
+            QualityAnalyzer(df_clean).analyze()
+            record["items"] = len(df_clean)
+
+        with recorder.stage("storage") as record:
+            save_parquet(df_clean, category)
+            record["items"] = len(df_clean)
+
+        with recorder.stage("run_pipeline") as record:
+            stats = run_pipeline(category, args.products, verbose=False)
+            record["items"] = stats.get("quality", {}).get("total_records", 0)
+
+        if not args.no_memory:
+            tracemalloc.stop()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "products": args.products,
+            "stores": args.stores,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "payload_bytes": args.payload_bytes,
+            "respect_rate_limits": args.respect_rate_limits,
+            "memory": not args.no_memory,
+        },
+        "stages": recorder.stages,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare aux résultats de référence ; retourne les régressions."""
+    if results["params"] != baseline.get("params"):
+        print("⚠️ Paramètres différents de la référence : comparaison indicative")
+
+    regressions = []
+    print(f"\n📈 Comparaison avec la référence ({baseline.get('commit')})")
+    for name, stage in results["stages"].items():
+        reference = baseline.get("stages", {}).get(name)
+        if not reference:
+            continue
+        for metric in COMPARED_METRICS:
+            current, previous = stage.get(metric), reference.get(metric)
+            if not current or not previous:
+                continue
+            ratio = current / previous
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  ❌ régression"
+                regressions.append(f"{name}.{metric}: {previous} → {current}")
+            print(f"   {name:<13} {metric:<15} {previous:>10} → {current:>10}  (x{ratio:.2f}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du pipeline")
+    parser.add_argument("--products", type=int, default=2000, help="Produits récupérés")
+    parser.add_argument("--stores", type=int, default=200, help="Magasins distincts à géocoder")
+    parser.add_argument("--category", default="chocolats")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence par réponse (secondes)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part des réponses en 503")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Octets de remplissage par produit")
+    parser.add_argument(
+        "--respect-rate-limits",
+        action="store_true",
+        help="Garder les limites de débit des API réelles"
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Sans tracemalloc (durées plus justes)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Écart toléré avant régression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\n💾 Résultats : {args.output}")
+
+    regressions = []
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Référence : {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Serveurs HTTP locaux imitant OpenFoodFacts (`/search`) et l'API Adresse.
+
+Les réponses sont déterministes (même graine, mêmes produits et mêmes
+coordonnées) ; la latence, le taux d'erreur et la taille des produits
+sont réglables pour reproduire des conditions réseau sans réseau.
+"""
+import csv
+import email
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BRANDS = ["Lindt", "Milka", "Côte d'Or", "Nestlé", "Carrefour", "Auchan", "Poulain", "Kinder"]
+CHAINS = ["Carrefour", "Carrefour Market", "Auchan", "Leclerc", "Intermarché", "Monoprix", "Lidl"]
+CITIES = [
+    ("Paris", "75001"), ("Lyon", "69001"), ("Marseille", "13001"), ("Lille", "59000"),
+    ("Bordeaux", "33000"), ("Nantes", "44000"), ("Toulouse", "31000"), ("Rennes", "35000"),
+]
+CSV_COLUMNS = [
+    "q", "latitude", "longitude", "result_label", "result_score",
+    "result_postcode", "result_citycode", "result_city", "result_status",
+]
+
+
+@dataclass
+class StubConfig:
+    """Comportement d'un serveur local."""
+    latency: float = 0.0         # secondes ajoutées à chaque réponse
+    error_rate: float = 0.0      # part des réponses en 503
+    payload_bytes: int = 0       # texte de remplissage ajouté à chaque produit
+    total_products: int = 10_000
+    stores: int = 200            # commerces indépendants (adresses distinctes à géocoder)
+    not_found_rate: float = 0.1  # part des adresses sans résultat
+    seed: int = 42
+
+
+def make_product(category: str, index: int, config: StubConfig) -> dict:
+    """Produit synthétique n°`index` d'une catégorie (tri par modification décroissante)."""
+    rng = random.Random(f"{config.seed}-{category}-{index}")
+    chain = CHAINS[index % len(CHAINS)]
+    city, _ = CITIES[rng.randrange(len(CITIES))]
+    store = rng.randrange(config.stores)
+    product = {
+        "code": f"{3_000_000_000_000 + index:013d}",
+        "product_name": f"{category.capitalize()} {rng.choice(['noir', 'lait', 'blanc'])} {index % 997}",
+        "brands": rng.choice(BRANDS),
+        "categories": category,
+        "nutriscore_grade": rng.choice("abcde"),
+        "nova_group": rng.randint(1, 4),
+        "energy_100g": round(rng.uniform(1500, 2500), 1),
+        "sugars_100g": round(rng.uniform(0, 60), 1),
+        "fat_100g": round(rng.uniform(5, 45), 1),
+        "salt_100g": round(rng.uniform(0, 1), 2),
+        # Les enseignes se regroupent en une clé ; les commerces indépendants non
+        "stores": chain if rng.random() < 0.3 else f"Épicerie {store} {city}",
+        "last_modified_t": 1_700_000_000 - index,
+    }
+    # Quelques valeurs manquantes, comme dans les données réelles
+    for field in ("nutriscore_grade", "nova_group", "stores"):
+        if rng.random() < 0.1:
+            product[field] = None
+    return product
+
+
+def geocode(address: str, config: StubConfig) -> dict | None:
+    """Résultat de géocodage déterministe d'une adresse (None si introuvable)."""
+    h = zlib.crc32(f"{config.seed}-{address}".encode("utf-8"))
+    if (h % 1000) / 1000 < config.not_found_rate:
+        return None
+    city, postcode = CITIES[h % len(CITIES)]
+    return {
+        "label": f"{address} {postcode} {city}",
+        "score": 0.3 + (h % 70) / 100,
+        "latitude": 43 + (h % 700) / 100,
+        "longitude": -1 + (h // 7 % 800) / 100,
+        "postcode": postcode,
+        "citycode": postcode,
+        "city": city,
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, comme les vraies API
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def stub(self) -> 'StubServer':
+        return self.server.stub
+
+    def _unavailable(self) -> bool:
+        """Applique la latence ; répond 503 selon le taux d'erreur."""
+        self.stub.count_request()
+        if self.stub.config.latency:
+            time.sleep(self.stub.config.latency)
+        if self.stub.random() < self.stub.config.error_rate:
+            self._send(503, b"Service Unavailable", "text/plain")
+            return True
+        return False
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: dict):
+        self._send(200, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+
+class OpenFoodFactsHandler(_StubHandler):
+    """`GET /api/v2/search` : pages de produits synthétiques."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/api/v2/search":
+            self._send(404, b"Not Found", "text/plain")
+            return
+        if self._unavailable():
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        config = self.stub.config
+        page, page_size = int(params.get("page", 1)), int(params.get("page_size", 20))
+        category = params.get("categories_tags", "produits")
+        fields = params["fields"].split(",") if "fields" in params else None
+
+        start = (page - 1) * page_size
+        products = []
+        for index in range(start, min(start + page_size, config.total_products)):
+            product = make_product(category, index, config)
+            if fields:
+                product = {k: v for k, v in product.items() if k in fields}
+            if config.payload_bytes:
+                product["ingredients_text"] = "x" * config.payload_bytes
+            products.append(product)
+
+        self._send_json({
+            "count": config.total_products,
+            "page": page,
+            "page_size": page_size,
+            "products": products,
+        })
+
+
+class AdresseHandler(_StubHandler):
+    """`GET /search/` (une adresse) et `POST /search/csv/` (lot CSV)."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/search":
+            self._send(404, b"Not Found", "text/plain")
+            return
+        if self._unavailable():
+            return
+
+        query = parse_qs(url.query).get("q", [""])[0]
+        result = geocode(query, self.stub.config)
+        features = []
+        if result:
+            features.append({
+                "properties": {k: v for k, v in result.items() if k not in ("latitude", "longitude")},
+                "geometry": {"coordinates": [result["longitude"], result["latitude"]]},
+            })
+        self._send_json({"features": features})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/search/csv":
+            self._send(404, b"Not Found", "text/plain")
+            return
+        body = self._read_body()
+        if self._unavailable():
+            return
+
+        # Corps multipart/form-data : on ne garde que le fichier `data`
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + body
+        )
+        upload = next(
+            part.get_payload(decode=True) for part in message.get_payload()
+            if part.get_param("name", header="content-disposition") == "data"
+        )
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for row in csv.DictReader(io.StringIO(upload.decode("utf-8"))):
+            result = geocode(row["q"], self.stub.config)
+            if result is None:
+                writer.writerow({"q": row["q"], "result_status": "not-found"})
+                continue
+            writer.writerow({
+                "q": row["q"],
+                "latitude": result["latitude"],
+                "longitude": result["longitude"],
+                "result_label": result["label"],
+                "result_score": result["score"],
+                "result_postcode": result["postcode"],
+                "result_citycode": result["citycode"],
+                "result_city": result["city"],
+                "result_status": "ok",
+            })
+        self._send(200, output.getvalue().encode("utf-8"), "text/csv")
+
+
+class StubServer:
+    """Serveur local dans un thread, utilisable comme context manager."""
+
+    def __init__(self, handler: type[_StubHandler], config: StubConfig = None):
+        self.config = config or StubConfig()
+        self.requests = 0
+        self._handler = handler
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def __enter__(self) -> 'StubServer':
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
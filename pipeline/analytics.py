@@ -0,0 +1,154 @@
+"""Analyses et métriques de qualité en SQL (DuckDB) directement sur les Parquet."""
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from .config import PROCESSED_DIR, DATASET_DIR
+from .models import QualityMetrics
+from .quality import compute_grade
+
+# Colonnes techniques ajoutées par DuckDB / le partitionnement, hors métriques
+METADATA_COLUMNS = {"filename", "category", "run_date"}
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class DuckDBAnalytics:
+    """Expose les Parquet traités sous forme de vues DuckDB.
+
+    - `runs` : un fichier par run dans `data/processed` (colonne `filename`)
+    - `dataset` : dataset partitionné (colonnes `category` et `run_date`)
+
+    Les requêtes s'exécutent hors mémoire pandas, en parallèle sur
+    plusieurs threads ; seul le résultat est converti en DataFrame.
+    """
+
+    def __init__(
+        self,
+        processed_dir: str | Path = PROCESSED_DIR,
+        dataset_dir: str | Path = DATASET_DIR,
+        threads: int = None,
+        memory_limit: str = None,
+    ):
+        self.processed_dir = Path(processed_dir)
+        self.dataset_dir = Path(dataset_dir)
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = '{memory_limit}'")
+        self.views = []
+        self.register_views()
+
+    def register_views(self):
+        """(Re)crée les vues sur les fichiers présents."""
+        self.views = []
+        sources = {
+            "runs": (self.processed_dir, "*.parquet", "filename = true"),
+            "dataset": (self.dataset_dir, "**/*.parquet", "hive_partitioning = true"),
+        }
+        for view, (directory, pattern, option) in sources.items():
+            if not any(directory.glob(pattern)):
+                continue
+            glob = (directory / pattern).as_posix().replace("'", "''")
+            self.con.execute(
+                f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM "
+                f"read_parquet('{glob}', union_by_name = true, {option})"
+            )
+            self.views.append(view)
+
+    def query(self, sql: str, params: list = None) -> pd.DataFrame:
+        """Exécute une requête SQL et retourne le résultat en DataFrame."""
+        return self.con.execute(sql, params or []).df()
+
+    def columns(self, view: str = "runs") -> list[str]:
+        """Colonnes de données d'une vue (hors colonnes techniques)."""
+        described = self.con.execute(f"DESCRIBE {_quote(view)}").fetchall()
+        return [row[0] for row in described if row[0] not in METADATA_COLUMNS]
+
+    def _metrics_select(self, columns: list[str]) -> str:
+        """Agrégats SQL des métriques de qualité."""
+        id_col = "code" if "code" in columns else columns[0]
+        # Comme pandas.duplicated : les identifiants nuls forment une valeur
+        distinct_ids = (
+            f"count(DISTINCT {_quote(id_col)}) "
+            f"+ CASE WHEN count({_quote(id_col)}) < count(*) THEN 1 ELSE 0 END"
+        )
+        aggregates = ["count(*) AS total", f"{distinct_ids} AS distinct_ids"]
+        aggregates += [f"count({_quote(c)}) AS {_quote('nn_' + c)}" for c in columns]
+        if "geocoding_score" in columns:
+            aggregates += [
+                "count(*) FILTER (WHERE geocoding_score > 0) AS geocoded",
+                "avg(geocoding_score) FILTER (WHERE geocoding_score > 0) AS geo_avg",
+            ]
+        return ", ".join(aggregates)
+
+    @staticmethod
+    def _to_metrics(row: pd.Series, columns: list[str]) -> QualityMetrics:
+        """Convertit une ligne d'agrégats en QualityMetrics."""
+        total = int(row["total"])
+        null_counts = {c: total - int(row["nn_" + c]) for c in columns}
+        total_cells = total * len(columns)
+        completeness = (total_cells - sum(null_counts.values())) / total_cells if total_cells > 0 else 0
+        duplicates = total - int(row["distinct_ids"]) if total > 0 else 0
+        duplicates_pct = duplicates / total * 100 if total > 0 else 0
+
+        has_geocoding = "geocoding_score" in columns
+        geocoded = int(row["geocoded"]) if has_geocoding else 0
+        geo_rate = geocoded / total * 100 if total > 0 else 0
+        geo_avg = float(row["geo_avg"]) if has_geocoding and geocoded > 0 else 0
+
+        return QualityMetrics(
+            total_records=total,
+            valid_records=total - duplicates,
+            completeness_score=round(completeness, 3),
+            duplicates_count=duplicates,
+            duplicates_pct=round(duplicates_pct, 2),
+            geocoding_success_rate=round(geo_rate, 2),
+            avg_geocoding_score=round(geo_avg, 3),
+            null_counts=null_counts,
+            quality_grade=compute_grade(completeness, duplicates_pct, geo_rate, has_geocoding),
+        )
+
+    def quality_metrics(
+        self,
+        view: str = "runs",
+        where: str = None,
+        params: list = None
+    ) -> QualityMetrics:
+        """Métriques de qualité calculées en SQL sur une vue (filtre optionnel)."""
+        columns = self.columns(view)
+        sql = f"SELECT {self._metrics_select(columns)} FROM {_quote(view)}"
+        if where:
+            sql += f" WHERE {where}"
+        row = self.query(sql, params).iloc[0]
+        return self._to_metrics(row, columns)
+
+    def quality_by_run(self, view: str = "runs") -> pd.DataFrame:
+        """Métriques de qualité de chaque run (un fichier = un run)."""
+        columns = self.columns(view)
+        group = "filename" if view == "runs" else "category, run_date"
+        rows = self.query(
+            f"SELECT {group}, {self._metrics_select(columns)} "
+            f"FROM {_quote(view)} GROUP BY {group} ORDER BY {group}"
+        )
+
+        records = []
+        for _, row in rows.iterrows():
+            metrics = self._to_metrics(row, columns)
+            record = {key: row[key] for key in group.split(", ")}
+            record.update(metrics.model_dump(exclude={"null_counts"}))
+            records.append(record)
+        return pd.DataFrame(records)
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,147 @@
+"""Cache persistant de géocodage (SQLite)."""
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from .config import (
+    GEOCODING_CACHE_PATH,
+    GEOCODING_CACHE_TTL,
+    GEOCODING_CACHE_NEGATIVE_TTL,
+    GEOCODING_CACHE_MAX_ENTRIES,
+)
+from .models import GeocodingResult
+from .normalization import canonicalize_address
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocoding (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    score REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_geocoding_last_access ON geocoding(last_access);
+"""
+
+# Limite de variables SQLite par requête `IN (...)`
+_SQL_BATCH = 500
+
+
+class GeocodingCache:
+    """Cache de géocodage sur disque avec TTL et éviction LRU.
+
+    Les entrées sont indexées par adresse canonique (voir `normalization`).
+    Les résultats à score nul sont aussi conservés (cache négatif), avec
+    une durée de vie plus courte. Le fichier SQLite peut être partagé
+    entre plusieurs runs et plusieurs processus.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = GEOCODING_CACHE_PATH,
+        ttl: float = GEOCODING_CACHE_TTL,
+        negative_ttl: float = GEOCODING_CACHE_NEGATIVE_TTL,
+        max_entries: int = GEOCODING_CACHE_MAX_ENTRIES,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get_many(self, addresses: list[str]) -> dict[str, GeocodingResult]:
+        """Retourne les résultats encore valides, indexés par adresse demandée."""
+        now = time.time()
+        keys = {}
+        for address in addresses:
+            keys.setdefault(canonicalize_address(address), []).append(address)
+
+        found = {}
+        expired = []
+        key_list = list(keys)
+        for start in range(0, len(key_list), _SQL_BATCH):
+            batch = key_list[start:start + _SQL_BATCH]
+            rows = self._conn.execute(
+                f"SELECT key, payload, expires_at FROM geocoding "
+                f"WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, payload, expires_at in rows:
+                if expires_at < now:
+                    expired.append(key)
+                    continue
+                # Payload écrit par `put_many` : déjà validé
+                fields = json.loads(payload)
+                for address in keys[key]:
+                    found[address] = GeocodingResult.from_trusted(**{**fields, "original_address": address})
+
+        hit_keys = [k for k in key_list if keys[k][0] in found]
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE geocoding SET last_access = ? WHERE key = ?",
+                [(now, k) for k in hit_keys],
+            )
+            self._conn.executemany("DELETE FROM geocoding WHERE key = ?", [(k,) for k in expired])
+
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(addresses) - len(found)
+        self.stats["expired"] += len(expired)
+        return found
+
+    def put_many(self, results: list[GeocodingResult]):
+        """Enregistre des résultats (TTL court pour les scores nuls).
+
+        Les recherches en échec (`failed`) ne sont pas enregistrées : seule
+        une vraie réponse "introuvable" alimente le cache négatif.
+        """
+        now = time.time()
+        rows = [
+            (
+                canonicalize_address(r.original_address),
+                r.model_dump_json(),
+                r.score,
+                now + (self.ttl if r.score > 0 else self.negative_ttl),
+                now,
+            )
+            for r in results
+            if r.original_address and not r.failed
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocoding VALUES (?, ?, ?, ?, ?)", rows
+            )
+        self.stats["writes"] += len(rows)
+        self.evict()
+
+    def evict(self):
+        """Supprime les entrées expirées puis les moins récemment utilisées."""
+        with self._conn:
+            self._conn.execute("DELETE FROM geocoding WHERE expires_at < ?", (time.time(),))
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM geocoding WHERE key IN ("
+                    "SELECT key FROM geocoding ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.stats["evictions"] += excess
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM geocoding").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        """Statistiques du cache (hits, misses, taille...)."""
+        stats = self.stats.copy()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups * 100 if lookups > 0 else 0
+        stats["entries"] = len(self)
+        return stats
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,82 @@
+"""Points de reprise : un crawl interrompu reprend à la dernière page enregistrée."""
+import json
+import os
+from datetime import datetime
+from typing import Generator
+
+from .config import STATE_DIR
+from .models import FetchCheckpointState
+
+
+class FetchCheckpoint:
+    """Point de reprise d'un crawl OpenFoodFacts.
+
+    Après chaque page, ses produits sont ajoutés (et synchronisés sur
+    disque) à un fichier NDJSON partiel, puis l'état est réécrit de façon
+    atomique. Les lignes écrites après le dernier état enregistré (arrêt
+    entre les deux écritures) sont ignorées à la reprise.
+    """
+
+    def __init__(self, state: FetchCheckpointState):
+        self.state = state
+        self.path = STATE_DIR / f"{state.category}.checkpoint.json"
+        self.records_path = STATE_DIR / f"{state.category}.checkpoint.ndjson"
+
+    @classmethod
+    def start(cls, category: str, max_items: int, modified_since: int = None) -> 'FetchCheckpoint':
+        """Nouveau point de reprise (remplace celui d'un run précédent)."""
+        checkpoint = cls(FetchCheckpointState(
+            category=category, max_items=max_items, modified_since=modified_since
+        ))
+        checkpoint.records_path.unlink(missing_ok=True)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, category: str) -> 'FetchCheckpoint | None':
+        """Point de reprise du dernier run interrompu (None si aucun)."""
+        path = STATE_DIR / f"{category}.checkpoint.json"
+        if not path.exists():
+            return None
+        return cls(FetchCheckpointState.model_validate_json(path.read_text(encoding="utf-8")))
+
+    def save(self):
+        self.state.updated_at = datetime.now()
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(self.state.model_dump_json(indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def records(self) -> Generator[dict, None, None]:
+        """Relit les produits déjà enregistrés."""
+        if not self.state.records:
+            return
+        with open(self.records_path, encoding="utf-8") as f:
+            for _, line in zip(range(self.state.records), f):
+                yield json.loads(line)
+
+    def page_done(self, page: int, products: list[dict]):
+        """Enregistre une page entièrement consommée."""
+        if products:
+            mode = "r+b" if self.records_path.exists() else "wb"
+            with open(self.records_path, mode) as f:
+                # Écrase les lignes d'une page non enregistrée dans l'état
+                f.truncate(self.state.records_bytes)
+                f.seek(self.state.records_bytes)
+                for product in products:
+                    f.write((json.dumps(product, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.state.records_bytes = f.tell()
+        self.state.last_page = page
+        self.state.records += len(products)
+        self.save()
+
+    def finish(self):
+        """Marque le crawl comme terminé : la reprise ne refait aucune requête."""
+        self.state.complete = True
+        self.save()
+
+    def clear(self):
+        """Supprime le point de reprise (run terminé)."""
+        self.path.unlink(missing_ok=True)
+        self.records_path.unlink(missing_ok=True)
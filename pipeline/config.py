@@ -1,15 +1,18 @@
 """Configuration centralisée du pipeline."""
+import os
 from pathlib import Path
 from dataclasses import dataclass
 
 # === Chemins ===
 BASE_DIR = Path(__file__).parent.parent
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("PIPELINE_DATA_DIR", BASE_DIR / "data"))  # surchargé par les benchmarks
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 REPORTS_DIR = DATA_DIR / "reports"
+CACHE_DIR = DATA_DIR / "cache"
+STATE_DIR = DATA_DIR / "state"
 
-for dir_path in [RAW_DIR, PROCESSED_DIR, REPORTS_DIR]:
+for dir_path in [RAW_DIR, PROCESSED_DIR, REPORTS_DIR, CACHE_DIR, STATE_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 
@@ -21,6 +24,17 @@ class APIConfig:
     timeout: int
     rate_limit: float  # secondes entre requêtes
     headers: dict = None
+    # Pool de connexions HTTP (keep-alive)
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry: float = 30.0
+    http2: bool = True  # activé seulement si le paquet `h2` est installé
+    # Moteur asynchrone : requêtes simultanées et rafale du seau à jetons
+    max_concurrency: int = 1
+    burst: int = 1
+    # Débit adaptatif (voir AdaptiveThrottle) : rate_limit est le débit de départ
+    adaptive: bool = True
+    max_rate: float = None  # plafond en requêtes/s (None : aucun)
     
     def __post_init__(self):
         self.headers = self.headers or {}
@@ -32,23 +46,94 @@ OPENFOODFACTS_CONFIG = APIConfig(
     base_url="https://world.openfoodfacts.org/api/v2",
     timeout=60,
     rate_limit=1.5,
-    headers={"User-Agent": "IPSSI-TP-Pipeline/1.0 (contact@ipssi.fr)"}
+    headers={"User-Agent": "IPSSI-TP-Pipeline/1.0 (contact@ipssi.fr)"},
+    max_connections=4,
+    max_keepalive_connections=2,
+    max_concurrency=3,  # masque la latence de /search, débit borné par rate_limit
+    max_rate=1.0,
 )
 
 ADRESSE_CONFIG = APIConfig(
     name="API Adresse",
     base_url="https://api-adresse.data.gouv.fr",
     timeout=10,
-    rate_limit=0.1,  # Très rapide, peu de limite
+    rate_limit=0.025,  # 40 req/s, sous la limite de 50 req/s par IP
+    max_connections=20,
+    max_keepalive_connections=10,
+    max_concurrency=10,
+    burst=10,
+    max_rate=50,  # limite documentée par IP
 )
 
+# === Débit adaptatif (AIMD) ===
+ADAPTIVE_INCREASE = 0.05        # hausse par seconde saine, en fraction du débit de départ
+ADAPTIVE_DECREASE = 0.5         # facteur appliqué sur 429 / 503 / timeout / latence élevée
+ADAPTIVE_LATENCY_FACTOR = 2.0   # latence "élevée" : au-delà de 2x la latence de référence
+ADAPTIVE_COOLDOWN = 1.0         # secondes minimum entre deux baisses
+ADAPTIVE_MIN_FACTOR = 0.1       # plancher, en fraction du débit de départ
+RETRY_AFTER_MAX = 120           # secondes, borne d'un Retry-After
+
 # === Paramètres d'acquisition ===
 MAX_ITEMS = 500  # Limite pour le TP
 BATCH_SIZE = 50  # Taille des lots
+OFF_MAX_PAGE_SIZE = 100  # Taille de page maximale acceptée par /search
+OFF_PREFETCH_PAGES = 4   # Pages préchargées en avance sur la consommation
+CATEGORY_WORKERS = 4     # Processus du mode multi-catégories (--categories)
+
+# === Géocodage en masse (API Adresse /search/csv/) ===
+GEOCODING_CSV_CHUNK_SIZE = 2000  # Adresses par fichier CSV envoyé
+GEOCODING_CSV_TIMEOUT = 120      # secondes, un lot CSV est plus long qu'une requête
+
+# === Archives brutes (NDJSON) ===
+RAW_COMPRESSION = os.getenv("PIPELINE_RAW_COMPRESSION", "zstd")  # "zstd", "gzip" ou "none"
+RAW_EXTENSIONS = {"zstd": ".ndjson.zst", "gzip": ".ndjson.gz", "none": ".ndjson"}
+
+# === Stockage Parquet ===
+DATASET_DIR = PROCESSED_DIR / "dataset"  # dataset partitionné category=/run_date=
+PARQUET_ROW_GROUP_SIZE = 50_000
+# Colonnes à faible cardinalité : encodage dictionnaire
+PARQUET_DICTIONARY_COLUMNS = [
+    "brands", "categories", "nutriscore_grade", "stores",
+    "store_address", "city", "postal_code", "sugar_category",
+]
+
+# === Cache persistant de géocodage ===
+GEOCODING_CACHE_PATH = CACHE_DIR / "geocoding.sqlite"
+GEOCODING_CACHE_TTL = 30 * 24 * 3600        # 30 jours pour un résultat trouvé
+GEOCODING_CACHE_NEGATIVE_TTL = 24 * 3600    # 1 jour pour un score nul
+GEOCODING_CACHE_MAX_ENTRIES = 100_000       # au-delà : éviction LRU
+GEOCODING_CHECKPOINT_EVERY = 500            # résultats enregistrés par écriture en cours de géocodage
+
+# === Cache des réponses HTTP ===
+# "off" : désactivé, "on" : cache + revalidation (ETag/Last-Modified),
+# "offline" : rejoue uniquement depuis le cache, sans réseau
+HTTP_CACHE_MODE = os.getenv("PIPELINE_HTTP_CACHE", "off")
+HTTP_CACHE_DIR = CACHE_DIR / "http"
+HTTP_CACHE_MAX_AGE = int(os.getenv("PIPELINE_HTTP_CACHE_MAX_AGE", 900))  # secondes sans revalidation
+
+# === Quasi-doublons (MinHash + LSH) ===
+NEAR_DUPLICATE_THRESHOLD = 0.8   # similarité de Jaccard minimale
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16                   # 16 bandes de 4 lignes : seuil LSH ≈ 0.5
+# Pas de quantification des nutriments comparés
+NUTRIENT_STEPS = {
+    "energy_100g": 50,
+    "sugars_100g": 1,
+    "fat_100g": 1,
+    "salt_100g": 0.1,
+}
+
+# === Types compacts (DataTransformer.compact_dtypes) ===
+COMPACT_CATEGORY_MAX_RATIO = 0.5  # texte → category si valeurs distinctes / lignes ≤ ratio
 
 # === Seuils de qualité ===
 QUALITY_THRESHOLDS = {
     "completeness_min": 0.7,      # 70% des champs remplis
     "geocoding_score_min": 0.5,   # Score géocodage minimum
     "duplicates_max_pct": 5.0,    # Max 5% de doublons
-}
\ No newline at end of file
+}
+
+# === Recommandations IA locales (GPT4All) ===
+# Modèle désigné par GPT4ALL_MODEL_PATH (.env), chargé une fois par processus
+LLM_MAX_TOKENS = 512   # tokens générés au plus par rapport
+LLM_TIMEOUT = 120      # secondes de génération au plus par rapport (réponse tronquée)
@@ -0,0 +1,184 @@
+"""Détection des doublons de produits : codes déjà vus et quasi-doublons (MinHash + LSH)."""
+import sqlite3
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .config import (
+    NEAR_DUPLICATE_THRESHOLD,
+    MINHASH_PERMUTATIONS,
+    LSH_BANDS,
+    NUTRIENT_STEPS,
+)
+from .normalization import fold_text
+
+# Nombre premier de Mersenne 2**31 - 1 : (a * x + b) tient sur 64 bits
+_PRIME = (1 << 31) - 1
+_SHINGLE_SIZE = 3
+_MISSING_TEXT = {"", "unknown", "nan", "none"}
+# Limite de variables SQLite par requête `IN (...)`
+_SQL_BATCH = 500
+
+
+class SeenCodes:
+    """Codes produits des morceaux déjà traités d'un run en streaming.
+
+    Les codes sont gardés dans une base SQLite temporaire sur disque
+    (supprimée à la fermeture) : la mémoire ne croît pas avec le nombre
+    de produits du run.
+    """
+
+    def __init__(self):
+        # Nom vide : base temporaire privée, sur disque
+        self._conn = sqlite3.connect("")
+        self._conn.execute("CREATE TABLE seen (code TEXT PRIMARY KEY)")
+
+    def __enter__(self) -> 'SeenCodes':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def mark(self, codes: pd.Series) -> pd.Series:
+        """Masque des codes absents des morceaux précédents, puis les enregistre."""
+        values = codes.dropna().unique().tolist()
+        seen = set()
+        for start in range(0, len(values), _SQL_BATCH):
+            batch = values[start:start + _SQL_BATCH]
+            rows = self._conn.execute(
+                f"SELECT code FROM seen WHERE code IN ({','.join('?' * len(batch))})", batch
+            )
+            seen.update(code for code, in rows)
+        self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((v,) for v in values))
+        return ~codes.isin(seen)
+
+
+class NearDuplicateDetector:
+    """Regroupe les produits quasi identiques sous des codes différents.
+
+    Chaque produit est décrit par les trigrammes de `product_name` +
+    `brands` et par ses nutriments quantifiés. Les signatures MinHash
+    sont découpées en bandes (LSH) : seuls les produits partageant une
+    bande sont comparés (au premier produit du seau), puis regroupés si
+    leur similarité de Jaccard estimée (part des MinHash égaux) atteint
+    `threshold`. Le coût est linéaire en nombre de produits.
+    """
+
+    def __init__(
+        self,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        num_perm: int = MINHASH_PERMUTATIONS,
+        bands: int = LSH_BANDS,
+        seed: int = 42,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _text(df: pd.DataFrame, column: str) -> pd.Series:
+        if column not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[column].astype(object).where(df[column].notna(), "").astype(str)
+
+    def shingles(self, df: pd.DataFrame) -> list[set[str]]:
+        """Ensemble de traits de chaque produit (vide si sans nom)."""
+        names = self._text(df, "product_name")
+        brands = self._text(df, "brands")
+        nutrients = {
+            col: (pd.to_numeric(df[col], errors="coerce") / step).round()
+            for col, step in NUTRIENT_STEPS.items()
+            if col in df.columns
+        }
+
+        features = []
+        for i, (name, brand) in enumerate(zip(names, brands)):
+            name = fold_text(name)
+            if name in _MISSING_TEXT:
+                features.append(set())
+                continue
+            brand = fold_text(brand)
+            text = f"{name} {brand}" if brand not in _MISSING_TEXT else name
+            grams = {text[j:j + _SHINGLE_SIZE] for j in range(max(len(text) - _SHINGLE_SIZE + 1, 1))}
+            for col, values in nutrients.items():
+                if not pd.isna(values.iat[i]):
+                    grams.add(f"{col}={int(values.iat[i])}")
+            features.append(grams)
+        return features
+
+    def signatures(self, features: list[set[str]], chunk_size: int = 2000) -> np.ndarray:
+        """Signatures MinHash (une ligne par produit, zéros si sans traits).
+
+        Les traits d'un morceau de produits sont hachés ensemble puis
+        réduits par produit (`minimum.reduceat`).
+        """
+        signatures = np.zeros((len(features), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(features), chunk_size):
+            rows = [i for i in range(start, min(start + chunk_size, len(features))) if features[i]]
+            if not rows:
+                continue
+            lengths = np.array([len(features[i]) for i in rows])
+            hashes = np.fromiter(
+                (zlib.crc32(g.encode("utf-8")) for i in rows for g in features[i]),
+                dtype=np.uint64, count=int(lengths.sum()),
+            )
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_PRIME)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            signatures[rows] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures
+
+    def find_groups(self, df: pd.DataFrame) -> np.ndarray:
+        """Identifiant de groupe de chaque ligne (position du premier produit du groupe)."""
+        features = self.shingles(df)
+        signatures = self.signatures(features)
+        active = np.array([bool(grams) for grams in features], dtype=bool)
+        parent = np.arange(len(features))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        min_matches = self.threshold * self.num_perm
+        rows = self.num_perm // self.bands
+        weights = np.random.default_rng(0).integers(1, 1 << 62, size=rows, dtype=np.uint64)
+        positions = np.flatnonzero(active)
+        for band in range(self.bands):
+            # Une clé 64 bits par bande (débordement volontaire modulo 2**64)
+            keys = (signatures[positions, band * rows:(band + 1) * rows] * weights).sum(axis=1)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys, members = keys[order], positions[order]
+
+            # Chaque membre d'un seau est comparé au premier produit du seau
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            firsts = np.repeat(members[starts], np.diff(np.r_[starts, len(members)]))
+            candidates = members != firsts
+            left, right = firsts[candidates], members[candidates]
+            similar = np.count_nonzero(signatures[left] == signatures[right], axis=1) >= min_matches
+
+            for i, j in zip(left[similar], right[similar]):
+                root_i, root_j = find(i), find(j)
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        return np.array([find(i) for i in range(len(features))])
+
+    def duplicate_mask(self, df: pd.DataFrame) -> pd.Series:
+        """True pour les quasi-doublons d'un produit apparu plus tôt."""
+        groups = self.find_groups(df)
+        return pd.Series(groups != np.arange(len(df)), index=df.index)
+
+    def near_duplicate_rate(self, df: pd.DataFrame) -> float:
+        """Pourcentage de lignes quasi-doublons."""
+        if len(df) == 0:
+            return 0.0
+        return float(self.duplicate_mask(df).mean() * 100)
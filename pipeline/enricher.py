@@ -1,18 +1,32 @@
+from pathlib import Path
+
 import pandas as pd
-from tqdm import tqdm
 
+from .cache import GeocodingCache
+from .config import GEOCODING_CACHE_PATH, GEOCODING_CHECKPOINT_EVERY
 from .fetchers.adresse import AdresseFetcher
 from .fetchers.secondary_api import SecondaryFetcher
 from .models import GeocodingResult, SecondaryResult
+from .normalization import AddressIndex
+
+# Colonnes ajoutées aux produits par le géocodage
+GEOCODING_FIELDS = [
+    "store_address", "latitude", "longitude",
+    "city", "postal_code", "geocoding_score",
+]
 
 
 class DataEnricher:
     """Enrichit les données en combinant plusieurs sources/API."""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, cache_path: str | Path = GEOCODING_CACHE_PATH):
         self.geocoder = AdresseFetcher()
         self.secondary_api = SecondaryFetcher()
+        self.cache = GeocodingCache(cache_path) if use_cache else None
+        self.address_index = AddressIndex()
         self.enrichment_stats = {
+            "raw_addresses": 0,
+            "canonical_addresses": 0,
             "total_processed": 0,
             "successfully_enriched": 0,
             "failed_enrichment": 0,
@@ -20,32 +34,58 @@ class DataEnricher:
 
     def extract_addresses(
         self,
-        products: list[dict],
+        products: list[dict] | pd.DataFrame,
         address_field: str = "stores"
     ) -> list[str]:
-        """Extrait les adresses uniques des produits."""
-        addresses = set()
+        """Extrait les adresses uniques des produits, sous forme canonique.
+
+        Les variantes d'un même magasin (casse, accents, ponctuation,
+        déclinaisons d'enseigne) partagent une clé, géocodée une seule fois.
+        Accepte une liste de produits ou un DataFrame.
+        """
+        if isinstance(products, pd.DataFrame):
+            values = products[address_field] if address_field in products.columns else []
+        else:
+            values = [product.get(address_field, "") for product in products]
 
-        for product in products:
-            addr = product.get(address_field, "")
+        for addr in pd.unique(pd.Series(values, dtype=object)):
             if isinstance(addr, str) and addr.strip():
                 for part in addr.split(","):
-                    cleaned = part.strip()
-                    if len(cleaned) > 3:
-                        addresses.add(cleaned)
+                    if part.strip():
+                        self.address_index.add(part.strip())
 
-        return list(addresses)
+        addresses = self.address_index.keys()
+        self.enrichment_stats["raw_addresses"] = len(self.address_index)
+        self.enrichment_stats["canonical_addresses"] = len(addresses)
+        return addresses
 
     def build_geocoding_cache(
         self,
-        addresses: list[str]
+        addresses: list[str],
+        bulk: bool = True
     ) -> dict[str, GeocodingResult]:
-        """Construit un cache de géocodage."""
-        cache = {}
-        print(f"🌍 Géocodage de {len(addresses)} adresses uniques...")
-
-        for result in self.geocoder.fetch_all(addresses):
-            cache[result.original_address] = result
+        """Construit un cache de géocodage (par lots CSV si `bulk`).
+
+        Les adresses déjà présentes dans le cache persistant ne sont pas
+        re-géocodées ; les nouveaux résultats y sont enregistrés par lots de
+        `GEOCODING_CHECKPOINT_EVERY`, si bien qu'un géocodage interrompu
+        reprend là où il s'est arrêté.
+        """
+        cache = self.cache.get_many(addresses) if self.cache is not None else {}
+        missing = [a for a in addresses if a not in cache]
+        print(f"🌍 Géocodage de {len(missing)} adresses uniques ({len(cache)} en cache)...")
+
+        if missing:
+            fresh = []
+            for result in self.geocoder.fetch_all(missing, bulk=bulk):
+                cache[result.original_address] = result
+                fresh.append(result)
+                if self.cache is not None and len(fresh) >= GEOCODING_CHECKPOINT_EVERY:
+                    self.cache.put_many(fresh)
+                    fresh = []
+
+            if self.cache is not None and fresh:
+                self.cache.put_many(fresh)
 
         return cache
 
@@ -62,6 +102,58 @@ class DataEnricher:
 
         return cache
 
+    def enrich_dataframe(
+        self,
+        df: pd.DataFrame,
+        geocoding_cache: dict[str, GeocodingResult],
+        secondary_cache: dict[str, SecondaryResult],
+        address_field: str = "stores"
+    ) -> pd.DataFrame:
+        """Enrichit un DataFrame de produits par jointure sur le premier magasin.
+
+        Les caches sont convertis en tables indexées par clé canonique puis
+        rattachés en une seule jointure ; les statistiques sont des comptes
+        vectorisés.
+        """
+        if address_field in df.columns:
+            first_store = df[address_field].astype(object).str.split(",", n=1).str[0].str.strip()
+        else:
+            first_store = pd.Series(None, index=df.index, dtype=object)
+
+        # Canonicalisation une fois par valeur distincte, pas par ligne
+        mapping = {raw: self.address_index.key_for(raw) for raw in first_store.dropna().unique()}
+        store_key = first_store.map(mapping)
+
+        geo_table = pd.DataFrame.from_records(
+            [
+                (key, geo.label, geo.latitude, geo.longitude, geo.city,
+                 geo.postal_code, geo.score, geo.is_valid)
+                for key, geo in geocoding_cache.items()
+            ],
+            columns=["_store_key"] + GEOCODING_FIELDS + ["_geo_valid"],
+        ).set_index("_store_key")
+
+        enriched = (
+            df.drop(columns=GEOCODING_FIELDS, errors="ignore")
+            .assign(_store_key=store_key)
+            .join(geo_table, on="_store_key")
+        )
+
+        if secondary_cache:
+            secondary_table = pd.DataFrame.from_dict(
+                {key: result.model_dump() for key, result in secondary_cache.items()},
+                orient="index",
+            )
+            enriched = enriched.join(secondary_table, on="_store_key")
+
+        matched = enriched["_geo_valid"].notna()
+        valid = enriched["_geo_valid"].eq(True)
+        self.enrichment_stats["total_processed"] += len(df)
+        self.enrichment_stats["successfully_enriched"] += int(valid.sum())
+        self.enrichment_stats["failed_enrichment"] += int((matched & ~valid).sum())
+
+        return enriched.drop(columns=["_store_key", "_geo_valid"])
+
     def enrich_products(
         self,
         products: list[dict],
@@ -70,44 +162,29 @@ class DataEnricher:
         address_field: str = "stores"
     ) -> list[dict]:
         """Enrichit les produits avec les données des deux APIs."""
-        enriched_products = []
-
-        for product in tqdm(products, desc="Enrichissement"):
-            self.enrichment_stats["total_processed"] += 1
-            enriched = product.copy()
-
-            addr = product.get(address_field, "")
-            if isinstance(addr, str) and addr.strip():
-                first_addr = addr.split(",")[0].strip()
-
-                # 🌍 Géocodage principal
-                geo = geocoding_cache.get(first_addr)
-                if geo:
-                    enriched["store_address"] = geo.label
-                    enriched["latitude"] = geo.latitude
-                    enriched["longitude"] = geo.longitude
-                    enriched["city"] = geo.city
-                    enriched["postal_code"] = geo.postal_code
-                    enriched["geocoding_score"] = geo.score
-
-                    if geo.is_valid:
-                        self.enrichment_stats["successfully_enriched"] += 1
-                    else:
-                        self.enrichment_stats["failed_enrichment"] += 1
+        enriched = self.enrich_dataframe(
+            pd.DataFrame(products), geocoding_cache, secondary_cache, address_field
+        )
+        return enriched.to_dict("records")
 
-                # 🔍 Enrichissement secondaire (optionnel)
-                secondary = secondary_cache.get(first_addr)
-                if secondary:
-                    enriched.update(secondary.to_dict())
+    def close(self):
+        """Ferme les connexions HTTP et le cache persistant."""
+        self.geocoder.close()
+        if self.cache is not None:
+            self.cache.close()
 
-            enriched_products.append(enriched)
+    def __enter__(self):
+        return self
 
-        return enriched_products
+    def __exit__(self, *exc_info):
+        self.close()
 
     def get_stats(self) -> dict:
         """Retourne les statistiques d'enrichissement."""
         stats = self.enrichment_stats.copy()
         stats["geocoder_stats"] = self.geocoder.get_stats()
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
 
         if stats["total_processed"] > 0:
             stats["success_rate"] = (
@@ -1,78 +1,230 @@
 """Fetcher pour l'API Adresse (géocodage)."""
+import csv
+import io
+from itertools import batched
 from typing import Generator
+import httpx
+from tenacity import retry
 from tqdm import tqdm
 
-from .base import BaseFetcher
-from ..config import ADRESSE_CONFIG
+from .base import BaseFetcher, RETRY_POLICY
+from ..config import ADRESSE_CONFIG, GEOCODING_CSV_CHUNK_SIZE, GEOCODING_CSV_TIMEOUT
 from ..models import GeocodingResult
 
+# Colonnes renvoyées par /search/csv/ (en plus de la colonne `q` envoyée)
+CSV_RESULT_COLUMNS = [
+    "result_label", "result_score", "result_postcode",
+    "result_citycode", "result_city", "result_status",
+]
+
+
+def _to_float(value: str | None) -> float | None:
+    """Convertit une cellule CSV en float (None si vide)."""
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
 
 class AdresseFetcher(BaseFetcher):
     """Fetcher pour l'API Adresse (géocodage)."""
-    
+
     def __init__(self):
         super().__init__(ADRESSE_CONFIG)
-    
+        self.stats["csv_fallbacks"] = 0
+
+    def _parse_response(self, address: str, data: dict) -> GeocodingResult:
+        """Convertit la réponse de `/search/` en résultat de géocodage."""
+        if not data.get("features"):
+            return GeocodingResult(original_address=address, score=0)
+
+        feature = data["features"][0]
+        props = feature.get("properties", {})
+        coords = feature.get("geometry", {}).get("coordinates", [None, None])
+
+        self.stats["items_fetched"] += 1
+
+        return GeocodingResult(
+            original_address=address,
+            label=props.get("label"),
+            latitude=coords[1] if len(coords) > 1 else None,
+            longitude=coords[0] if len(coords) > 0 else None,
+            score=props.get("score", 0),
+            postal_code=props.get("postcode"),
+            city_code=props.get("citycode"),
+            city=props.get("city"),
+        )
+
     def geocode_single(self, address: str) -> GeocodingResult:
         """Géocode une adresse unique."""
         if not address or address.strip() == "":
             return GeocodingResult(original_address=address or "", score=0)
-        
+
         try:
             data = self._make_request("/search/", params={"q": address, "limit": 1})
-            
-            if not data.get("features"):
-                return GeocodingResult(original_address=address, score=0)
-            
-            feature = data["features"][0]
-            props = feature.get("properties", {})
-            coords = feature.get("geometry", {}).get("coordinates", [None, None])
-            
-            self.stats["items_fetched"] += 1
-            
-            return GeocodingResult(
-                original_address=address,
-                label=props.get("label"),
-                latitude=coords[1] if len(coords) > 1 else None,
-                longitude=coords[0] if len(coords) > 0 else None,
-                score=props.get("score", 0),
-                postal_code=props.get("postcode"),
-                city_code=props.get("citycode"),
-                city=props.get("city"),
-            )
-        
+            return self._parse_response(address, data)
         except Exception as e:
             self.stats["requests_failed"] += 1
-            return GeocodingResult(original_address=address, score=0)
-    
-    def fetch_batch(self, addresses: list[str]) -> list[GeocodingResult]:
-        """Géocode un lot d'adresses."""
-        results = []
+            return GeocodingResult(original_address=address, score=0, failed=True)
+
+    async def ageocode_single(self, client: httpx.AsyncClient, address: str) -> GeocodingResult:
+        """Géocode une adresse unique (version asynchrone)."""
+        if not address or address.strip() == "":
+            return GeocodingResult(original_address=address or "", score=0)
+
+        try:
+            data = await self._amake_request(client, "/search/", params={"q": address, "limit": 1})
+            return self._parse_response(address, data)
+        except Exception as e:
+            self.stats["requests_failed"] += 1
+            return GeocodingResult(original_address=address, score=0, failed=True)
+
+    def _parse_csv_row(self, row: dict) -> GeocodingResult:
+        """Convertit une ligne de réponse CSV en résultat de géocodage."""
+        score = _to_float(row.get("result_score")) or 0
+        if score > 0:
+            self.stats["items_fetched"] += 1
+
+        return GeocodingResult.from_trusted(
+            original_address=row["q"],
+            label=row.get("result_label") or None,
+            latitude=_to_float(row.get("latitude")),
+            longitude=_to_float(row.get("longitude")),
+            score=score,
+            postal_code=row.get("result_postcode") or None,
+            city_code=row.get("result_citycode") or None,
+            city=row.get("result_city") or None,
+        )
+
+    def _cache_bulk_results(self, results: list[GeocodingResult]):
+        """Enregistre chaque résultat CSV comme la réponse `/search/` de son adresse.
+
+        Les rejeux hors-ligne (et les runs suivants) passent par les
+        requêtes unitaires : elles sont ainsi servies par le cache.
+        """
+        if self.cache is None:
+            return
+        url = f"{self.config.base_url}/search/"
+        for result in results:
+            features = []
+            if result.score > 0:
+                features.append({
+                    "properties": {
+                        "label": result.label,
+                        "score": result.score,
+                        "postcode": result.postal_code,
+                        "citycode": result.city_code,
+                        "city": result.city,
+                    },
+                    "geometry": {"coordinates": [result.longitude, result.latitude]},
+                })
+            self.cache.store(url, {"q": result.original_address, "limit": 1}, None, {"features": features})
+
+    @retry(**RETRY_POLICY)
+    def _geocode_csv_chunk(self, addresses: list[str]) -> tuple[list[GeocodingResult], list[str]]:
+        """Géocode un lot via `/search/csv/`.
+
+        La réponse est lue ligne à ligne. Retourne les résultats obtenus et
+        les adresses à re-géocoder individuellement (lignes en erreur ou
+        absentes de la réponse).
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["q"])
+        writer.writerows([address] for address in addresses)
+
+        self._rate_limit()
+        results, failed = [], []
+        with self._observe_request(latency_sample=False) as request, self.client.stream(
+            "POST",
+            f"{self.config.base_url}/search/csv/",
+            files={"data": ("addresses.csv", buffer.getvalue().encode("utf-8"), "text/csv")},
+            data={"columns": "q", "result_columns": CSV_RESULT_COLUMNS + ["latitude", "longitude"]},
+            timeout=GEOCODING_CSV_TIMEOUT,
+        ) as response:
+            request["response"] = response
+            response.raise_for_status()
+            self.stats["requests_made"] += 1
+
+            seen = set()
+            for row in csv.DictReader(response.iter_lines()):
+                seen.add(row.get("q"))
+                # "not-found" est un échec définitif : inutile de réessayer
+                if row.get("result_status") in ("ok", "not-found"):
+                    results.append(self._parse_csv_row(row))
+                else:
+                    failed.append(row["q"])
+
+        failed.extend(a for a in addresses if a not in seen)
+        return results, failed
+
+    def geocode_bulk(
+        self,
+        addresses: list[str],
+        chunk_size: int = GEOCODING_CSV_CHUNK_SIZE
+    ) -> Generator[GeocodingResult, None, None]:
+        """Géocode en masse par fichiers CSV, avec repli adresse par adresse."""
+        if self.cache is not None and self.cache.offline:
+            # Les envois CSV ne sont pas rejoués : requêtes unitaires servies par le
+            # cache, où chaque résultat CSV a été enregistré (`_cache_bulk_results`)
+            yield from self._run_concurrent(self.ageocode_single, addresses)
+            return
+
+        fallback = []
+        valid = []
         for address in addresses:
-            result = self.geocode_single(address)
-            results.append(result)
-            self._rate_limit()
-        return results
-    
+            if address and address.strip():
+                valid.append(address)
+            else:
+                # Comme `geocode_single` : un résultat vide par adresse vide
+                yield GeocodingResult(original_address=address or "", score=0)
+
+        for chunk in batched(valid, chunk_size):
+            try:
+                results, failed = self._geocode_csv_chunk(list(chunk))
+            except Exception as e:
+                self.stats["requests_failed"] += 1
+                results, failed = [], list(chunk)
+            self._cache_bulk_results(results)
+            yield from results
+            fallback.extend(failed)
+
+        if fallback:
+            self.stats["csv_fallbacks"] += len(fallback)
+            yield from self._run_concurrent(self.ageocode_single, fallback)
+
+    def fetch_batch(self, addresses: list[str]) -> list[GeocodingResult]:
+        """Géocode un lot d'adresses (requêtes concurrentes, ordre conservé)."""
+        return list(self._run_concurrent(self.ageocode_single, addresses, ordered=True))
+
     def fetch_all(
-        self, 
-        addresses: list[str], 
-        verbose: bool = True
+        self,
+        addresses: list[str],
+        verbose: bool = True,
+        bulk: bool = True
     ) -> Generator[GeocodingResult, None, None]:
-        """Géocode toutes les adresses."""
+        """Géocode toutes les adresses, résultats produits au fil de l'eau.
+
+        En mode `bulk`, les adresses sont envoyées par lots CSV ; sinon
+        chacune fait l'objet d'une requête `/search/` (concurrentes).
+        """
         from datetime import datetime
-        
+
         self.stats["start_time"] = datetime.now()
-        
-        iterator = tqdm(addresses, desc="Géocodage", disable=not verbose)
-        
-        for address in iterator:
-            result = self.geocode_single(address)
+
+        pbar = tqdm(total=len(addresses), desc="Géocodage", disable=not verbose)
+
+        if bulk:
+            results = self.geocode_bulk(addresses)
+        else:
+            results = self._run_concurrent(self.ageocode_single, addresses)
+
+        for result in results:
             yield result
-            self._rate_limit()
-        
+            pbar.update(1)
+
+        pbar.close()
         self.stats["end_time"] = datetime.now()
-        
+
         if verbose:
-            success = sum(1 for _ in range(self.stats["items_fetched"]))
-            print(f"✅ {self.stats['items_fetched']} adresses géocodées")
\ No newline at end of file
+            print(f"✅ {self.stats['items_fetched']} adresses géocodées")
@@ -1,11 +1,18 @@
 """Classe de base pour les fetchers."""
+import asyncio
+import importlib.util
+import queue
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Generator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Generator, Iterable
 import httpx
 from tenacity import (
-    retry, 
-    stop_after_attempt, 
+    retry,
+    stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
     before_sleep_log
@@ -13,57 +20,332 @@ from tenacity import (
 import logging
 from tqdm import tqdm
 
+from .. import config as pipeline_config
 from ..config import APIConfig
+from ..instrumentation import current_metrics
+from .http_cache import ResponseCache, OfflineCacheMiss
+from .rate_limiter import AdaptiveThrottle, bucket_for
 
 logger = logging.getLogger(__name__)
 
+_log_retry = before_sleep_log(logger, logging.WARNING)
+_backoff = wait_exponential(multiplier=1, min=2, max=30)
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Délai demandé par l'en-tête Retry-After (secondes ou date HTTP)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), pipeline_config.RETRY_AFTER_MAX)
+
+
+def _wait(retry_state) -> float:
+    """Attend le délai de Retry-After s'il est fourni, sinon backoff exponentiel."""
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError):
+        delay = retry_after_seconds(error.response)
+        if delay is not None:
+            return delay
+    return _backoff(retry_state)
+
+
+def _before_retry(retry_state):
+    """Journalise le retry et le compte pour l'API du fetcher."""
+    _log_retry(retry_state)
+    fetcher = retry_state.args[0] if retry_state.args else None
+    if isinstance(fetcher, BaseFetcher):
+        fetcher.stats["retries"] += 1
+        current_metrics().record_retry(fetcher.config.name)
+
+
+# Politique de retry commune aux requêtes synchrones et asynchrones
+RETRY_POLICY = dict(
+    stop=stop_after_attempt(3),
+    wait=_wait,
+    retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
+    before_sleep=_before_retry,
+)
+
+_DONE = object()
+
 
 class BaseFetcher(ABC):
     """Classe abstraite pour les fetchers d'API."""
-    
+
     def __init__(self, config: APIConfig):
         self.config = config
+        self._client: httpx.Client | None = None
+        # Seau partagé entre processus s'il a été installé (runs multi-catégories)
+        self.rate_limiter = bucket_for(config.name, config.rate_limit, config.burst)
+        self.throttle = AdaptiveThrottle(
+            self.rate_limiter,
+            base_rate=1 / config.rate_limit if config.rate_limit > 0 else None,
+            max_rate=config.max_rate,
+            increase=pipeline_config.ADAPTIVE_INCREASE,
+            decrease=pipeline_config.ADAPTIVE_DECREASE,
+            latency_factor=pipeline_config.ADAPTIVE_LATENCY_FACTOR,
+            cooldown=pipeline_config.ADAPTIVE_COOLDOWN,
+            min_factor=pipeline_config.ADAPTIVE_MIN_FACTOR,
+        ) if config.adaptive else None
+        # Mode lu à l'instanciation : la CLI peut le modifier avant le run
+        self.cache = ResponseCache.from_mode(pipeline_config.HTTP_CACHE_MODE, config.name)
         self.stats = {
             "requests_made": 0,
             "requests_failed": 0,
+            "retries": 0,
+            "cache_hits": 0,
+            "cache_revalidated": 0,
             "items_fetched": 0,
             "start_time": None,
             "end_time": None,
         }
-    
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
-        before_sleep=before_sleep_log(logger, logging.WARNING)
-    )
+
+    def _client_options(self) -> dict:
+        """Options communes aux clients HTTP (pool, keep-alive, HTTP/2)."""
+        return {
+            "timeout": self.config.timeout,
+            "headers": self.config.headers,
+            "limits": httpx.Limits(
+                max_connections=max(self.config.max_connections, self.config.max_concurrency),
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            # HTTP/2 nécessite le paquet optionnel `h2` (httpx[http2])
+            "http2": self.config.http2 and importlib.util.find_spec("h2") is not None,
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        """Client HTTP persistant, créé à la première utilisation."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    def close(self):
+        """Ferme le client HTTP et libère les connexions du pool."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _from_cache(self, url: str, params: dict | None) -> tuple[dict | None, bool]:
+        """Consulte le cache HTTP : (entrée, servie directement ?)."""
+        if self.cache is None:
+            return None, False
+        entry = self.cache.lookup(url, params)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.stats["cache_hits"] += 1
+            return entry, True
+        if self.cache.offline:
+            raise OfflineCacheMiss(f"{url} {params}")
+        return entry, False
+
+    def _handle_response(self, url: str, params: dict | None, entry: dict | None, response: httpx.Response):
+        """Traite la réponse : revalidation 304, erreurs, mise en cache."""
+        if entry is not None and response.status_code == 304:
+            self.cache.refresh(url, params, entry)
+            self.stats["cache_revalidated"] += 1
+            return entry["body"]
+
+        response.raise_for_status()
+        self.stats["requests_made"] += 1
+        data = response.json()
+        if self.cache is not None:
+            self.cache.store(url, params, response, data)
+        return data
+
+    @contextmanager
+    def _observe_request(self, latency_sample: bool = True):
+        """Mesure la requête du bloc ; le bloc renseigne `request["response"]`.
+
+        La latence et le statut (ou l'exception) alimentent les métriques du
+        run et le débit adaptatif. `latency_sample=False` pour les requêtes
+        dont la durée ne reflète pas la charge de l'API (lots CSV).
+        """
+        request = {}
+        start = time.perf_counter()
+        try:
+            yield request
+        except Exception as e:
+            request["error"] = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            response = request.get("response")
+            status = response.status_code if response is not None else request.get("error", "inconnu")
+            current_metrics().record_request(self.config.name, seconds, status)
+            if self.throttle is not None:
+                self.throttle.observe(
+                    status, seconds,
+                    retry_after=retry_after_seconds(response) if response is not None else None,
+                    latency_sample=latency_sample,
+                )
+
+    @retry(**RETRY_POLICY)
     def _make_request(self, endpoint: str, params: dict = None) -> dict:
-        """Effectue une requête avec retry automatique."""
+        """Effectue une requête avec retry automatique (et cache HTTP si actif)."""
+        url = f"{self.config.base_url}{endpoint}"
+        entry, cached = self._from_cache(url, params)
+        if cached:
+            return entry["body"]
+
+        self._rate_limit()
+        with self._observe_request() as request:
+            response = self.client.get(url, params=params, headers=ResponseCache.conditional_headers(entry))
+            request["response"] = response
+        return self._handle_response(url, params, entry, response)
+
+    @retry(**RETRY_POLICY)
+    async def _amake_request(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: str,
+        params: dict = None
+    ) -> dict:
+        """Version asynchrone de `_make_request` (même retry, même débit)."""
         url = f"{self.config.base_url}{endpoint}"
-        
-        with httpx.Client(
-            timeout=self.config.timeout,
-            headers=self.config.headers
-        ) as client:
-            response = client.get(url, params=params)
-            response.raise_for_status()
-            self.stats["requests_made"] += 1
-            return response.json()
-    
+        entry, cached = self._from_cache(url, params)
+        if cached:
+            return entry["body"]
+
+        await self.rate_limiter.acquire_async()
+        with self._observe_request() as request:
+            response = await client.get(url, params=params, headers=ResponseCache.conditional_headers(entry))
+            request["response"] = response
+        return self._handle_response(url, params, entry, response)
+
     def _rate_limit(self):
-        """Applique le rate limiting."""
-        time.sleep(self.config.rate_limit)
-    
+        """Applique le rate limiting (seau à jetons partagé)."""
+        self.rate_limiter.acquire()
+
+    def _run_concurrent(
+        self,
+        func: Callable[[httpx.AsyncClient, Any], Awaitable[Any]],
+        items: Iterable,
+        ordered: bool = False,
+        lookahead: int | None = None,
+        workers: int | None = None,
+    ) -> Generator[Any, None, None]:
+        """Exécute `func(client, item)` sur chaque élément de façon concurrente.
+
+        Au plus `config.max_concurrency` appels sont en vol simultanément, le
+        débit étant borné par le seau à jetons. La boucle asyncio tourne dans
+        un thread dédié : le générateur reste utilisable depuis du code
+        synchrone. Les résultats sont produits au fil de l'eau, ou dans l'ordre
+        des éléments si `ordered=True`. Avec `lookahead`, au plus ce nombre de
+        résultats est préchargé en avance sur le consommateur. Fermer le
+        générateur annule les requêtes restantes.
+        """
+        results = queue.Queue()
+        stop = threading.Event()
+        loop = asyncio.new_event_loop()
+        pending = enumerate(items)
+        workers = max(1, workers or self.config.max_concurrency)
+        slots = asyncio.Semaphore(lookahead) if lookahead else None
+        main_task = None
+
+        async def worker(client: httpx.AsyncClient):
+            while not stop.is_set():
+                if slots:
+                    await slots.acquire()
+                # Les workers se partagent le même itérateur (boucle mono-thread)
+                entry = next(pending, None)
+                if entry is None:
+                    return
+                index, item = entry
+                results.put((index, await func(client, item)))
+
+        async def main():
+            async with httpx.AsyncClient(**self._client_options()) as client:
+                tasks = [asyncio.create_task(worker(client)) for _ in range(workers)]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    # Première erreur ou annulation : les autres workers sont
+                    # arrêtés avant la fermeture du client et de la boucle
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+        def release_slot():
+            # Libère une place de préchargement depuis le thread consommateur
+            if slots:
+                try:
+                    loop.call_soon_threadsafe(slots.release)
+                except RuntimeError:
+                    pass  # boucle déjà terminée
+
+        def runner():
+            nonlocal main_task
+            try:
+                main_task = loop.create_task(main())
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                pass
+            except BaseException as e:
+                results.put((None, e))
+            finally:
+                loop.close()
+                results.put(_DONE)
+
+        thread = threading.Thread(target=runner, name=f"{self.config.name}-fetch", daemon=True)
+        thread.start()
+
+        buffer = {}
+        next_index = 0
+        try:
+            while True:
+                entry = results.get()
+                if entry is _DONE:
+                    break
+                index, result = entry
+                if index is None:
+                    raise result
+                if not ordered:
+                    yield result
+                    release_slot()
+                    continue
+                buffer[index] = result
+                while next_index in buffer:
+                    yield buffer.pop(next_index)
+                    release_slot()
+                    next_index += 1
+        finally:
+            stop.set()
+            if thread.is_alive() and main_task is not None:
+                try:
+                    loop.call_soon_threadsafe(main_task.cancel)
+                except RuntimeError:
+                    pass  # boucle déjà terminée
+            thread.join()
+
     @abstractmethod
     def fetch_batch(self, **kwargs) -> list[dict]:
         """Récupère un lot de données. À implémenter."""
         pass
-    
+
     @abstractmethod
     def fetch_all(self, **kwargs) -> Generator[dict, None, None]:
         """Récupère toutes les données avec pagination. À implémenter."""
         pass
-    
+
     def get_stats(self) -> dict:
-        """Retourne les statistiques d'acquisition."""
-        return self.stats.copy()
\ No newline at end of file
+        """Retourne les statistiques d'acquisition (et le débit adaptatif)."""
+        stats = self.stats.copy()
+        if self.throttle is not None:
+            stats["rate"] = self.throttle.get_stats()
+        return stats
@@ -0,0 +1,99 @@
+"""Cache disque des réponses HTTP des fetchers (revalidation et rejeu hors-ligne)."""
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+import httpx
+
+from ..config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_AGE
+
+
+class OfflineCacheMiss(Exception):
+    """Requête absente du cache alors que le mode hors-ligne est actif."""
+
+
+class ResponseCache:
+    """Cache des corps de réponse JSON, indexé par URL et paramètres.
+
+    Une entrée plus jeune que `max_age` est servie directement ; au-delà,
+    elle est revalidée par une requête conditionnelle (If-None-Match /
+    If-Modified-Since) et un 304 la prolonge. En mode `offline`, seules
+    les entrées du cache sont servies, quel que soit leur âge.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        directory: str | Path = HTTP_CACHE_DIR,
+        max_age: float = HTTP_CACHE_MAX_AGE,
+        offline: bool = False,
+    ):
+        slug = re.sub(r"[^0-9a-z]+", "_", namespace.lower()).strip("_")
+        self.directory = Path(directory) / slug
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.offline = offline
+
+    @classmethod
+    def from_mode(cls, mode: str, namespace: str) -> 'ResponseCache | None':
+        """Crée le cache correspondant à un mode "off", "on" ou "offline"."""
+        if mode == "off":
+            return None
+        if mode not in ("on", "offline"):
+            raise ValueError(f"Mode de cache HTTP inconnu : {mode}")
+        return cls(namespace, offline=mode == "offline")
+
+    def _path(self, url: str, params: dict | None) -> Path:
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def lookup(self, url: str, params: dict | None) -> dict | None:
+        """Retourne l'entrée en cache (ou None)."""
+        path = self._path(url, params)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def is_fresh(self, entry: dict) -> bool:
+        """L'entrée peut-elle être servie sans revalidation ?"""
+        return self.offline or time.time() - entry["stored_at"] < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        """En-têtes de revalidation pour une entrée existante."""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _write(self, url: str, params: dict | None, entry: dict):
+        path = self._path(url, params)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def store(self, url: str, params: dict | None, response: httpx.Response | None, body):
+        """Enregistre une réponse 200 et ses validateurs.
+
+        Sans `response` (corps reconstruit d'une autre requête), l'entrée
+        n'a pas de validateurs : une fois périmée, elle est redemandée.
+        """
+        headers = response.headers if response is not None else {}
+        self._write(url, params, {
+            "url": url,
+            "params": params,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "body": body,
+        })
+
+    def refresh(self, url: str, params: dict | None, entry: dict):
+        """Prolonge une entrée revalidée (réponse 304)."""
+        self._write(url, params, {**entry, "stored_at": time.time()})
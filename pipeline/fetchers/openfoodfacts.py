@@ -1,9 +1,19 @@
 """Fetcher pour l'API OpenFoodFacts."""
+import math
+from contextlib import closing
 from typing import Generator
+import httpx
 from tqdm import tqdm
 
 from .base import BaseFetcher
-from ..config import OPENFOODFACTS_CONFIG, MAX_ITEMS, BATCH_SIZE
+from ..checkpoint import FetchCheckpoint
+from ..config import (
+    OPENFOODFACTS_CONFIG,
+    MAX_ITEMS,
+    BATCH_SIZE,
+    OFF_MAX_PAGE_SIZE,
+    OFF_PREFETCH_PAGES,
+)
 from ..models import Product
 
 
@@ -15,20 +25,64 @@ class OpenFoodFactsFetcher(BaseFetcher):
         self.fields = [
             "code", "product_name", "brands", "categories",
             "nutriscore_grade", "nova_group", "energy_100g",
-            "sugars_100g", "fat_100g", "salt_100g", "stores"
+            "sugars_100g", "fat_100g", "salt_100g", "stores",
+            "last_modified_t"
         ]
+        self.stats["total_available"] = None
     
-    def fetch_batch(self, category: str, page: int = 1, page_size: int = BATCH_SIZE) -> list[dict]:
-        """Récupère une page de produits."""
+    def _search_params(
+        self,
+        category: str,
+        page: int,
+        page_size: int,
+        sort_by: str = None
+    ) -> dict:
+        """Paramètres de la requête `/search` pour une page."""
         params = {
             "categories_tags": category,
             "page": page,
             "page_size": page_size,
             "fields": ",".join(self.fields)
         }
-        
+        if sort_by:
+            params["sort_by"] = sort_by
+        return params
+
+    def fetch_batch(
+        self,
+        category: str,
+        page: int = 1,
+        page_size: int = BATCH_SIZE,
+        sort_by: str = None
+    ) -> list[dict]:
+        """Récupère une page de produits."""
+        params = self._search_params(category, page, page_size, sort_by)
+
         try:
             data = self._make_request("/search", params)
+            self.stats["total_available"] = data.get("count", self.stats["total_available"])
+            products = data.get("products", [])
+            self.stats["items_fetched"] += len(products)
+            return products
+        except Exception as e:
+            self.stats["requests_failed"] += 1
+            print(f"⚠️ Erreur page {page}: {e}")
+            return []
+
+    async def afetch_batch(
+        self,
+        client: httpx.AsyncClient,
+        category: str,
+        page: int = 1,
+        page_size: int = BATCH_SIZE,
+        sort_by: str = None
+    ) -> list[dict]:
+        """Récupère une page de produits (version asynchrone)."""
+        params = self._search_params(category, page, page_size, sort_by)
+
+        try:
+            data = await self._amake_request(client, "/search", params)
+            self.stats["total_available"] = data.get("count", self.stats["total_available"])
             products = data.get("products", [])
             self.stats["items_fetched"] += len(products)
             return products
@@ -37,44 +91,114 @@ class OpenFoodFactsFetcher(BaseFetcher):
             print(f"⚠️ Erreur page {page}: {e}")
             return []
     
+    def _choose_page_size(self, max_items: int, workers: int) -> int:
+        """Choisit une taille de page adaptée au volume demandé.
+
+        Petit volume : une seule requête. Gros volume : pages aussi grandes
+        que possible, en gardant au moins deux pages par worker.
+        """
+        if max_items <= BATCH_SIZE:
+            return max(1, max_items)
+        return min(OFF_MAX_PAGE_SIZE, max(BATCH_SIZE, math.ceil(max_items / (2 * workers))))
+
     def fetch_all(
-        self, 
-        category: str, 
+        self,
+        category: str,
         max_items: int = MAX_ITEMS,
-        verbose: bool = True
+        verbose: bool = True,
+        workers: int = None,
+        prefetch: int = OFF_PREFETCH_PAGES,
+        modified_since: int = None,
+        checkpoint: FetchCheckpoint = None
     ) -> Generator[dict, None, None]:
-        """Récupère tous les produits avec pagination."""
+        """Récupère tous les produits avec pagination.
+
+        La première page indique le nombre de produits disponibles. Les
+        pages suivantes sont réparties entre `workers` qui puisent dans une
+        file commune, jusqu'à `prefetch` pages étant préchargées pendant que
+        la page courante est consommée.
+
+        Avec `modified_since` (timestamp Unix), les produits sont parcourus
+        du plus récemment modifié au plus ancien et le crawl s'arrête au
+        premier produit non modifié depuis cette date.
+
+        Avec `checkpoint`, chaque page consommée y est enregistrée ; si le
+        point de reprise contient déjà des pages, leurs produits sont
+        relus puis le crawl reprend à la page suivante (même taille de
+        page). Le crawl n'est marqué terminé que si aucune page n'a échoué.
+        """
         from datetime import datetime
-        
+
         self.stats["start_time"] = datetime.now()
-        page = 1
         total_fetched = 0
-        
+
+        # Taille de page constante sur tout le crawl : les offsets
+        # `page * page_size` restent cohérents, la dernière page est tronquée.
+        workers = workers or self.config.max_concurrency
+        page_size = self._choose_page_size(max_items, workers)
+        sort_by = "last_modified_t" if modified_since is not None else None
+        start_page = 1
+        if checkpoint is not None:
+            page_size = checkpoint.state.page_size or page_size
+            checkpoint.state.page_size = page_size
+            start_page = checkpoint.state.last_page + 1
+
+        async def fetch_page(client, page):
+            return await self.afetch_batch(client, category, page, page_size, sort_by)
+
+        def crawl():
+            first = self.fetch_batch(category, start_page, page_size, sort_by)
+            yield first
+            if len(first) < page_size:
+                return
+
+            available = self.stats["total_available"] or max_items
+            last_page = math.ceil(min(available, max_items) / page_size)
+            yield from self._run_concurrent(
+                fetch_page,
+                range(start_page + 1, last_page + 1),
+                ordered=True,
+                lookahead=prefetch,
+                workers=workers,
+            )
+
         pbar = tqdm(total=max_items, desc=f"OpenFoodFacts [{category}]", disable=not verbose)
-        
-        while total_fetched < max_items:
-            remaining = max_items - total_fetched
-            page_size = min(BATCH_SIZE, remaining)
-            
-            products = self.fetch_batch(category, page, page_size)
-            
-            if not products:
-                break
-            
-            for product in products:
+
+        if checkpoint is not None:
+            for product in checkpoint.records():
                 yield product
                 total_fetched += 1
                 pbar.update(1)
-                
-                if total_fetched >= max_items:
+            if checkpoint.state.complete or total_fetched >= max_items:
+                pbar.close()
+                self.stats["end_time"] = datetime.now()
+                return
+        failed_before = self.stats["requests_failed"]
+
+        with closing(crawl()) as batches:
+            unchanged_reached = False
+            for page, products in enumerate(batches, start_page):
+                consumed = []
+                for product in products[:max_items - total_fetched]:
+                    if modified_since is not None and (product.get("last_modified_t") or 0) <= modified_since:
+                        unchanged_reached = True
+                        break
+                    yield product
+                    consumed.append(product)
+                    total_fetched += 1
+                    pbar.update(1)
+
+                if checkpoint is not None and products:
+                    checkpoint.page_done(page, consumed)
+                if unchanged_reached or total_fetched >= max_items or len(products) < page_size:
                     break
-            
-            page += 1
-            self._rate_limit()
-        
+
+        if checkpoint is not None and self.stats["requests_failed"] == failed_before:
+            checkpoint.finish()
+
         pbar.close()
         self.stats["end_time"] = datetime.now()
-        
+
         if verbose:
-            duration = (self.stats["end_time"] - self.stats["start_time"]).seconds
-            print(f"✅ {total_fetched} produits récupérés en {duration}s")
\ No newline at end of file
+            duration = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
+            print(f"✅ {total_fetched} produits récupérés en {duration:.1f}s")
@@ -0,0 +1,271 @@
+"""Limitation de débit par seau à jetons (token bucket)."""
+import asyncio
+import math
+import multiprocessing
+import threading
+import time
+
+
+class TokenBucket:
+    """Seau à jetons utilisable depuis des threads et des coroutines.
+
+    `rate` jetons sont ajoutés par seconde, dans la limite de `capacity`
+    (taille des rafales autorisées). Chaque requête consomme un jeton ;
+    quand le seau est vide, l'appelant attend le prochain jeton.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate  # jetons par seconde
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._last_decrease = -math.inf  # dernière baisse de `AdaptiveThrottle`
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_interval(cls, interval: float, capacity: float = 1.0) -> 'TokenBucket':
+        """Crée un seau à partir d'un délai minimal entre requêtes (secondes)."""
+        rate = 1 / interval if interval > 0 else math.inf
+        return cls(rate, capacity)
+
+    def _reserve(self) -> float:
+        """Réserve un jeton et retourne le délai d'attente associé."""
+        if math.isinf(self.rate):
+            # Seule une pause (Retry-After) retarde un débit illimité
+            return max(0.0, self._updated - time.monotonic())
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            # Le solde peut devenir négatif : les appelants suivants
+            # attendent alors leur tour dans l'ordre de réservation.
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _set_rate(self, rate: float):
+        # Appelé verrou tenu : les jetons accumulés au débit courant sont conservés
+        now = time.monotonic()
+        if not math.isinf(self.rate) and now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        self.rate = rate
+
+    def set_rate(self, rate: float):
+        """Change le débit ; les jetons accumulés jusqu'ici sont conservés."""
+        with self._lock:
+            self._set_rate(rate)
+
+    def increase_rate(self, per_second: float, ceiling: float, cooldown: float) -> bool:
+        """Hausse additive pour une réponse saine (False si aucune).
+
+        `per_second` est la hausse visée par seconde au débit courant (une
+        réponse toutes les 1/rate secondes). Pas de hausse pendant
+        `cooldown` secondes après une baisse.
+        """
+        with self._lock:
+            if self.rate >= ceiling or time.monotonic() - self._last_decrease < cooldown:
+                return False
+            self._set_rate(min(ceiling, self.rate + per_second / self.rate))
+            return True
+
+    def decrease_rate(self, factor: float, floor: float, cooldown: float) -> bool:
+        """Baisse multiplicative, au plus une fois par `cooldown` secondes (False sinon)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < cooldown:
+                return False
+            self._last_decrease = now
+            self._set_rate(max(floor, self.rate * factor))
+            return True
+
+    def pause(self, seconds: float):
+        """Ne délivre plus de jeton avant `seconds` (en-tête Retry-After).
+
+        Le seau est daté dans le futur avec un seul jeton : la prochaine
+        réservation attend la fin de la pause, les suivantes le débit.
+        """
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._updated:
+                self._updated = until
+                self._tokens = min(self._tokens, 1.0)
+
+    def acquire(self):
+        """Attend (bloquant) qu'un jeton soit disponible."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Attend (sans bloquer la boucle asyncio) qu'un jeton soit disponible."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SharedTokenBucket(TokenBucket):
+    """Seau à jetons partagé entre processus.
+
+    Le solde, la date de mise à jour, le débit et la date de la dernière
+    baisse vivent en mémoire partagée, protégés par un verrou
+    inter-processus : tous les processus qui reçoivent le seau (via
+    l'initialiseur d'un pool) respectent un même débit global. Les
+    `AdaptiveThrottle` de chaque processus ajustent ce débit de façon
+    atomique et partagent le délai entre deux baisses.
+    `time.monotonic` est commun aux processus d'une même machine.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, context=None):
+        context = context or multiprocessing.get_context()
+        self._state = context.Array("d", 4)
+        super().__init__(rate, capacity)
+        self._lock = self._state.get_lock()
+
+    @property
+    def rate(self) -> float:
+        return self._state[2]
+
+    @rate.setter
+    def rate(self, value: float):
+        self._state[2] = value
+
+    @property
+    def _tokens(self) -> float:
+        return self._state[0]
+
+    @_tokens.setter
+    def _tokens(self, value: float):
+        self._state[0] = value
+
+    @property
+    def _updated(self) -> float:
+        return self._state[1]
+
+    @_updated.setter
+    def _updated(self, value: float):
+        self._state[1] = value
+
+    @property
+    def _last_decrease(self) -> float:
+        return self._state[3]
+
+    @_last_decrease.setter
+    def _last_decrease(self, value: float):
+        self._state[3] = value
+
+    @classmethod
+    def from_interval(cls, interval: float, capacity: float = 1.0, context=None) -> 'SharedTokenBucket':
+        rate = 1 / interval if interval > 0 else math.inf
+        return cls(rate, capacity, context)
+
+
+class AdaptiveThrottle:
+    """Ajuste le débit d'un seau à jetons d'après les réponses de l'API (AIMD).
+
+    Tant que les réponses sont saines, le débit augmente de façon additive
+    (`increase` fois le débit de base par seconde). Un 429 / 503, un
+    timeout ou une latence qui dépasse `latency_factor` fois la latence de
+    référence le multiplient par `decrease`, au plus une fois par
+    `cooldown` secondes : les réponses d'une même rafale ne comptent qu'une
+    fois, et le débit ne remonte pas avant la fin de ce délai. Le débit
+    reste entre `min_factor` fois le débit de base et `max_rate`. Un
+    en-tête Retry-After suspend le seau pour la durée demandée. Sans
+    limite de débit (`base_rate` infini), seul Retry-After est appliqué.
+
+    L'état AIMD (débit, dernière baisse) est celui du seau : avec un
+    `SharedTokenBucket`, les throttles des différents processus ajustent
+    un même débit, sans dépasser `max_rate` ni multiplier les baisses.
+    """
+
+    THROTTLED = {429, 503}
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        base_rate: float | None = None,
+        max_rate: float | None = None,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        latency_factor: float = 2.0,
+        cooldown: float = 1.0,
+        min_factor: float = 0.1,
+    ):
+        self.bucket = bucket
+        self.base_rate = base_rate or bucket.rate
+        self.enabled = not math.isinf(self.base_rate)
+        self.max_rate = max_rate or math.inf
+        self.min_rate = self.base_rate * min_factor
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.latency = None   # moyenne mobile rapide
+        self.baseline = None  # latence de référence (moyenne lente, plafonnée par la rapide)
+        self._lock = threading.Lock()
+        self.stats = {"increases": 0, "decreases": 0, "retry_after_seconds": 0.0}
+
+    def _observe_latency(self, seconds: float) -> bool:
+        """Met à jour les moyennes ; True si la latence a nettement augmenté."""
+        if self.latency is None:
+            self.latency = self.baseline = seconds
+            return False
+        self.latency += 0.2 * (seconds - self.latency)
+        self.baseline = min(self.latency, self.baseline + 0.02 * (self.latency - self.baseline))
+        return self.latency > self.latency_factor * self.baseline
+
+    def observe(
+        self,
+        status: int | str,
+        seconds: float,
+        retry_after: float | None = None,
+        latency_sample: bool = True,
+    ):
+        """Prend en compte une réponse (statut, ou nom de l'exception levée)."""
+        if retry_after:
+            self.bucket.pause(retry_after)
+            self.stats["retry_after_seconds"] += retry_after
+        if not self.enabled:
+            return
+
+        with self._lock:
+            throttled = status in self.THROTTLED or "Timeout" in str(status)
+            healthy = isinstance(status, int) and status < 400
+            slow = healthy and latency_sample and self._observe_latency(seconds)
+
+            if throttled or slow:
+                if self.bucket.decrease_rate(self.decrease, self.min_rate, self.cooldown):
+                    self.stats["decreases"] += 1
+            elif healthy:
+                # +increase × base par seconde, quel que soit le nombre de processus
+                if self.bucket.increase_rate(self.increase * self.base_rate, self.max_rate, self.cooldown):
+                    self.stats["increases"] += 1
+
+    def get_stats(self) -> dict:
+        def finite(rate: float) -> float | None:
+            return None if math.isinf(rate) else round(rate, 3)
+
+        return {
+            **self.stats,
+            "base_rate": finite(self.base_rate),
+            "current_rate": finite(self.bucket.rate),
+            "latency_seconds": round(self.latency, 4) if self.latency is not None else None,
+        }
+
+
+# Seaux partagés installés dans ce processus, par nom d'API
+_shared_buckets: dict[str, TokenBucket] = {}
+
+
+def install_shared_buckets(buckets: dict[str, TokenBucket]):
+    """Fait utiliser ces seaux par les fetchers créés ensuite dans ce processus."""
+    _shared_buckets.clear()
+    _shared_buckets.update(buckets)
+
+
+def bucket_for(name: str, interval: float, capacity: float = 1.0) -> TokenBucket:
+    """Seau partagé installé pour l'API `name`, sinon un seau propre au fetcher."""
+    return _shared_buckets.get(name) or TokenBucket.from_interval(interval, capacity)
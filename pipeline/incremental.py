@@ -0,0 +1,59 @@
+"""Runs incrémentaux : ne traiter que les produits nouveaux ou modifiés."""
+import pandas as pd
+
+from .config import STATE_DIR
+from .models import RunState
+
+
+def _state_path(category: str):
+    return STATE_DIR / f"{category}.json"
+
+
+def load_state(category: str) -> RunState | None:
+    """Charge l'état du dernier run réussi (None si aucun)."""
+    path = _state_path(category)
+    if not path.exists():
+        return None
+    return RunState.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def save_state(state: RunState):
+    """Enregistre l'état du run (écriture atomique)."""
+    path = _state_path(state.category)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(state.model_dump_json(indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def max_last_modified(df: pd.DataFrame, default: int | None = None) -> int | None:
+    """Plus récent `last_modified_t` du DataFrame."""
+    if "last_modified_t" not in df.columns:
+        return default
+    value = pd.to_numeric(df["last_modified_t"], errors="coerce").max()
+    if pd.isna(value):
+        return default
+    return int(value) if default is None else max(int(value), default)
+
+
+def filter_changed(products: list[dict], existing: pd.DataFrame | None) -> list[dict]:
+    """Ne garde que les produits absents du dataset ou modifiés depuis."""
+    if existing is None or existing.empty or "last_modified_t" not in existing.columns:
+        return products
+
+    known = dict(zip(
+        existing["code"].astype(str),
+        pd.to_numeric(existing["last_modified_t"], errors="coerce").fillna(0),
+    ))
+    return [
+        p for p in products
+        if str(p.get("code")) not in known
+        or (p.get("last_modified_t") or 0) > known[str(p.get("code"))]
+    ]
+
+
+def merge_delta(existing: pd.DataFrame, delta: pd.DataFrame, key: str = "code") -> pd.DataFrame:
+    """Fusionne le delta dans le dataset existant (le delta remplace par `key`)."""
+    existing = existing.assign(**{key: existing[key].astype(str)})
+    delta = delta.assign(**{key: delta[key].astype(str)})
+    kept = existing[~existing[key].isin(delta[key])]
+    return pd.concat([kept, delta], ignore_index=True)
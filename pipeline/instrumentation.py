@@ -0,0 +1,246 @@
+"""Instrumentation d'un run : étapes, requêtes HTTP, transformations.
+
+Un `RunMetrics` est activé pour la durée d'un run ; les fetchers et le
+pipeline y enregistrent leurs mesures via `current_metrics()`. Le tout
+s'exporte en JSON et au format texte Prometheus.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Bornes des histogrammes de latence (secondes), comme les buckets Prometheus
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def _reset_peak_rss() -> bool:
+    """Remet à zéro le pic RSS du processus (Linux uniquement)."""
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> int:
+    """Pic RSS depuis la dernière remise à zéro (sinon depuis le démarrage)."""
+    try:
+        match = re.search(r"VmHWM:\s+(\d+) kB", _PROC_STATUS.read_text())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (sémantique Prometheus)."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+            "count": self.count,
+            "sum": round(self.sum, 6),
+        }
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class RunMetrics:
+    """Mesures d'un run du pipeline.
+
+    - `stages` : durée murale, temps CPU et pic RSS par étape (une étape
+      répétée, par exemple une fois par morceau en streaming, est cumulée)
+    - `requests` : histogramme de latence, nombre de requêtes par statut
+      et nombre de retries, par API
+    - `transformations` : lignes en entrée / sortie de chaque étape du
+      `DataTransformer`
+    """
+
+    def __init__(self, run: str = "pipeline"):
+        self.run = run
+        self.stages: dict[str, dict] = {}
+        self.latency: dict[str, Histogram] = {}
+        self.status_counts: dict[str, dict[str, int]] = {}
+        self.retries: dict[str, int] = {}
+        self.transformations: dict[tuple[int, str], dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mesure le bloc comme (une partie de) l'étape `name`.
+
+        Les requêtes HTTP faites dans le bloc sont enregistrées dans ce run.
+        """
+        _reset_peak_rss()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with activate(self):
+                yield
+        finally:
+            record = self.stages.setdefault(
+                name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_bytes": 0, "calls": 0}
+            )
+            record["wall_seconds"] += time.perf_counter() - wall
+            record["cpu_seconds"] += time.process_time() - cpu
+            record["peak_rss_bytes"] = max(record["peak_rss_bytes"], _peak_rss_bytes())
+            record["calls"] += 1
+
+    def timed(self, name: str, iterable: Iterable) -> Iterator:
+        """Itère en comptant l'attente de chaque élément dans l'étape `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_request(self, api: str, seconds: float, status: int | str):
+        """Enregistre une requête HTTP (statut, ou nom de l'exception)."""
+        with self._lock:
+            self.latency.setdefault(api, Histogram()).observe(seconds)
+            counts = self.status_counts.setdefault(api, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def record_retry(self, api: str):
+        with self._lock:
+            self.retries[api] = self.retries.get(api, 0) + 1
+
+    def record_transformations(self, steps: list[dict]):
+        """Cumule les lignes traitées par étape de transformation."""
+        for position, step in enumerate(steps):
+            record = self.transformations.setdefault(
+                (position, step["step"]), {"rows_in": 0, "rows_out": 0, "seconds": 0.0}
+            )
+            record["rows_in"] += step["rows_in"]
+            record["rows_out"] += step["rows_out"]
+            record["seconds"] += step["seconds"]
+
+    def to_dict(self) -> dict:
+        return {
+            "run": self.run,
+            "stages": {
+                name: {**record, "wall_seconds": round(record["wall_seconds"], 6),
+                       "cpu_seconds": round(record["cpu_seconds"], 6)}
+                for name, record in self.stages.items()
+            },
+            "requests": {
+                api: {
+                    "latency_seconds": self.latency.get(api, Histogram()).to_dict(),
+                    "status": dict(self.status_counts.get(api, {})),
+                    "retries": self.retries.get(api, 0),
+                }
+                for api in sorted(set(self.latency) | set(self.retries))
+            },
+            "transformations": [
+                {"position": position, "step": step, **record, "seconds": round(record["seconds"], 6)}
+                for (position, step), record in sorted(self.transformations.items())
+            ],
+        }
+
+    def to_prometheus(self) -> str:
+        """Export au format texte Prometheus (exposition 0.0.4)."""
+        run = self.run
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, str, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample_name}{labels} {value}" for sample_name, labels, value in samples)
+
+        stages = self.stages.items()
+        metric("pipeline_stage_wall_seconds", "gauge", "Durée murale par étape.",
+               [("pipeline_stage_wall_seconds", _labels(run=run, stage=s), r["wall_seconds"]) for s, r in stages])
+        metric("pipeline_stage_cpu_seconds", "gauge", "Temps CPU par étape.",
+               [("pipeline_stage_cpu_seconds", _labels(run=run, stage=s), r["cpu_seconds"]) for s, r in stages])
+        metric("pipeline_stage_peak_rss_bytes", "gauge", "Pic RSS pendant l'étape.",
+               [("pipeline_stage_peak_rss_bytes", _labels(run=run, stage=s), r["peak_rss_bytes"]) for s, r in stages])
+
+        samples = []
+        for api, histogram in self.latency.items():
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                samples.append(("pipeline_request_duration_seconds_bucket", _labels(run=run, api=api, le=bound), count))
+            samples.append(("pipeline_request_duration_seconds_bucket", _labels(run=run, api=api, le="+Inf"), histogram.count))
+            samples.append(("pipeline_request_duration_seconds_sum", _labels(run=run, api=api), round(histogram.sum, 6)))
+            samples.append(("pipeline_request_duration_seconds_count", _labels(run=run, api=api), histogram.count))
+        metric("pipeline_request_duration_seconds", "histogram", "Latence des requêtes HTTP par API.", samples)
+
+        metric("pipeline_requests_total", "counter", "Requêtes HTTP par API et statut.", [
+            ("pipeline_requests_total", _labels(run=run, api=api, status=status), count)
+            for api, counts in self.status_counts.items() for status, count in counts.items()
+        ])
+        metric("pipeline_request_retries_total", "counter", "Retries par API.", [
+            ("pipeline_request_retries_total", _labels(run=run, api=api), count)
+            for api, count in self.retries.items()
+        ])
+
+        transformations = sorted(self.transformations.items())
+        for column in ("rows_in", "rows_out"):
+            name = f"pipeline_transformation_{column}"
+            metric(name, "gauge", f"Lignes ({column}) par étape de transformation.", [
+                (name, _labels(run=run, position=position, step=step), record[column])
+                for (position, step), record in transformations
+            ])
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Path, name: str) -> tuple[Path, Path]:
+        """Écrit `<name>.json` et `<name>.prom` dans `directory`."""
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / f"{name}.json"
+        prom_path = directory / f"{name}.prom"
+        json_path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+        prom_path.write_text(self.to_prometheus(), encoding="utf-8")
+        return json_path, prom_path
+
+
+# Mesures du run en cours (partagées par les threads du processus)
+_current = RunMetrics()
+
+
+def current_metrics() -> RunMetrics:
+    return _current
+
+
+@contextmanager
+def activate(metrics: RunMetrics):
+    """Fait de `metrics` la cible des mesures pendant le bloc."""
+    global _current
+    previous, _current = _current, metrics
+    try:
+        yield metrics
+    finally:
+        _current = previous
@@ -1,29 +1,153 @@
-"""Module pour recommandations IA locales avec GPT4All."""
+"""Modèle GPT4All local, chargé à la première utilisation et réutilisé.
+
+Le modèle n'est ni téléchargé ni chargé à l'import : `get_local_llm()`
+retourne une instance par processus, chargée au premier appel puis gardée
+en mémoire. Les runs multi-catégories génèrent toutes leurs recommandations
+en un lot, sur une instance hébergée par un processus dédié (`LLMManager`) ;
+`install_shared_llm` fait partager une telle instance aux workers d'un pool.
+"""
 import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
 from pathlib import Path
-from gpt4all import GPT4All
+from typing import Callable
+
+from .config import LLM_MAX_TOKENS, LLM_TIMEOUT
+
+MODEL_URL = "https://gpt4all.io/models/ggml-gpt4all-j-v1.3-groovy.bin"
+
+
+def _load_gpt4all(model_path: Path):
+    from gpt4all import GPT4All
+
+    return GPT4All(str(model_path), allow_download=False)
+
+
+class LocalLLM:
+    """Modèle local chargé paresseusement, partagé par les threads du processus.
+
+    Le chargement a lieu au premier `generate` ; les appels suivants
+    réutilisent le modèle. Une génération est bornée en tokens
+    (`max_tokens`) et en durée (`timeout` secondes, la réponse est alors
+    tronquée). GPT4All n'étant pas thread-safe, les générations sont
+    sérialisées.
+    """
+
+    def __init__(self, model_path: str | Path, loader: Callable = _load_gpt4all):
+        self.model_path = Path(model_path)
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "load_seconds": 0.0, "generations": 0, "timeouts": 0}
+
+    def _ensure_loaded(self):
+        if self._model is None:
+            start = time.perf_counter()
+            self._model = self._loader(self.model_path)
+            self.stats["loads"] += 1
+            self.stats["load_seconds"] += time.perf_counter() - start
+
+    def _generate(self, prompt: str, max_tokens: int, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+
+        def within_deadline(token_id, token) -> bool:
+            return time.monotonic() < deadline
+
+        response = self._model.generate(prompt, max_tokens=max_tokens, callback=within_deadline)
+        self.stats["generations"] += 1
+        if time.monotonic() >= deadline:
+            self.stats["timeouts"] += 1
+        return response
+
+    def generate(self, prompt: str, max_tokens: int = LLM_MAX_TOKENS, timeout: float = LLM_TIMEOUT) -> str:
+        """Génère une réponse (le modèle est chargé au premier appel)."""
+        return self.generate_many([prompt], max_tokens, timeout)[0]
 
-# Récupération du chemin du modèle depuis le .env ou dossier local par défaut
-MODEL_PATH = os.getenv("GPT4ALL_MODEL_PATH", Path(__file__).parent / "models" / "ggml-gpt4all-j-v1.3-groovy.bin")
+    def generate_many(
+        self,
+        prompts: list[str],
+        max_tokens: int = LLM_MAX_TOKENS,
+        timeout: float = LLM_TIMEOUT
+    ) -> list[str]:
+        """Génère les réponses d'un lot de prompts avec le modèle chargé.
 
-# Téléchargement automatique si le fichier modèle est manquant
-if not Path(MODEL_PATH).exists():
+        Le lot est traité d'une traite : les autres appelants attendent la
+        fin du lot plutôt que de s'intercaler. `timeout` s'applique à
+        chaque prompt.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [self._generate(prompt, max_tokens, timeout) for prompt in prompts]
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+    def close(self):
+        """Libère le modèle ; il sera rechargé au prochain appel."""
+        with self._lock:
+            if self._model is not None and hasattr(self._model, "close"):
+                self._model.close()
+            self._model = None
+
+
+class LLMManager(BaseManager):
+    """Processus hébergeant un `LocalLLM` partagé par les workers d'un pool."""
+
+
+LLMManager.register("LocalLLM", LocalLLM, exposed=["generate", "generate_many", "get_stats", "close"])
+
+# Instance du processus (chargée au premier appel) ou proxy installé par le pool
+_instance = None
+_shared = None
+
+
+def install_shared_llm(llm):
+    """Fait utiliser `llm` (proxy d'un `LLMManager`) par ce processus."""
+    global _shared
+    _shared = llm
+
+
+def model_path() -> Path | None:
+    """Chemin du modèle (`GPT4ALL_MODEL_PATH`), s'il existe."""
+    path = os.getenv("GPT4ALL_MODEL_PATH")
+    return Path(path) if path and Path(path).exists() else None
+
+
+def get_local_llm() -> LocalLLM | None:
+    """Modèle partagé installé, sinon l'instance du processus (None sans modèle)."""
+    global _instance
+    if _shared is not None:
+        return _shared
+    path = model_path()
+    if path is None:
+        return None
+    if _instance is None or _instance.model_path != path:
+        _instance = LocalLLM(path)
+    return _instance
+
+
+def download_model(destination: str | Path, url: str = MODEL_URL) -> Path:
+    """Télécharge un modèle GPT4All (appel explicite, jamais à l'import)."""
     import requests
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    url = "https://gpt4all.io/models/ggml-gpt4all-j-v1.3-groovy.bin"  # lien officiel
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
     print(f"📥 Téléchargement du modèle GPT4All depuis {url} ...")
-    r = requests.get(url, stream=True)
-    with open(MODEL_PATH, "wb") as f:
-        for chunk in r.iter_content(chunk_size=8192):
-            f.write(chunk)
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+        with open(destination, "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                f.write(chunk)
     print("✅ Modèle GPT4All téléchargé.")
+    return destination
 
-# Chargement du modèle GPT4All
-llm = GPT4All(str(MODEL_PATH), verbose=True)
 
 def generate_recommendations(prompt: str, n: int = 5) -> str:
     """
     Génère des recommandations locales à partir du prompt.
     """
-    response = llm.generate(prompt, max_tokens=512)
-    return response
+    llm = get_local_llm()
+    if llm is None:
+        raise RuntimeError("Modèle local GPT4All manquant (GPT4ALL_MODEL_PATH)")
+    return llm.generate(prompt)
@@ -1,27 +1,118 @@
 #!/usr/bin/env python3
 """Script principal du pipeline."""
 import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from itertools import batched
+from pathlib import Path
+from typing import Optional
 import pandas as pd
 
 from .fetchers.openfoodfacts import OpenFoodFactsFetcher
-from .enricher import DataEnricher
+from .fetchers.rate_limiter import SharedTokenBucket, install_shared_buckets
+from .local_llm import LLMManager, model_path
+from .enricher import DataEnricher, GEOCODING_FIELDS
+from .dedup import SeenCodes
 from .transformer import DataTransformer
-from .quality import QualityAnalyzer
-from .storage import save_raw_json, save_parquet
-from .config import MAX_ITEMS
+from .quality import QualityAnalyzer, QualityAccumulator
+from .storage import save_parquet, load_parquet, RawArchiveWriter, ParquetChunkWriter
+from .checkpoint import FetchCheckpoint
+from .incremental import load_state, save_state, filter_changed, merge_delta, max_last_modified
+from .models import Product, QualityMetrics, RunState
+from .validation import ProductValidator
+from .instrumentation import RunMetrics
+from . import config
+from .config import MAX_ITEMS, CATEGORY_WORKERS, REPORTS_DIR, OPENFOODFACTS_CONFIG, ADRESSE_CONFIG
+
+# Champs numériques du modèle Product (float ou int optionnels)
+NUMERIC_FIELDS = [
+    name for name, field in Product.model_fields.items()
+    if field.annotation in (Optional[float], Optional[int])
+]
+
+
+def transform(
+    df: pd.DataFrame,
+    copy: bool = True,
+    near_duplicates: bool = False,
+    compact: bool = False
+) -> tuple[pd.DataFrame, DataTransformer]:
+    """Applique la chaîne de transformations standard du pipeline."""
+    transformer = DataTransformer(df, copy=copy, lazy=True).remove_duplicates()
+    if near_duplicates:
+        transformer.remove_near_duplicates()
+    (
+        transformer
+        .handle_missing_values(
+            numeric_strategy='median',
+            text_strategy='unknown'
+        )
+        .normalize_text_columns(['brands', 'categories'])
+        .add_derived_columns()
+    )
+    if compact:
+        transformer.compact_dtypes()
+    return transformer.get_result(), transformer
 
 
 def run_pipeline(
     category: str,
     max_items: int = MAX_ITEMS,
     skip_enrichment: bool = False,
-    verbose: bool = True
+    verbose: bool = True,
+    chunk_size: int = None,
+    incremental: bool = False,
+    partitioned: bool = False,
+    near_duplicates: bool = False,
+    compact_dtypes: bool = False,
+    resume: bool = False,
+    quality_report: bool = True
 ) -> dict:
     """
     Exécute le pipeline complet.
+
+    Avec `chunk_size`, les produits traversent le pipeline par morceaux
+    (voir `run_pipeline_streaming`). Avec `incremental`, seuls les produits
+    modifiés depuis le dernier run réussi sont récupérés et traités, puis
+    fusionnés par `code` dans le dataset existant. Avec `partitioned`, la
+    sortie est écrite dans le dataset partitionné par catégorie et date.
+    Avec `near_duplicates`, les quasi-doublons (même produit sous un autre
+    code) sont supprimés et leur taux est reporté dans la qualité. Avec
+    `compact_dtypes`, les colonnes transformées sont converties en types
+    compacts (catégories, entiers réduits).
+
+    L'acquisition enregistre un point de reprise après chaque page et le
+    géocodage enregistre ses résultats au fil de l'eau. Avec `resume`, le
+    dernier run interrompu de la catégorie reprend là où il s'est arrêté
+    (mêmes `max_items` et même date de référence incrémentale).
+
+    Chaque étape est mesurée (durée, CPU, pic mémoire, latence des
+    requêtes) ; les mesures sont exportées dans `REPORTS_DIR` en JSON et
+    au format Prometheus. Sans `quality_report`, le rapport qualité n'est
+    pas écrit (`run_categories` les écrit ensemble, recommandations IA en
+    un lot).
     """
+    if chunk_size and incremental:
+        raise ValueError("Les modes streaming et incrémental ne sont pas combinables")
+    if chunk_size and near_duplicates:
+        raise ValueError("La détection des quasi-doublons nécessite le dataset complet (pas de streaming)")
+    if chunk_size and resume:
+        raise ValueError("La reprise n'est pas disponible en mode streaming")
+    if chunk_size:
+        return run_pipeline_streaming(
+            category, max_items, chunk_size, skip_enrichment, verbose, partitioned,
+            compact_dtypes, quality_report
+        )
+
     stats = {"start_time": datetime.now()}
+    run_metrics = RunMetrics(category)
+    state = load_state(category) if incremental else None
+    existing = None
+    if state and state.dataset_path and Path(state.dataset_path).exists():
+        existing = load_parquet(state.dataset_path)
 
     print("=" * 60)
     print(f"🚀 PIPELINE OPEN DATA - {category.upper()}")
@@ -29,84 +120,134 @@ def run_pipeline(
 
     # === ÉTAPE 1 : Acquisition ===
     print("\n📥 ÉTAPE 1 : Acquisition des données")
-    fetcher = OpenFoodFactsFetcher()
-    products = list(fetcher.fetch_all(category, max_items, verbose))
+    since = state.last_modified_t if existing is not None else None
+    checkpoint = FetchCheckpoint.load(category) if resume else None
+    if checkpoint is not None:
+        max_items, since = checkpoint.state.max_items, checkpoint.state.modified_since
+        print(f"   ⏯️ Reprise : {checkpoint.state.records} produits déjà récupérés "
+              f"(page {checkpoint.state.last_page})")
+    else:
+        if resume:
+            print("   ⚠️ Aucun run interrompu à reprendre : nouveau run")
+        checkpoint = FetchCheckpoint.start(category, max_items, since)
+    with (
+        run_metrics.stage("acquisition"),
+        OpenFoodFactsFetcher() as fetcher,
+        RawArchiveWriter(f"{category}_raw") as raw_writer,
+    ):
+        products = list(raw_writer.tee(
+            fetcher.fetch_all(category, max_items, verbose, modified_since=since, checkpoint=checkpoint)
+        ))
+
+    if since is not None:
+        products = filter_changed(products, existing)
+        stats["delta_records"] = len(products)
+        print(f"   🔁 Incrémental : {len(products)} produits nouveaux ou modifiés")
+        if not products:
+            checkpoint.clear()
+            state.last_run_at = datetime.now()
+            save_state(state)
+            print("✅ Aucun changement depuis le dernier run.")
+            return {**stats, "output_path": state.dataset_path}
 
     if not products:
+        checkpoint.clear()
         print("❌ Aucun produit récupéré. Arrêt.")
         return {"error": "No data fetched"}
 
-    save_raw_json(products, f"{category}_raw")
     stats["fetcher"] = fetcher.get_stats()
 
+    with run_metrics.stage("validation"):
+        df = pd.DataFrame(products)
+        del products
+        validator = ProductValidator()
+        df = validator.validate(df)
+    stats["validation"] = validator.get_stats()
+    print(f"   ✔️ Validation: {stats['validation']['rejected_values']} valeurs rejetées")
+
     # === ÉTAPE 2 : Enrichissement ===
     if not skip_enrichment:
         print("\n🌍 ÉTAPE 2 : Enrichissement (géocodage)")
-        enricher = DataEnricher()
-
-        addresses = enricher.extract_addresses(products, "stores")
+        with run_metrics.stage("enrichment"), DataEnricher() as enricher:
+            addresses = enricher.extract_addresses(df, "stores")
 
-        if addresses:
-            geo_cache = enricher.build_geocoding_cache(addresses[:100])
+            if addresses:
+                geo_cache = enricher.build_geocoding_cache(addresses)
 
-            # ✅ Cache secondaire (vide mais prêt, comme ton camarade)
-            secondary_cache = {}
+                # ✅ Cache secondaire (vide mais prêt, comme ton camarade)
+                secondary_cache = {}
 
-            products = enricher.enrich_products(
-                products,
-                geo_cache,
-                secondary_cache
-            )
+                df = enricher.enrich_dataframe(
+                    df,
+                    geo_cache,
+                    secondary_cache
+                )
 
-            stats["enricher"] = enricher.get_stats()
-        else:
-            print("⚠️ Pas d'adresses à géocoder")
+                stats["enricher"] = enricher.get_stats()
+            else:
+                print("⚠️ Pas d'adresses à géocoder")
     else:
         print("\n⏭️ ÉTAPE 2 : Enrichissement (ignoré)")
 
     # === ÉTAPE 3 : Transformation ===
     print("\n🔧 ÉTAPE 3 : Transformation et nettoyage")
-    df = pd.DataFrame(products)
-
-    transformer = DataTransformer(df)
-    df_clean = (
-        transformer
-        .remove_duplicates()
-        .handle_missing_values(
-            numeric_strategy='median',
-            text_strategy='unknown'
+    with run_metrics.stage("transformation"):
+        df_clean, transformer = transform(
+            df, copy=False, near_duplicates=near_duplicates, compact=compact_dtypes
         )
-        .normalize_text_columns(['brands', 'categories'])
-        .add_derived_columns()
-        .get_result()
-    )
+    run_metrics.record_transformations(transformer.step_metrics)
 
     print(f"   Résumé des transformations:\n{transformer.get_summary()}")
     stats["transformer"] = {
-        "transformations": transformer.transformations_applied
+        "transformations": transformer.transformations_applied,
+        "bytes_saved": transformer.bytes_saved
     }
 
+    if existing is not None:
+        with run_metrics.stage("transformation"):
+            df_clean = merge_delta(existing, df_clean)
+        print(f"   🔁 Fusion avec le dataset existant : {len(df_clean)} produits")
+
     # === ÉTAPE 4 : Qualité ===
     print("\n📊 ÉTAPE 4 : Analyse de qualité")
-    analyzer = QualityAnalyzer(df_clean)
-    metrics = analyzer.analyze()
+    with run_metrics.stage("quality"):
+        analyzer = QualityAnalyzer(df_clean)
+        # Les quasi-doublons sont déjà supprimés de df_clean : taux mesuré par la transformation
+        metrics = analyzer.analyze(near_duplicates_pct=transformer.near_duplicates_pct)
 
     print(f"   Note: {metrics.quality_grade}")
     print(f"   Complétude: {metrics.completeness_score * 100:.1f}%")
     print(f"   Doublons: {metrics.duplicates_pct:.1f}%")
 
-    analyzer.generate_report(f"{category}_quality")
+    if quality_report:
+        analyzer.generate_report(f"{category}_quality")
     stats["quality"] = metrics.dict()
 
     # === ÉTAPE 5 : Stockage ===
     print("\n💾 ÉTAPE 5 : Stockage final")
-    output_path = save_parquet(df_clean, category)
+    with run_metrics.stage("storage"):
+        output_path = save_parquet(df_clean, category, partitioned=partitioned)
     stats["output_path"] = str(output_path)
 
+    if incremental:
+        save_state(RunState(
+            category=category,
+            last_modified_t=max_last_modified(df_clean, since),
+            dataset_path=str(output_path),
+            total_records=len(df_clean),
+        ))
+
+    if checkpoint.state.complete:
+        checkpoint.clear()
+    else:
+        stats["resumable"] = True
+        print("   ⚠️ Acquisition incomplète (pages en erreur) : relancer avec --resume")
+
     stats["end_time"] = datetime.now()
-    stats["duration_seconds"] = (
-        stats["end_time"] - stats["start_time"]
-    ).seconds
+    stats["duration_seconds"] = round(
+        (stats["end_time"] - stats["start_time"]).total_seconds(), 3
+    )
+    _export_metrics(run_metrics, category, stats)
 
     print("\n" + "=" * 60)
     print("✅ PIPELINE TERMINÉ")
@@ -119,6 +260,243 @@ def run_pipeline(
     return stats
 
 
+def _export_metrics(run_metrics: RunMetrics, category: str, stats: dict):
+    """Exporte les mesures du run (JSON et Prometheus) et les ajoute aux stats."""
+    timestamp = stats["start_time"].strftime("%Y%m%d_%H%M%S")
+    json_path, prom_path = run_metrics.export(REPORTS_DIR, f"{category}_metrics_{timestamp}")
+    stats["metrics"] = run_metrics.to_dict()
+    stats["metrics_paths"] = {"json": str(json_path), "prometheus": str(prom_path)}
+
+
+def align_chunk(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """Donne à un morceau des colonnes et des types stables d'un morceau à l'autre."""
+    df = df.reindex(columns=columns)
+    for col in columns:
+        if col in NUMERIC_FIELDS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        else:
+            df[col] = df[col].astype(object)
+    return df
+
+
+def run_pipeline_streaming(
+    category: str,
+    max_items: int = MAX_ITEMS,
+    chunk_size: int = 1000,
+    skip_enrichment: bool = False,
+    verbose: bool = True,
+    partitioned: bool = False,
+    compact_dtypes: bool = False,
+    quality_report: bool = True
+) -> dict:
+    """
+    Exécute le pipeline par morceaux de `chunk_size` produits.
+
+    Chaque morceau est enrichi, transformé puis ajouté au Parquet (un row
+    group par morceau) : la mémoire ne dépend plus de `max_items`. Les
+    médianes de remplissage sont calculées par morceau ; les doublons sont
+    éliminés entre morceaux (codes déjà vus gardés sur disque) et les
+    métriques de qualité sont cumulées, avec un taux de doublons estimé
+    (HyperLogLog) plutôt que calculé sur tous les codes en mémoire.
+    """
+    stats = {"start_time": datetime.now(), "chunks": 0}
+    run_metrics = RunMetrics(category)
+
+    print("=" * 60)
+    print(f"🚀 PIPELINE OPEN DATA (streaming) - {category.upper()}")
+    print("=" * 60)
+
+    accumulator = QualityAccumulator(approximate=True)
+    validator = ProductValidator()
+    geo_cache = {}
+    transformations = []
+
+    with (
+        OpenFoodFactsFetcher() as fetcher,
+        nullcontext() if skip_enrichment else DataEnricher() as enricher,
+        RawArchiveWriter(f"{category}_raw") as raw_writer,
+        ParquetChunkWriter(category, partitioned=partitioned) as parquet_writer,
+        SeenCodes() as seen_codes,
+    ):
+        columns = fetcher.fields + ([] if skip_enrichment else GEOCODING_FIELDS)
+
+        chunks = run_metrics.timed(
+            "acquisition", batched(fetcher.fetch_all(category, max_items, verbose), chunk_size)
+        )
+        for chunk in chunks:
+            with run_metrics.stage("validation"):
+                raw_writer.write_many(chunk)
+                df = validator.validate(pd.DataFrame(list(chunk)))
+                del chunk
+
+            if enricher:
+                with run_metrics.stage("enrichment"):
+                    addresses = enricher.extract_addresses(df, "stores")
+                    missing = [a for a in addresses if a not in geo_cache]
+                    if missing:
+                        geo_cache.update(enricher.build_geocoding_cache(missing))
+                    df = enricher.enrich_dataframe(df, geo_cache, {})
+
+            with run_metrics.stage("transformation"):
+                df = align_chunk(df, columns)
+                if "code" in df.columns:
+                    df = df[seen_codes.mark(df["code"])]
+
+                df_clean, transformer = transform(df, copy=False, compact=compact_dtypes)
+            transformations.extend(transformer.transformations_applied)
+            run_metrics.record_transformations(transformer.step_metrics)
+
+            with run_metrics.stage("quality"):
+                accumulator.update(df_clean)
+            with run_metrics.stage("storage"):
+                parquet_writer.write(df_clean)
+            stats["chunks"] += 1
+
+        stats["fetcher"] = fetcher.get_stats()
+        stats["validation"] = validator.get_stats()
+        if enricher:
+            stats["enricher"] = enricher.get_stats()
+
+    if raw_writer.count == 0:
+        print("❌ Aucun produit récupéré. Arrêt.")
+        return {"error": "No data fetched"}
+
+    stats["transformer"] = {"transformations": transformations}
+
+    print("\n📊 Analyse de qualité (cumulée)")
+    metrics = accumulator.to_metrics()
+    print(f"   Note: {metrics.quality_grade}")
+    print(f"   Complétude: {metrics.completeness_score * 100:.1f}%")
+    print(f"   Doublons: {metrics.duplicates_pct:.1f}%")
+
+    if quality_report:
+        QualityAnalyzer.from_metrics(metrics).generate_report(f"{category}_quality")
+    stats["quality"] = metrics.dict()
+    stats["output_path"] = str(parquet_writer.filepath)
+
+    stats["end_time"] = datetime.now()
+    stats["duration_seconds"] = round(
+        (stats["end_time"] - stats["start_time"]).total_seconds(), 3
+    )
+    _export_metrics(run_metrics, category, stats)
+
+    print("\n" + "=" * 60)
+    print("✅ PIPELINE TERMINÉ")
+    print("=" * 60)
+    print(f"   Durée: {stats['duration_seconds']}s")
+    print(f"   Produits: {parquet_writer.rows} ({stats['chunks']} morceaux)")
+    print(f"   Qualité: {metrics.quality_grade}")
+    print(f"   Fichier: {parquet_writer.filepath}")
+
+    return stats
+
+
+def _init_worker(buckets: dict, http_cache_mode: str):
+    """Initialise un processus du pool multi-catégories."""
+    install_shared_buckets(buckets)
+    config.HTTP_CACHE_MODE = http_cache_mode
+
+
+def _run_category(category: str, options: dict) -> dict:
+    """Exécute le pipeline d'une catégorie ; une erreur n'arrête pas les autres."""
+    try:
+        return run_pipeline(category, **options)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def write_quality_reports(results: dict, llm=None):
+    """Écrit les rapports qualité des runs réussis, recommandations IA en un lot.
+
+    `results` associe chaque catégorie aux statistiques de son run ; le
+    chemin du rapport y est ajouté (`report_path`).
+    """
+    runs = {category: stats for category, stats in results.items() if "quality" in stats}
+    analyzers = [QualityAnalyzer.from_metrics(QualityMetrics(**stats["quality"])) for stats in runs.values()]
+    recommendations = QualityAnalyzer.generate_ai_recommendations_many(analyzers, llm)
+    for (category, stats), analyzer, text in zip(runs.items(), analyzers, recommendations):
+        stats["report_path"] = str(analyzer.generate_report(f"{category}_quality", recommendations=text))
+
+
+def run_categories(
+    categories: list[str],
+    workers: int = CATEGORY_WORKERS,
+    **options
+) -> dict:
+    """
+    Exécute le pipeline sur plusieurs catégories dans un pool de processus.
+
+    Les processus partagent le cache de géocodage SQLite et un seau à
+    jetons par API : les limites de débit restent globales, quel que soit
+    `workers`. Les rapports qualité sont écrits à la fin : les
+    recommandations IA de toutes les catégories sont générées en un seul
+    lot, par le modèle local chargé dans un processus dédié. `options` est
+    transmis à `run_pipeline`. Un résumé combiné est affiché et enregistré
+    dans `REPORTS_DIR`.
+    """
+    start = datetime.now()
+    context = multiprocessing.get_context()
+    buckets = {
+        api.name: SharedTokenBucket.from_interval(api.rate_limit, api.burst, context)
+        for api in (OPENFOODFACTS_CONFIG, ADRESSE_CONFIG)
+    }
+
+    options = {**options, "quality_report": False}
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(categories)),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(buckets, config.HTTP_CACHE_MODE),
+    ) as pool:
+        results = dict(zip(categories, pool.map(_run_category, categories, [options] * len(categories))))
+
+    # Modèle local chargé une fois, hors du processus principal, pour un seul lot
+    llm_path = model_path()
+    with LLMManager(ctx=context) if llm_path else nullcontext() as llm_manager:
+        write_quality_reports(results, llm_manager.LocalLLM(llm_path) if llm_manager else None)
+
+    runs = []
+    for category, stats in results.items():
+        quality = stats.get("quality", {})
+        runs.append({
+            "category": category,
+            "status": "error" if "error" in stats else "ok",
+            "records": quality.get("total_records", 0),
+            "quality_grade": quality.get("quality_grade"),
+            "duration_seconds": stats.get("duration_seconds"),
+            "output_path": stats.get("output_path"),
+            "report_path": stats.get("report_path"),
+            "error": stats.get("error"),
+        })
+
+    summary = {
+        "start_time": start.isoformat(),
+        "duration_seconds": round((datetime.now() - start).total_seconds(), 3),
+        "workers": workers,
+        "categories": len(runs),
+        "succeeded": sum(run["status"] == "ok" for run in runs),
+        "records": sum(run["records"] for run in runs),
+        "runs": runs,
+    }
+
+    summary_path = REPORTS_DIR / f"runs_summary_{start.strftime('%Y%m%d_%H%M%S')}.json"
+    summary_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    summary["summary_path"] = str(summary_path)
+
+    print("\n" + "=" * 60)
+    print(f"✅ {summary['succeeded']}/{summary['categories']} CATÉGORIES TERMINÉES")
+    print("=" * 60)
+    for run in runs:
+        if run["status"] == "ok":
+            print(f"   {run['category']}: {run['records']} produits, qualité {run['quality_grade']}")
+        else:
+            print(f"   ❌ {run['category']}: {run['error']}")
+    print(f"   Durée: {summary['duration_seconds']}s")
+    print(f"   Résumé: {summary_path}")
+
+    return summary
+
+
 def main():
     parser = argparse.ArgumentParser(description="Pipeline Open Data")
     parser.add_argument(
@@ -126,6 +504,18 @@ def main():
         default="chocolats",
         help="Catégorie"
     )
+    parser.add_argument(
+        "--categories",
+        nargs="+",
+        default=None,
+        help="Plusieurs catégories, traitées en parallèle (remplace --category)"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=CATEGORY_WORKERS,
+        help="Processus en parallèle avec --categories"
+    )
     parser.add_argument(
         "--max-items", "-m",
         type=int,
@@ -137,6 +527,43 @@ def main():
         action="store_true",
         help="Ignorer l'enrichissement"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Traiter les produits par morceaux de cette taille (streaming)"
+    )
+    parser.add_argument(
+        "--incremental", "-i",
+        action="store_true",
+        help="Ne traiter que les produits modifiés depuis le dernier run"
+    )
+    parser.add_argument(
+        "--partitioned", "-p",
+        action="store_true",
+        help="Écrire dans le dataset partitionné (catégorie / date)"
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Supprimer les quasi-doublons (même produit sous un autre code)"
+    )
+    parser.add_argument(
+        "--compact-dtypes",
+        action="store_true",
+        help="Convertir les données transformées en types compacts (mémoire)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprendre le dernier run interrompu (pages et géocodages déjà faits)"
+    )
+    parser.add_argument(
+        "--http-cache",
+        choices=["off", "on", "offline"],
+        default=config.HTTP_CACHE_MODE,
+        help="Cache des réponses HTTP (offline : rejeu sans réseau)"
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -144,13 +571,29 @@ def main():
     )
 
     args = parser.parse_args()
+    if args.incremental and args.chunk_size:
+        parser.error("--incremental et --chunk-size ne sont pas combinables")
+    if args.near_duplicates and args.chunk_size:
+        parser.error("--near-duplicates et --chunk-size ne sont pas combinables")
+    if args.resume and args.chunk_size:
+        parser.error("--resume et --chunk-size ne sont pas combinables")
+    config.HTTP_CACHE_MODE = args.http_cache
 
-    run_pipeline(
-        category=args.category,
+    options = dict(
         max_items=args.max_items,
         skip_enrichment=args.skip_enrichment,
-        verbose=args.verbose
+        verbose=args.verbose,
+        chunk_size=args.chunk_size,
+        incremental=args.incremental,
+        partitioned=args.partitioned,
+        near_duplicates=args.near_duplicates,
+        compact_dtypes=args.compact_dtypes,
+        resume=args.resume
     )
+    if args.categories:
+        run_categories(args.categories, args.workers, **options)
+    else:
+        run_pipeline(args.category, **options)
 
 
 if __name__ == "__main__":
@@ -16,6 +16,7 @@ class Product(BaseModel):
     sugars_100g: Optional[float] = None
     fat_100g: Optional[float] = None
     salt_100g: Optional[float] = None
+    last_modified_t: Optional[int] = None  # timestamp Unix de dernière modification OFF
     
     # Champs d'enrichissement (ajoutés après géocodage)
     store_address: Optional[str] = None
@@ -52,7 +53,18 @@ class GeocodingResult(BaseModel):
     postal_code: Optional[str] = None
     city_code: Optional[str] = None
     city: Optional[str] = None
+    # Échec de la recherche (réseau, cache hors ligne) : résultat non mis en cache
+    failed: bool = Field(default=False, exclude=True)
     
+    @classmethod
+    def from_trusted(cls, **fields) -> 'GeocodingResult':
+        """Construit sans validation, pour les boucles chaudes.
+
+        Réservé aux valeurs déjà typées (réponses parsées, cache) ; les
+        champs absents prennent leur valeur par défaut.
+        """
+        return cls.model_construct(**fields)
+
     @property
     def is_valid(self) -> bool:
         return self.score >= 0.5 and self.latitude is not None
@@ -77,10 +89,34 @@ class QualityMetrics(BaseModel):
     avg_geocoding_score: float
     null_counts: dict
     quality_grade: str  # A, B, C, D, F
+    near_duplicates_pct: Optional[float] = None  # calculé sur demande (MinHash/LSH)
     
     @property
     def is_acceptable(self) -> bool:
         return self.quality_grade in ['A', 'B', 'C']
     
 
-   
\ No newline at end of file
+   
+
+
+class RunState(BaseModel):
+    """État du dernier run réussi d'une catégorie (mode incrémental)."""
+    category: str
+    last_modified_t: Optional[int] = None  # plus récente modification intégrée
+    dataset_path: Optional[str] = None     # dataset traité courant
+    total_records: int = 0
+    last_run_at: datetime = Field(default_factory=datetime.now)
+
+
+class FetchCheckpointState(BaseModel):
+    """Point de reprise d'un crawl OpenFoodFacts (voir `FetchCheckpoint`)."""
+    category: str
+    max_items: int
+    modified_since: Optional[int] = None
+    page_size: Optional[int] = None  # fixé au premier crawl, conservé à la reprise
+    last_page: int = 0               # dernière page entièrement enregistrée
+    records: int = 0                 # produits enregistrés dans le fichier partiel
+    records_bytes: int = 0           # taille valide du fichier partiel
+    complete: bool = False           # crawl terminé sans erreur
+    started_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
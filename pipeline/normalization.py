@@ -0,0 +1,97 @@
+"""Canonicalisation des noms de magasins avant géocodage."""
+import re
+import unicodedata
+
+# Préfixe canonique → enseigne. Les formats d'une même enseigne
+# ("Carrefour Market", "carrefour city"...) partagent une seule clé ; la
+# localisation qui suit reste dans la clé ("carrefour lyon").
+CHAIN_ALIASES = {
+    "carrefour": "carrefour",
+    "e leclerc": "leclerc",
+    "leclerc": "leclerc",
+    "intermarche": "intermarche",
+    "super u": "systeme u",
+    "hyper u": "systeme u",
+    "u express": "systeme u",
+    "magasins u": "systeme u",
+    "systeme u": "systeme u",
+    "my auchan": "auchan",
+    "auchan": "auchan",
+    "geant casino": "casino",
+    "petit casino": "casino",
+    "casino": "casino",
+    "monop": "monoprix",
+    "monoprix": "monoprix",
+    "franprix": "franprix",
+    "lidl": "lidl",
+    "aldi": "aldi",
+    "netto": "netto",
+    "biocoop": "biocoop",
+    "cora": "cora",
+}
+
+# Mots de format de magasin ignorés juste après l'enseigne
+CHAIN_FORMATS = {
+    "market", "city", "contact", "express", "drive", "proxi", "bio",
+    "hyper", "hypermarche", "super", "supermarche",
+}
+
+# Les préfixes les plus longs sont testés en premier ("e leclerc" avant "leclerc")
+_ALIASES_BY_LENGTH = sorted(CHAIN_ALIASES.items(), key=lambda item: len(item[0]), reverse=True)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+MIN_KEY_LENGTH = 4
+
+
+def fold_text(text: str) -> str:
+    """Texte sans accents, casse ni ponctuation (mots séparés par un espace)."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", ascii_text.casefold()).strip()
+
+
+def canonicalize_address(text: str) -> str:
+    """Clé canonique : sans accents, casse ni ponctuation, enseigne normalisée.
+
+    Un alias d'enseigne en tête est remplacé par l'enseigne et les mots de
+    format qui le suivent sont retirés ; le reste (la localisation) est
+    conservé pour que deux magasins d'une enseigne restent distincts.
+    """
+    key = fold_text(text)
+
+    for alias, chain in _ALIASES_BY_LENGTH:
+        if key == alias or key.startswith(alias + " "):
+            rest = key[len(alias):].split()
+            while rest and rest[0] in CHAIN_FORMATS:
+                rest.pop(0)
+            return " ".join([chain, *rest])
+    return key
+
+
+class AddressIndex:
+    """Index des noms de magasins bruts vers leur clé canonique.
+
+    Le géocodage se fait une fois par clé ; chaque produit retrouve son
+    résultat en passant par l'index.
+    """
+
+    def __init__(self):
+        self.raw_to_key: dict[str, str | None] = {}
+
+    def add(self, raw: str) -> str | None:
+        """Indexe une chaîne brute et retourne sa clé (None si trop courte)."""
+        if raw not in self.raw_to_key:
+            key = canonicalize_address(raw)
+            self.raw_to_key[raw] = key if len(key) >= MIN_KEY_LENGTH else None
+        return self.raw_to_key[raw]
+
+    def key_for(self, raw: str) -> str | None:
+        """Clé canonique d'une chaîne brute (indexée à la volée si besoin)."""
+        return self.add(raw)
+
+    def keys(self) -> list[str]:
+        """Clés canoniques uniques, dans l'ordre de première apparition."""
+        return list(dict.fromkeys(k for k in self.raw_to_key.values() if k))
+
+    def __len__(self) -> int:
+        return len(self.raw_to_key)
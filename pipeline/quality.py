@@ -1,16 +1,212 @@
 """Module de scoring et rapport de qualité avec recommandations IA locales."""
-import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
 from .config import QUALITY_THRESHOLDS, REPORTS_DIR
+from .dedup import NearDuplicateDetector
+from .local_llm import get_local_llm
 from .models import QualityMetrics
 
 load_dotenv()
 
 
+def compute_grade(
+    completeness: float,
+    duplicates_pct: float,
+    geo_rate: float,
+    has_geocoding: bool = True
+) -> str:
+    """Calcule la note globale (A à F) à partir des métriques principales."""
+    score = min(completeness * 40, 40)
+    if duplicates_pct <= 1:
+        score += 30
+    elif duplicates_pct <= 5:
+        score += 20
+    elif duplicates_pct <= 10:
+        score += 10
+    score += min(geo_rate / 100 * 30, 30) if has_geocoding else 30
+    if score >= 90:
+        return 'A'
+    elif score >= 75:
+        return 'B'
+    elif score >= 60:
+        return 'C'
+    elif score >= 40:
+        return 'D'
+    else:
+        return 'F'
+
+
+class HyperLogLog:
+    """Esquisse HyperLogLog : estimation du nombre de valeurs distinctes.
+
+    Mémoire fixe (2**precision registres) ; deux esquisses se fusionnent
+    exactement par maximum des registres. Erreur type ≈ 1.04 / sqrt(m).
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    def _leading_zeros(values: np.ndarray) -> np.ndarray:
+        """Nombre de zéros de tête de chaque entier 64 bits."""
+        zeros = np.zeros(len(values), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            top_clear = values < np.uint64(1 << (64 - shift))
+            zeros += np.where(top_clear, shift, 0).astype(np.uint8)
+            values = np.where(top_clear, values << np.uint64(shift), values)
+        zeros += (values == 0).astype(np.uint8)
+        return zeros
+
+    def add(self, values: pd.Series):
+        """Ajoute des valeurs (hachées de façon vectorisée)."""
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(
+            self._leading_zeros(hashes << np.uint64(self.precision)) + 1,
+            64 - self.precision + 1,
+        ).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError("Précisions HyperLogLog incompatibles")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """Estimation du nombre de valeurs distinctes."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty > 0:
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+
+class QualityAccumulator:
+    """Accumule les métriques de qualité sur un dataset traité par morceaux.
+
+    Les comptes sont équivalents à ceux de `QualityAnalyzer` appliqué à la
+    concaténation des morceaux (une colonne absente d'un morceau compte
+    comme nulle pour ses lignes). Deux accumulateurs (morceaux ou workers
+    différents) se combinent avec `merge`. En mode `approximate`, les
+    doublons sont estimés par une esquisse HyperLogLog au lieu de garder
+    tous les identifiants en mémoire.
+    """
+
+    def __init__(self, id_col: str = 'code', approximate: bool = False):
+        self.id_col = id_col
+        self.approximate = approximate
+        self.total_records = 0
+        self.non_null_cells = 0
+        self.null_counts: dict[str, int] = {}
+        self.column_rows: dict[str, int] = {}
+        self.geocoded = 0
+        self.geocoding_score_sum = 0.0
+        self.has_geocoding = False
+        self._duplicates = 0
+        self._seen_ids = set()
+        self._seen_null_id = False
+        self._sketch = HyperLogLog() if approximate else None
+
+    @property
+    def duplicates(self) -> int:
+        if self.approximate:
+            return max(self.total_records - self._sketch.count(), 0)
+        return self._duplicates
+
+    def update(self, df: pd.DataFrame) -> 'QualityAccumulator':
+        """Ajoute un morceau du dataset aux métriques (un seul passage)."""
+        self.total_records += len(df)
+        nulls = df.isna().sum()
+        self.non_null_cells += df.size - int(nulls.sum())
+
+        for col, count in nulls.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(count)
+            self.column_rows[col] = self.column_rows.get(col, 0) + len(df)
+
+        if len(df.columns) > 0:
+            id_col = self.id_col if self.id_col in df.columns else df.columns[0]
+            ids = df[id_col]
+            if self.approximate:
+                self._sketch.add(ids)
+            else:
+                unique_ids = ids.drop_duplicates()
+                self._duplicates += len(ids) - len(unique_ids)
+                # Les identifiants nuls sont suivis à part : NaN != NaN dans un set
+                has_null = bool(unique_ids.isna().any())
+                if has_null:
+                    unique_ids = unique_ids.dropna()
+                    self._duplicates += int(self._seen_null_id)
+                    self._seen_null_id = True
+                self._duplicates += len(self._seen_ids.intersection(unique_ids))
+                self._seen_ids.update(unique_ids)
+
+        if 'geocoding_score' in df.columns:
+            self.has_geocoding = True
+            scores = df['geocoding_score']
+            valid_geo = scores > 0
+            self.geocoded += int(valid_geo.sum())
+            self.geocoding_score_sum += float(scores[valid_geo].sum())
+
+        return self
+
+    def merge(self, other: 'QualityAccumulator') -> 'QualityAccumulator':
+        """Combine les métriques d'un autre accumulateur (morceau ou worker)."""
+        if other.approximate != self.approximate:
+            raise ValueError("Impossible de fusionner un accumulateur exact et approximatif")
+
+        self.total_records += other.total_records
+        self.non_null_cells += other.non_null_cells
+        for col, count in other.null_counts.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + count
+            self.column_rows[col] = self.column_rows.get(col, 0) + other.column_rows[col]
+        self.geocoded += other.geocoded
+        self.geocoding_score_sum += other.geocoding_score_sum
+        self.has_geocoding = self.has_geocoding or other.has_geocoding
+
+        if self.approximate:
+            self._sketch.merge(other._sketch)
+        else:
+            self._duplicates += other._duplicates + len(self._seen_ids & other._seen_ids)
+            self._duplicates += int(self._seen_null_id and other._seen_null_id)
+            self._seen_ids |= other._seen_ids
+            self._seen_null_id = self._seen_null_id or other._seen_null_id
+        return self
+
+    def to_metrics(self) -> QualityMetrics:
+        """Construit les métriques finales."""
+        null_counts = {
+            col: count + self.total_records - self.column_rows[col]
+            for col, count in self.null_counts.items()
+        }
+        duplicates = self.duplicates
+        total_cells = self.total_records * len(null_counts)
+        completeness = self.non_null_cells / total_cells if total_cells > 0 else 0
+        duplicates_pct = duplicates / self.total_records * 100 if self.total_records > 0 else 0
+        geo_rate = self.geocoded / self.total_records * 100 if self.total_records > 0 else 0
+        geo_avg = self.geocoding_score_sum / self.geocoded if self.geocoded > 0 else 0
+
+        return QualityMetrics(
+            total_records=self.total_records,
+            valid_records=self.total_records - duplicates,
+            completeness_score=round(completeness, 3),
+            duplicates_count=duplicates,
+            duplicates_pct=round(duplicates_pct, 2),
+            geocoding_success_rate=round(geo_rate, 2),
+            avg_geocoding_score=round(geo_avg, 3),
+            null_counts=null_counts,
+            quality_grade=compute_grade(completeness, duplicates_pct, geo_rate, self.has_geocoding),
+        )
+
+
 class QualityAnalyzer:
     """Analyse et score la qualité des données."""
 
@@ -18,6 +214,13 @@ class QualityAnalyzer:
         self.df = df
         self.metrics = None
 
+    @classmethod
+    def from_metrics(cls, metrics: QualityMetrics) -> 'QualityAnalyzer':
+        """Crée un analyseur à partir de métriques déjà calculées (mode streaming)."""
+        analyzer = cls(pd.DataFrame())
+        analyzer.metrics = metrics
+        return analyzer
+
     def calculate_completeness(self) -> float:
         total_cells = self.df.size
         non_null_cells = self.df.notna().sum().sum()
@@ -41,63 +244,29 @@ class QualityAnalyzer:
         return self.df.isnull().sum().to_dict()
 
     def determine_grade(self, completeness: float, duplicates_pct: float, geo_rate: float) -> str:
-        score = min(completeness * 40, 40)
-        if duplicates_pct <= 1:
-            score += 30
-        elif duplicates_pct <= 5:
-            score += 20
-        elif duplicates_pct <= 10:
-            score += 10
-        score += min(geo_rate / 100 * 30, 30) if 'geocoding_score' in self.df.columns else 30
-        if score >= 90:
-            return 'A'
-        elif score >= 75:
-            return 'B'
-        elif score >= 60:
-            return 'C'
-        elif score >= 40:
-            return 'D'
-        else:
-            return 'F'
-
-    def analyze(self) -> QualityMetrics:
-        completeness = self.calculate_completeness()
-        duplicates, duplicates_pct = self.count_duplicates()
-        geo_rate, geo_avg = self.calculate_geocoding_stats()
-        null_counts = self.calculate_null_counts()
-        valid_records = len(self.df) - duplicates
-        grade = self.determine_grade(completeness, duplicates_pct, geo_rate)
-
-        self.metrics = QualityMetrics(
-            total_records=len(self.df),
-            valid_records=valid_records,
-            completeness_score=round(completeness, 3),
-            duplicates_count=duplicates,
-            duplicates_pct=round(duplicates_pct, 2),
-            geocoding_success_rate=round(geo_rate, 2),
-            avg_geocoding_score=round(geo_avg, 3),
-            null_counts=null_counts,
-            quality_grade=grade,
+        return compute_grade(
+            completeness, duplicates_pct, geo_rate,
+            has_geocoding='geocoding_score' in self.df.columns,
         )
+
+    def analyze(self, near_duplicates: bool = False, near_duplicates_pct: float = None) -> QualityMetrics:
+        """Calcule toutes les métriques en un seul passage sur le DataFrame.
+
+        `near_duplicates` ajoute le taux de quasi-doublons (MinHash/LSH).
+        Si ces doublons ont déjà été supprimés, le taux mesuré avant la
+        suppression est passé dans `near_duplicates_pct`.
+        """
+        self.metrics = QualityAccumulator().update(self.df).to_metrics()
+        if near_duplicates_pct is None and near_duplicates:
+            near_duplicates_pct = NearDuplicateDetector().near_duplicate_rate(self.df)
+        if near_duplicates_pct is not None:
+            self.metrics.near_duplicates_pct = round(near_duplicates_pct, 2)
         return self.metrics
 
-    def generate_ai_recommendations(self) -> str:
-        """Génère des recommandations IA locales avec GPT4All si le modèle est disponible."""
+    def _recommendation_prompt(self) -> str:
         if not self.metrics:
             self.analyze()
-
-        model_path = os.getenv("GPT4ALL_MODEL_PATH")  # Chemin vers le modèle local
-        if not model_path or not Path(model_path).exists():
-            return "⚠️ Recommandations IA désactivées (modèle local GPT4All manquant)."
-
-        try:
-            from gpt4all import GPT4All
-
-            # Initialisation et ouverture du modèle
-            model = GPT4All(model_path)
-            model.open()
-
-            context = f"""
+        context = f"""
 Analyse de qualité d'un dataset :
 - Total: {self.metrics.total_records}
 - Complétude: {self.metrics.completeness_score * 100:.1f}%
@@ -107,21 +276,45 @@ Analyse de qualité d'un dataset :
 Valeurs nulles par colonne:
 {self.metrics.null_counts}
 """
-            prompt = f"{context}\n\nDonne 5 recommandations concrètes et actionnables."
+        return f"{context}\n\nDonne 5 recommandations concrètes et actionnables."
 
-            # Génération des recommandations
-            response = model.generate(prompt)
-            model.close()
-            return response
+    @classmethod
+    def generate_ai_recommendations_many(cls, analyzers: list['QualityAnalyzer'], llm=None) -> list[str]:
+        """Recommandations de plusieurs rapports, en un lot sur le modèle local chargé.
 
+        `llm` : modèle à utiliser (par exemple le proxy d'un `LLMManager`),
+        sinon celui du processus.
+        """
+        if not analyzers:
+            return []
+        if llm is None:
+            llm = get_local_llm()
+        if llm is None:
+            return ["⚠️ Recommandations IA désactivées (modèle local GPT4All manquant)."] * len(analyzers)
+        try:
+            return llm.generate_many([analyzer._recommendation_prompt() for analyzer in analyzers])
         except Exception as e:
-            return f"⚠️ Recommandations IA indisponibles : {str(e)}"
+            return [f"⚠️ Recommandations IA indisponibles : {str(e)}"] * len(analyzers)
+
+    def generate_ai_recommendations(self) -> str:
+        """Génère des recommandations IA locales avec GPT4All si le modèle est disponible.
+
+        Le modèle est chargé au premier appel du processus puis réutilisé
+        (voir `local_llm.get_local_llm`).
+        """
+        return self.generate_ai_recommendations_many([self])[0]
 
-    def generate_report(self, output_name: str = "quality_report") -> Path:
+    def generate_report(self, output_name: str = "quality_report", recommendations: str = None) -> Path:
+        """Écrit le rapport Markdown (`recommendations` : déjà générées en lot)."""
         if not self.metrics:
             self.analyze()
 
-        recommendations = self.generate_ai_recommendations()
+        if recommendations is None:
+            recommendations = self.generate_ai_recommendations()
+        near_duplicates_row = (
+            f"| Quasi-doublons | {self.metrics.near_duplicates_pct:.1f}% | - |\n"
+            if self.metrics.near_duplicates_pct is not None else ""
+        )
         report = f"""# Rapport de Qualité des Données
 
 **Généré le** : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -135,7 +328,7 @@ Valeurs nulles par colonne:
 | Enregistrements valides | {self.metrics.valid_records} | - |
 | Complétude | {self.metrics.completeness_score * 100:.1f}% | ≥ 70% |
 | Doublons | {self.metrics.duplicates_pct:.1f}% | ≤ 5% |
-| Géocodage réussi | {self.metrics.geocoding_success_rate:.1f}% | ≥ 50% |
+{near_duplicates_row}| Géocodage réussi | {self.metrics.geocoding_success_rate:.1f}% | ≥ 50% |
 | Score géocodage moyen | {self.metrics.avg_geocoding_score:.2f} | ≥ 0.5 |
 
 ## 📋 Valeurs Manquantes par Colonne
@@ -1,51 +1,235 @@
 """Module de stockage des données."""
 
+import io
 import json
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date, datetime
 from pathlib import Path
+from typing import Generator, Iterable, get_args
 
-from .config import RAW_DIR, PROCESSED_DIR
+from .config import (
+    RAW_DIR,
+    RAW_COMPRESSION,
+    RAW_EXTENSIONS,
+    PROCESSED_DIR,
+    DATASET_DIR,
+    PARQUET_ROW_GROUP_SIZE,
+    PARQUET_DICTIONARY_COLUMNS,
+)
+from .models import Product
 
-def save_raw_json(data: list[dict], name: str) -> Path:
-    """Sauvegarde les données brutes en JSON."""
+
+class RawArchiveWriter:
+    """Écrit une archive brute NDJSON (un produit par ligne) au fil de l'eau.
+
+    L'archive est compressée en flux (`zstd`, `gzip` ou `none`) : les
+    produits n'ont jamais besoin d'être tous en mémoire. Le fichier n'est
+    créé qu'au premier produit écrit.
+    """
+
+    def __init__(self, name: str, compression: str = RAW_COMPRESSION):
+        if compression not in RAW_EXTENSIONS:
+            raise ValueError(f"Compression inconnue: {compression}")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filepath = RAW_DIR / f"{name}_{timestamp}{RAW_EXTENSIONS[compression]}"
+        self.compression = None if compression == "none" else compression
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> 'RawArchiveWriter':
+        return self
+
+    def write_many(self, records: Iterable[dict]):
+        """Ajoute des produits à la fin de l'archive."""
+        for record in records:
+            if self._file is None:
+                stream = pa.output_stream(self.filepath, compression=self.compression)
+                self._file = io.TextIOWrapper(stream, encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self.count += 1
+
+    def tee(self, records: Iterable[dict]) -> Generator[dict, None, None]:
+        """Archive les produits à mesure qu'ils sont consommés."""
+        for record in records:
+            self.write_many((record,))
+            yield record
+
+    def __exit__(self, *exc_info):
+        if self._file is None:
+            return
+        self._file.close()
+
+        size_kb = self.filepath.stat().st_size / 1024
+        print(f"   💾 Brut: {self.filepath.name} ({size_kb:.1f} KB, {self.count} produits)")
+
+
+def save_raw_archive(data: Iterable[dict], name: str, compression: str = RAW_COMPRESSION) -> Path:
+    """Sauvegarde les données brutes en NDJSON compressé."""
+    with RawArchiveWriter(name, compression) as writer:
+        writer.write_many(data)
+
+    return writer.filepath
+
+
+def iter_raw_archive(filepath: str | Path) -> Generator[dict, None, None]:
+    """Relit une archive brute produit par produit.
+
+    La compression est déduite de l'extension. Les anciens dumps `.json`
+    (tableau indenté) restent lisibles, mais sont chargés d'un bloc.
+    """
+    filepath = Path(filepath)
+    if filepath.suffix == ".json":
+        with open(filepath, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with io.TextIOWrapper(pa.input_stream(filepath, compression="detect"), encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Colonnes écrites par le pipeline en dehors du modèle Product
+EXTRA_ARROW_FIELDS = [
+    pa.field("stores", pa.string()),
+    pa.field("sugar_category", pa.string()),
+    pa.field("is_geocoded", pa.bool_()),
+]
+
+_ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    datetime: pa.timestamp("us"),
+}
+
+
+def _arrow_type(annotation) -> pa.DataType:
+    """Type Arrow d'une annotation du modèle (`Optional[X]` → type de X)."""
+    base = next((t for t in get_args(annotation) if t is not type(None)), annotation)
+    return _ARROW_TYPES.get(base, pa.string())
+
+
+PRODUCT_SCHEMA = pa.schema(
+    [pa.field(name, _arrow_type(field.annotation)) for name, field in Product.model_fields.items()]
+    + EXTRA_ARROW_FIELDS
+)
+
+
+def arrow_schema(columns: Iterable[str]) -> pa.Schema:
+    """Schéma Arrow d'écriture : tout `PRODUCT_SCHEMA`, puis les colonnes hors modèle.
+
+    Le schéma est identique d'un run à l'autre quelles que soient les
+    colonnes présentes (les absentes sont écrites nulles) ; les colonnes
+    hors modèle sont ajoutées à la fin, en texte.
+    """
+    fields = list(PRODUCT_SCHEMA)
+    fields += [pa.field(c, pa.string()) for c in columns if c not in PRODUCT_SCHEMA.names]
+    return pa.schema(fields)
+
+
+def _to_arrow_array(series: pd.Series, arrow_type: pa.DataType) -> pa.Array:
+    """Convertit une colonne vers son type Arrow ; les valeurs invalides deviennent null."""
+    if pa.types.is_integer(arrow_type):
+        values = pd.to_numeric(series, errors="coerce").round()  # médianes .5 arrondies
+    elif pa.types.is_floating(arrow_type):
+        values = pd.to_numeric(series, errors="coerce")
+    elif pa.types.is_boolean(arrow_type):
+        values = series.astype("boolean")
+    elif pa.types.is_timestamp(arrow_type):
+        values = pd.to_datetime(series, errors="coerce")
+    else:
+        values = series.astype("string")
+    return pa.array(values, type=arrow_type, from_pandas=True)
+
+
+def to_arrow_table(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Table:
+    """Convertit un DataFrame en table Arrow au schéma explicite.
+
+    Chaque colonne est convertie une seule fois, sans inférence ; NaN,
+    None et NaT deviennent null. Les colonnes du schéma absentes du
+    DataFrame sont entièrement nulles.
+    """
+    schema = schema or arrow_schema(df.columns)
+    arrays = [
+        _to_arrow_array(df[field.name], field.type) if field.name in df.columns
+        else pa.nulls(len(df), field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _writer_options(columns: Iterable[str], row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> dict:
+    """Options d'écriture Parquet : row groups bornés, dictionnaire ciblé."""
+    return {
+        "compression": "snappy",
+        "row_group_size": row_group_size,
+        "use_dictionary": [c for c in PARQUET_DICTIONARY_COLUMNS if c in columns],
+    }
+
+
+def _output_path(name: str, partitioned: bool = False, run_date: str = None) -> Path:
+    """Chemin du fichier de sortie, à plat ou dans le dataset partitionné."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = RAW_DIR / f"{name}_{timestamp}.json"
+    if not partitioned:
+        return PROCESSED_DIR / f"{name}_{timestamp}.parquet"
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    run_date = run_date or date.today().isoformat()
+    partition_dir = DATASET_DIR / f"category={name}" / f"run_date={run_date}"
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    return partition_dir / f"part-{timestamp}.parquet"
 
-    size_kb = filepath.stat().st_size / 1024
-    print(f"   💾 Brut: {filepath.name} ({size_kb:.1f} KB)")
 
-    return filepath
+def _staging_path(filepath: Path) -> Path:
+    """Fichier en cours d'écriture, ignoré par les lecteurs du dataset (préfixe `.`)."""
+    return filepath.with_name(f".{filepath.name}.tmp")
+
+
+def _replace_partition(staging: Path, filepath: Path):
+    """Publie le fichier écrit comme unique contenu de sa partition.
 
+    Chaque run écrit un instantané complet de la catégorie : les fichiers
+    des runs précédents du même jour sont supprimés, sinon chaque produit
+    serait lu une fois par run.
+    """
+    staging.replace(filepath)
+    for old in filepath.parent.glob("*.parquet"):
+        if old != filepath:
+            old.unlink()
 
-def save_parquet(df: pd.DataFrame, name: str) -> Path:
-    """Sauvegarde les données transformées en Parquet en gérant correctement les types."""
-    # Convertir les colonnes object en numérique si possible
-    for col in df.select_dtypes(include="object").columns:
-        try:
-            df[col] = pd.to_numeric(df[col], errors="ignore")
-        except Exception:
-            pass  # laisser les colonnes non numériques inchangées
 
-    # Colonnes catégorielles : ajouter 'unknown' si nécessaire et remplir NaN
-    for col in df.select_dtypes(include="category").columns:
-        if 'unknown' not in df[col].cat.categories:
-            df[col] = df[col].cat.add_categories('unknown')
-        df[col].fillna('unknown', inplace=True)
+def save_parquet(
+    df: pd.DataFrame,
+    name: str,
+    partitioned: bool = False,
+    run_date: str = None,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE
+) -> Path:
+    """Sauvegarde les données transformées en Parquet en gérant correctement les types.
 
-    # Colonnes numériques : remplir NaN par 0
-    for col in df.select_dtypes(include=["int64", "float64"]).columns:
-        df[col].fillna(0, inplace=True)
+    Toutes les colonnes de `PRODUCT_SCHEMA` sont écrites, avec leurs
+    types (voir `to_arrow_table`) : le schéma ne change pas d'un run à
+    l'autre. Avec
+    `partitioned`, le fichier est écrit dans le dataset
+    `DATASET_DIR/category=<name>/run_date=<date>/` (partitionnement Hive)
+    et remplace le contenu de la partition.
+    """
+    table = to_arrow_table(df)
 
     # Créer le nom de fichier
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = PROCESSED_DIR / f"{name}_{timestamp}.parquet"
+    filepath = _output_path(name, partitioned, run_date)
 
     # Sauvegarder en Parquet
-    df.to_parquet(filepath, index=False, compression="snappy")
+    options = _writer_options(table.column_names, row_group_size)
+    if partitioned:
+        staging = _staging_path(filepath)
+        pq.write_table(table, staging, **options)
+        _replace_partition(staging, filepath)
+    else:
+        pq.write_table(table, filepath, **options)
 
     size_kb = filepath.stat().st_size / 1024
     print(f"   💾 Parquet: {filepath.name} ({size_kb:.1f} KB)")
@@ -53,6 +237,80 @@ def save_parquet(df: pd.DataFrame, name: str) -> Path:
     return filepath
 
 
-def load_parquet(filepath: str | Path) -> pd.DataFrame:
-    """Charge un fichier Parquet et retourne un DataFrame pandas."""
-    return pd.read_parquet(filepath)
+class ParquetChunkWriter:
+    """Écrit un fichier Parquet morceau par morceau (un row group par morceau).
+
+    Le schéma est `PRODUCT_SCHEMA` suivi des colonnes hors modèle du
+    premier morceau ; tous les morceaux
+    sont convertis vers le même schéma explicite (colonnes manquantes à
+    null), sans inférence de type morceau par morceau. Dans le dataset
+    partitionné, le fichier ne remplace le contenu de la partition qu'une
+    fois complet.
+    """
+
+    def __init__(self, name: str, partitioned: bool = False, run_date: str = None):
+        self.filepath = _output_path(name, partitioned, run_date)
+        self.partitioned = partitioned
+        self.rows = 0
+        self.schema = None
+        self._writer = None
+
+    def __enter__(self) -> 'ParquetChunkWriter':
+        return self
+
+    def write(self, df: pd.DataFrame):
+        """Ajoute un morceau au fichier."""
+        if df.empty:
+            return
+        if self._writer is None:
+            self.schema = arrow_schema(df.columns)
+            options = _writer_options(self.schema.names)
+            del options["row_group_size"]  # un row group par morceau
+            target = _staging_path(self.filepath) if self.partitioned else self.filepath
+            self._writer = pq.ParquetWriter(target, self.schema, **options)
+        self._writer.write_table(to_arrow_table(df, self.schema))
+        self.rows += len(df)
+
+    def __exit__(self, exc_type, *exc_info):
+        if self._writer is None:
+            return
+        self._writer.close()
+        if self.partitioned:
+            staging = _staging_path(self.filepath)
+            if exc_type is not None:
+                # Run interrompu : la partition garde le dernier instantané complet
+                staging.unlink(missing_ok=True)
+                return
+            _replace_partition(staging, self.filepath)
+
+        size_kb = self.filepath.stat().st_size / 1024
+        print(f"   💾 Parquet: {self.filepath.name} ({size_kb:.1f} KB, {self.rows} lignes)")
+
+
+def load_parquet(
+    filepath: str | Path,
+    columns: list[str] = None,
+    filters: list[tuple] = None
+) -> pd.DataFrame:
+    """Charge un fichier (ou dataset) Parquet et retourne un DataFrame pandas.
+
+    `columns` limite les colonnes lues ; `filters` (format pyarrow, ex.
+    `[("nutriscore_grade", "=", "a")]`) élague partitions et row groups
+    grâce aux statistiques avant de filtrer les lignes.
+    """
+    return pd.read_parquet(filepath, columns=columns, filters=filters)
+
+
+def load_dataset(
+    category: str = None,
+    run_date: str = None,
+    columns: list[str] = None,
+    filters: list[tuple] = None
+) -> pd.DataFrame:
+    """Charge le dataset partitionné, restreint à une catégorie et/ou une date."""
+    filters = list(filters or [])
+    if category:
+        filters.append(("category", "=", category))
+    if run_date:
+        filters.append(("run_date", "=", run_date))
+    return load_parquet(DATASET_DIR, columns=columns, filters=filters or None)
@@ -1,30 +1,201 @@
 """Module de transformation et nettoyage."""
+import time
 import pandas as pd
 import numpy as np
-from typing import Callable
+from dataclasses import dataclass
+from typing import Callable, Optional
 from dotenv import load_dotenv
 from litellm import completion
 
+from .config import NUTRIENT_STEPS, COMPACT_CATEGORY_MAX_RATIO
+from .dedup import NearDuplicateDetector
+
 load_dotenv()
 
 
-class DataTransformer:
-    """Transforme et nettoie les données."""
+@dataclass
+class _Step:
+    """Étape du plan d'exécution.
+
+    - `rows` : `run(frame) -> masque` des lignes conservées
+    - `columns` : `run(columns, live)` modifie des colonnes d'un `_Columns`
+    - `frame` : `run(df) -> df`, barrière qui voit le DataFrame entier
+    """
+    kind: str
+    run: Callable
+    name: str = "custom"  # méthode du transformer, pour les métriques
+    reads: Optional[set] = None  # colonnes lues (None : toutes)
+    select: Optional[list] = None  # projection : seules colonnes gardées
+    live: Optional[set] = None  # colonnes encore utiles après l'étape (None : toutes)
+
+
+class _Columns:
+    """Vue d'un DataFrame dont les colonnes modifiées sont gardées à part.
+
+    Les étapes de colonnes successives lisent et écrivent cette vue ; le
+    DataFrame n'est reconstruit qu'une fois, par `materialize`.
+    """
 
     def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+        self.df = df
+        self.changed = {}
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.df.columns) + [c for c in self.changed if c not in self.df.columns]
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.changed or col in self.df.columns
+
+    def __getitem__(self, col: str) -> pd.Series:
+        return self.changed[col] if col in self.changed else self.df[col]
+
+    def __setitem__(self, col: str, values):
+        self.changed[col] = values
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def select_dtypes(self, include) -> list[str]:
+        """Comme `DataFrame.select_dtypes`, évalué sur un en-tête vide."""
+        header = pd.DataFrame({c: self[c].iloc[:0] for c in self.columns})
+        return header.select_dtypes(include=include).columns.tolist()
+
+    def materialize(self) -> pd.DataFrame:
+        return self.df.assign(**self.changed) if self.changed else self.df
+
+
+class DataTransformer:
+    """Transforme et nettoie les données.
+
+    Chaque étape de la chaîne est ajoutée à un plan. En mode eager (par
+    défaut), le plan est exécuté à chaque appel. Avec `lazy=True`, il est
+    exécuté par `get_result()` : les filtres de lignes consécutifs sont
+    fusionnés en un seul masque, les étapes de colonnes consécutives ne
+    reconstruisent le DataFrame qu'une fois, et les colonnes écartées par
+    un `select_columns` ultérieur ne sont pas calculées. Le DataFrame
+    d'entrée n'est jamais modifié en place : en mode lazy, la copie
+    initiale est repoussée à la première étape `apply_custom`.
+    """
+
+    def __init__(self, df: pd.DataFrame, copy: bool = True, lazy: bool = False):
+        # copy=False évite la copie initiale quand le DataFrame n'est plus utilisé ailleurs
+        self.lazy = lazy
+        self.df = df.copy() if copy and not lazy else df
+        self._owns_df = not (copy and lazy)
+        self._plan = []
         self.transformations_applied = []
+        self.bytes_saved = {}
+        # Taux de quasi-doublons supprimés (None sans `remove_near_duplicates`)
+        self.near_duplicates_pct = None
+        # Lignes en entrée / sortie et durée de chaque étape exécutée
+        self.step_metrics = []
+
+    def _add(self, step: _Step) -> 'DataTransformer':
+        self._plan.append(step)
+        if not self.lazy:
+            self._execute()
+        return self
+
+    def _optimize(self, plan: list[_Step]) -> list[list[_Step]]:
+        """Calcule les colonnes utiles après chaque étape et regroupe les étapes fusionnables."""
+        live = None
+        for step in reversed(plan):
+            step.live = live
+            if step.select is not None:
+                live = set(step.select)
+            elif step.reads is None:
+                live = None
+            elif live is not None:
+                live = live | step.reads
+
+        segments = []
+        for step in plan:
+            if segments and step.kind != "frame" and segments[-1][0].kind == step.kind:
+                segments[-1].append(step)
+            else:
+                segments.append([step])
+        return segments
+
+    def _record(self, step: _Step, rows_in: int, rows_out: int, start: float):
+        self.step_metrics.append({
+            "step": step.name,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "seconds": time.perf_counter() - start,
+        })
+
+    def _execute(self):
+        """Exécute le plan en attente."""
+        plan, self._plan = self._plan, []
+        df = self.df
+        for segment in self._optimize(plan):
+            kind = segment[0].kind
+            if kind == "rows":
+                keep = np.ones(len(df), dtype=bool)
+                for step in segment:
+                    start = time.perf_counter()
+                    # Sans projection, le filtre lit le DataFrame tel quel (pas de copie)
+                    frame = df if step.reads is None else df[[c for c in df.columns if c in step.reads]]
+                    if not keep.all():
+                        frame = frame.iloc[np.flatnonzero(keep)]
+                    keep[keep] = step.run(frame)
+                    self._record(step, len(frame), int(keep.sum()), start)
+                if not keep.all():
+                    df = df.iloc[np.flatnonzero(keep)]
+            elif kind == "columns":
+                columns = _Columns(df)
+                for step in segment:
+                    start = time.perf_counter()
+                    step.run(columns, step.live)
+                    self._record(step, len(df), len(df), start)
+                df = columns.materialize()
+            else:
+                start = time.perf_counter()
+                rows_in = len(df)
+                if not self._owns_df and df is self.df:
+                    # Seul le DataFrame d'entrée est partagé avec l'appelant
+                    df = df.copy()
+                df = segment[0].run(df)
+                self._record(segment[0], rows_in, len(df), start)
+        if df is not self.df:
+            # Nouveau DataFrame (copy-on-write) : les étapes suivantes peuvent le modifier
+            self._owns_df = True
+        self.df = df
+
+    @staticmethod
+    def _wanted(col: str, live: Optional[set]) -> bool:
+        return live is None or col in live
 
     def remove_duplicates(self, subset: list[str] = None) -> 'DataTransformer':
         """Supprime les doublons."""
-        initial = len(self.df)
-        if subset is None:
-            subset = ['code'] if 'code' in self.df.columns else [self.df.columns[0]]
+        def run(frame: pd.DataFrame) -> np.ndarray:
+            columns = subset
+            if columns is None:
+                columns = ['code'] if 'code' in frame.columns else [frame.columns[0]]
+            keep = ~frame.duplicated(subset=columns, keep='first').to_numpy()
+            self.transformations_applied.append(f"Doublons supprimés: {len(frame) - keep.sum()}")
+            return keep
 
-        self.df = self.df.drop_duplicates(subset=subset, keep='first')
-        removed = initial - len(self.df)
-        self.transformations_applied.append(f"Doublons supprimés: {removed}")
-        return self
+        return self._add(_Step("rows", run, name="remove_duplicates", reads=set(subset) if subset else None))
+
+    def remove_near_duplicates(self, threshold: float = None) -> 'DataTransformer':
+        """Supprime les quasi-doublons (même produit sous un autre code).
+
+        À appliquer avant `handle_missing_values`, tant que les noms
+        manquants ne sont pas remplacés par une valeur par défaut.
+        """
+        detector = NearDuplicateDetector() if threshold is None else NearDuplicateDetector(threshold)
+
+        def run(frame: pd.DataFrame) -> np.ndarray:
+            keep = ~detector.duplicate_mask(frame).to_numpy()
+            removed = len(frame) - int(keep.sum())
+            self.near_duplicates_pct = removed / len(frame) * 100 if len(frame) else 0.0
+            self.transformations_applied.append(f"Quasi-doublons supprimés: {len(frame) - keep.sum()}")
+            return keep
+
+        reads = {"product_name", "brands", *NUTRIENT_STEPS}
+        return self._add(_Step("rows", run, name="remove_near_duplicates", reads=reads))
 
     def handle_missing_values(
         self,
@@ -32,54 +203,62 @@ class DataTransformer:
         text_strategy: str = 'unknown'
     ) -> 'DataTransformer':
         """Gère les valeurs manquantes."""
-        # Colonnes numériques
-        num_cols = self.df.select_dtypes(include=[np.number]).columns
-        for col in num_cols:
-            if numeric_strategy == 'median':
-                fill_value = self.df[col].median()
-            elif numeric_strategy == 'mean':
-                fill_value = self.df[col].mean()
-            elif numeric_strategy == 'zero':
-                fill_value = 0
-            else:
-                fill_value = None
+        def run(df: _Columns, live: Optional[set]):
+            # Colonnes numériques
+            num_cols = df.select_dtypes(include=[np.number])
+            for col in num_cols:
+                if not self._wanted(col, live):
+                    continue
+                if numeric_strategy == 'median':
+                    fill_value = df[col].median()
+                elif numeric_strategy == 'mean':
+                    fill_value = df[col].mean()
+                elif numeric_strategy == 'zero':
+                    fill_value = 0
+                else:
+                    fill_value = None
+
+                if fill_value is not None:
+                    null_count = df[col].isnull().sum()
+                    if null_count > 0:
+                        df[col] = df[col].fillna(fill_value)
+                        self.transformations_applied.append(
+                            f"{col}: {null_count} nulls → {fill_value:.2f}"
+                        )
 
-            if fill_value is not None:
-                null_count = self.df[col].isnull().sum()
+            # Colonnes texte
+            text_cols = df.select_dtypes(include=['object'])
+            for col in text_cols:
+                if not self._wanted(col, live):
+                    continue
+                null_count = df[col].isnull().sum()
                 if null_count > 0:
-                    self.df[col] = self.df[col].fillna(fill_value)
+                    df[col] = df[col].fillna(text_strategy)
                     self.transformations_applied.append(
-                        f"{col}: {null_count} nulls → {fill_value:.2f}"
+                        f"{col}: {null_count} nulls → '{text_strategy}'"
                     )
 
-        # Colonnes texte
-        text_cols = self.df.select_dtypes(include=['object']).columns
-        for col in text_cols:
-            null_count = self.df[col].isnull().sum()
-            if null_count > 0:
-                self.df[col] = self.df[col].fillna(text_strategy)
-                self.transformations_applied.append(
-                    f"{col}: {null_count} nulls → '{text_strategy}'"
-                )
-
-        return self
+        return self._add(_Step("columns", run, name="handle_missing_values", reads=set()))
 
     def normalize_text_columns(self, columns: list[str] = None) -> 'DataTransformer':
         """Normalise les colonnes texte."""
-        if columns is None:
-            columns = self.df.select_dtypes(include=['object']).columns.tolist()
-
-        for col in columns:
-            if col in self.df.columns:
-                self.df[col] = (
-                    self.df[col]
-                    .astype(str)
-                    .str.strip()
-                    .str.lower()
-                )
+        def run(df: _Columns, live: Optional[set]):
+            selected = columns
+            if selected is None:
+                selected = df.select_dtypes(include=['object'])
 
-        self.transformations_applied.append(f"Normalisation texte: {columns}")
-        return self
+            for col in selected:
+                if col in df and self._wanted(col, live):
+                    df[col] = (
+                        df[col]
+                        .astype(str)
+                        .str.strip()
+                        .str.lower()
+                    )
+
+            self.transformations_applied.append(f"Normalisation texte: {selected}")
+
+        return self._add(_Step("columns", run, name="normalize_text_columns", reads=set()))
 
     def filter_outliers(
         self,
@@ -88,55 +267,121 @@ class DataTransformer:
         threshold: float = 1.5
     ) -> 'DataTransformer':
         """Filtre les outliers."""
-        initial = len(self.df)
+        def run(frame: pd.DataFrame) -> np.ndarray:
+            keep = np.ones(len(frame), dtype=bool)
 
-        for col in columns:
-            if col not in self.df.columns:
-                continue
+            for col in columns:
+                if col not in frame.columns:
+                    continue
 
-            series = pd.to_numeric(self.df[col], errors='coerce')
+                series = pd.to_numeric(frame[col][keep], errors='coerce')
 
-            if method == 'iqr':
-                Q1 = series.quantile(0.25)
-                Q3 = series.quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - threshold * IQR
-                upper = Q3 + threshold * IQR
-                self.df = self.df[(series >= lower) & (series <= upper)]
+                if method == 'iqr':
+                    Q1 = series.quantile(0.25)
+                    Q3 = series.quantile(0.75)
+                    IQR = Q3 - Q1
+                    lower = Q1 - threshold * IQR
+                    upper = Q3 + threshold * IQR
+                    keep[keep] = ((series >= lower) & (series <= upper)).to_numpy()
 
-            elif method == 'zscore':
-                mean = series.mean()
-                std = series.std()
-                self.df = self.df[np.abs((series - mean) / std) < threshold]
+                elif method == 'zscore':
+                    mean = series.mean()
+                    std = series.std()
+                    keep[keep] = (np.abs((series - mean) / std) < threshold).to_numpy()
 
-        removed = initial - len(self.df)
-        self.transformations_applied.append(f"Outliers filtrés ({method}): {removed}")
-        return self
+            removed = len(frame) - keep.sum()
+            self.transformations_applied.append(f"Outliers filtrés ({method}): {removed}")
+            return keep
+
+        return self._add(_Step("rows", run, name="filter_outliers", reads=set(columns)))
 
     def add_derived_columns(self) -> 'DataTransformer':
         """Ajoute des colonnes dérivées."""
-        # 🔹 Catégorisation du sucre (robuste)
-        if 'sugars_100g' in self.df.columns:
-            sugars = pd.to_numeric(self.df['sugars_100g'], errors='coerce')
+        def run(df: _Columns, live: Optional[set]):
+            # 🔹 Catégorisation du sucre (robuste)
+            if 'sugars_100g' in df and self._wanted('sugar_category', live):
+                sugars = pd.to_numeric(df['sugars_100g'], errors='coerce')
 
-            self.df['sugar_category'] = pd.cut(
-                sugars,
-                bins=[0, 5, 15, 30, float('inf')],
-                labels=['faible', 'modéré', 'élevé', 'très_élevé']
-            )
+                df['sugar_category'] = pd.cut(
+                    sugars,
+                    bins=[0, 5, 15, 30, float('inf')],
+                    labels=['faible', 'modéré', 'élevé', 'très_élevé']
+                )
 
-            self.transformations_applied.append("Ajout: sugar_category")
+                self.transformations_applied.append("Ajout: sugar_category")
 
-        # 🔹 Flag géocodage
-        if 'geocoding_score' in self.df.columns:
-            score = pd.to_numeric(self.df['geocoding_score'], errors='coerce')
-            self.df['is_geocoded'] = score >= 0.5
-            self.transformations_applied.append("Ajout: is_geocoded")
+            # 🔹 Flag géocodage
+            if 'geocoding_score' in df and self._wanted('is_geocoded', live):
+                score = pd.to_numeric(df['geocoding_score'], errors='coerce')
+                df['is_geocoded'] = score >= 0.5
+                self.transformations_applied.append("Ajout: is_geocoded")
 
-        return self
+        return self._add(_Step(
+            "columns", run, name="add_derived_columns", reads={'sugars_100g', 'geocoding_score'}
+        ))
+
+    @staticmethod
+    def _compact(series: pd.Series, max_ratio: float) -> pd.Series:
+        """Version compacte d'une colonne, ou la colonne elle-même si rien ne s'applique."""
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+            return series
+
+        if pd.api.types.is_integer_dtype(dtype):
+            return pd.to_numeric(series, downcast='integer')
+
+        if pd.api.types.is_float_dtype(dtype):
+            # float32 seulement si toutes les valeurs sont représentées exactement
+            narrow = series.astype('float32')
+            exact = (narrow.astype(dtype) == series) | series.isna()
+            return narrow if exact.all() else series
+
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            try:
+                if series.nunique(dropna=True) <= max_ratio * len(series):
+                    return series.astype('category')
+            except TypeError:
+                pass  # valeurs non hachables (listes…) : colonne laissée telle quelle
+        return series
+
+    def compact_dtypes(self, max_category_ratio: float = COMPACT_CATEGORY_MAX_RATIO) -> 'DataTransformer':
+        """Réduit l'empreinte mémoire des colonnes.
+
+        Texte à faible cardinalité → `category`, entiers réduits au plus
+        petit type suffisant, flottants en float32 quand c'est sans perte.
+        Les octets économisés par colonne sont dans `bytes_saved`.
+        """
+        def run(df: _Columns, live: Optional[set]):
+            for col in df.columns:
+                if not self._wanted(col, live):
+                    continue
+                series = df[col]
+                compact = self._compact(series, max_category_ratio)
+                if compact is series:
+                    continue
+                saved = series.memory_usage(index=False, deep=True) - compact.memory_usage(index=False, deep=True)
+                if saved <= 0:
+                    continue
+                df[col] = compact
+                self.bytes_saved[col] = int(saved)
+                self.transformations_applied.append(
+                    f"{col}: {series.dtype} → {compact.dtype} ({saved / 1024:.1f} KB économisés)"
+                )
+
+        return self._add(_Step("columns", run, name="compact_dtypes", reads=set()))
+
+    def select_columns(self, columns: list[str]) -> 'DataTransformer':
+        """Ne garde que `columns` (les colonnes absentes sont ignorées)."""
+        def run(df: pd.DataFrame) -> pd.DataFrame:
+            kept = [c for c in columns if c in df.columns]
+            self.transformations_applied.append(f"Colonnes conservées: {kept}")
+            return df[kept]
+
+        return self._add(_Step("frame", run, name="select_columns", reads=set(columns), select=list(columns)))
 
     def generate_ai_transformations(self) -> str:
         """Demande à l'IA des transformations supplémentaires via litellm."""
+        self._execute()
         context = f"""
 Dataset avec {len(self.df)} lignes.
 Colonnes: {list(self.df.columns)}
@@ -169,14 +414,19 @@ Transformations déjà appliquées:
         name: str
     ) -> 'DataTransformer':
         """Applique une transformation personnalisée."""
-        self.df = func(self.df)
-        self.transformations_applied.append(f"Custom: {name}")
-        return self
+        def run(df: pd.DataFrame) -> pd.DataFrame:
+            df = func(df)
+            self.transformations_applied.append(f"Custom: {name}")
+            return df
+
+        return self._add(_Step("frame", run, name="apply_custom"))
 
     def get_result(self) -> pd.DataFrame:
-        """Retourne le DataFrame transformé."""
+        """Retourne le DataFrame transformé (exécute le plan en attente)."""
+        self._execute()
         return self.df
 
     def get_summary(self) -> str:
         """Retourne un résumé des transformations."""
+        self._execute()
         return "\n".join(f"• {t}" for t in self.transformations_applied)
@@ -0,0 +1,78 @@
+"""Validation par lots des produits récupérés (règles du modèle Product)."""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .models import Product
+
+# Règles de `Product` (validators `validate_nutriscore` et `validate_positive`)
+NUTRISCORE_GRADES = ["a", "b", "c", "d", "e"]
+NON_NEGATIVE_FIELDS = ["energy_100g", "sugars_100g", "fat_100g", "salt_100g"]
+
+INTEGER_FIELDS = [n for n, f in Product.model_fields.items() if f.annotation == Optional[int]]
+FLOAT_FIELDS = [n for n, f in Product.model_fields.items() if f.annotation == Optional[float]]
+
+
+class ProductValidator:
+    """Applique les règles du modèle `Product` colonne par colonne.
+
+    Équivalent à valider chaque produit avec `Product(**record)` : les
+    produits sans `code` sont rejetés, les valeurs invalides (nutriscore
+    inconnu, nutriment négatif, type incorrect) sont remplacées par null.
+    Les règles s'appliquent sur des masques vectorisés, sans objet
+    pydantic par produit. Les rejets sont comptés par règle.
+    """
+
+    def __init__(self):
+        self.rejections: dict[str, int] = {}
+
+    def _count(self, rule: str, mask: pd.Series) -> int:
+        count = int(mask.sum())
+        if count:
+            self.rejections[rule] = self.rejections.get(rule, 0) + count
+        return count
+
+    def validate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Retourne le DataFrame validé (le DataFrame d'entrée n'est pas modifié)."""
+        if "code" not in df.columns:
+            self._count("code manquant", pd.Series(True, index=df.index))
+            return df.iloc[:0]
+
+        missing_code = df["code"].isna()
+        if self._count("code manquant", missing_code):
+            df = df[~missing_code]
+
+        columns = {"code": df["code"].astype(str)}
+
+        for col in INTEGER_FIELDS + FLOAT_FIELDS:
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors="coerce")
+            invalid = values.isna() & df[col].notna()
+            if col in INTEGER_FIELDS:
+                fractional = values.notna() & (values != np.round(values))
+                invalid |= fractional
+                values = values.mask(fractional)
+            self._count(f"{col}: type invalide", invalid)
+            if col in NON_NEGATIVE_FIELDS:
+                negative = values < 0
+                self._count(f"{col}: négatif", negative)
+                values = values.mask(negative)
+            columns[col] = values
+
+        if "nutriscore_grade" in df.columns:
+            grades = df["nutriscore_grade"].astype(object).where(df["nutriscore_grade"].notna())
+            lowered = grades.map(lambda v: v.lower() if isinstance(v, str) else v)
+            # Comme le validator : les valeurs vides restent nulles sans être comptées
+            invalid = lowered.notna() & (lowered != "") & ~lowered.isin(NUTRISCORE_GRADES)
+            self._count("nutriscore_grade: invalide", invalid)
+            columns["nutriscore_grade"] = lowered.where(lowered.isin(NUTRISCORE_GRADES))
+
+        return df.assign(**columns)
+
+    def get_stats(self) -> dict:
+        return {
+            "rejected_values": sum(self.rejections.values()),
+            "rejections": dict(self.rejections),
+        }
@@ -0,0 +1,51 @@
+"""Tests pour les analyses DuckDB sur les Parquet traités."""
+import pytest
+import pandas as pd
+from pipeline.analytics import DuckDBAnalytics
+from pipeline.quality import QualityAnalyzer
+
+
+class TestDuckDBAnalytics:
+
+    @pytest.fixture
+    def runs(self, tmp_path):
+        first = pd.DataFrame({
+            'code': ['001', '002', '001', None, None],
+            'product_name': ['a', None, 'a', 'b', None],
+            'geocoding_score': [0.9, None, 0.0, 0.7, 0.4],
+        })
+        second = pd.DataFrame({
+            'code': ['010', '011'],
+            'product_name': ['c', 'd'],
+        })
+        first.to_parquet(tmp_path / "chocolats_20250101_000000.parquet", index=False)
+        second.to_parquet(tmp_path / "chocolats_20250102_000000.parquet", index=False)
+        return tmp_path, first, second
+
+    def test_metrics_match_pandas_analyzer(self, runs):
+        directory, first, second = runs
+        expected = QualityAnalyzer(pd.concat([first, second], ignore_index=True)).analyze()
+
+        with DuckDBAnalytics(directory, directory / "dataset", threads=2) as analytics:
+            metrics = analytics.quality_metrics()
+
+        assert metrics.total_records == expected.total_records
+        assert metrics.duplicates_count == expected.duplicates_count
+        assert metrics.null_counts == expected.null_counts
+        assert metrics.completeness_score == expected.completeness_score
+        assert metrics.geocoding_success_rate == expected.geocoding_success_rate
+        assert metrics.avg_geocoding_score == expected.avg_geocoding_score
+        assert metrics.quality_grade == expected.quality_grade
+
+    def test_quality_by_run_and_query(self, runs):
+        directory, first, second = runs
+        with DuckDBAnalytics(directory, directory / "dataset") as analytics:
+            assert analytics.views == ["runs"]
+            by_run = analytics.quality_by_run()
+            counts = analytics.query(
+                "SELECT count(*) AS n FROM runs WHERE product_name = ?", ["a"]
+            )
+
+        assert by_run["total_records"].tolist() == [len(first), len(second)]
+        assert by_run["duplicates_count"].tolist() == [2, 0]
+        assert counts["n"].iloc[0] == 2
@@ -0,0 +1,31 @@
+"""Tests des serveurs locaux du benchmark (fetchers réels, sans réseau)."""
+import pytest
+from benchmarks.servers import StubConfig, StubServer, OpenFoodFactsHandler, AdresseHandler
+from pipeline import config
+from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
+
+
+@pytest.fixture
+def stub_config():
+    return StubConfig(total_products=250, stores=20)
+
+
+def test_fetchers_against_local_servers(stub_config, monkeypatch):
+    with StubServer(OpenFoodFactsHandler, stub_config) as off, StubServer(AdresseHandler, stub_config) as adresse:
+        monkeypatch.setattr(config.OPENFOODFACTS_CONFIG, "base_url", f"{off.url}/api/v2")
+        monkeypatch.setattr(config.OPENFOODFACTS_CONFIG, "rate_limit", 0)
+        monkeypatch.setattr(config.ADRESSE_CONFIG, "base_url", adresse.url)
+        monkeypatch.setattr(config.ADRESSE_CONFIG, "rate_limit", 0)
+
+        with OpenFoodFactsFetcher() as fetcher:
+            products = list(fetcher.fetch_all("chocolats", 1000, verbose=False))
+        with AdresseFetcher() as geocoder:
+            bulk = {r.original_address: r for r in geocoder.geocode_bulk(["Épicerie 1 Lyon", "Épicerie 2 Lille"])}
+            single = geocoder.geocode_single("Épicerie 1 Lyon")
+
+    assert len(products) == 250
+    assert len({p["code"] for p in products}) == 250
+    assert off.requests >= 2
+    assert bulk["Épicerie 1 Lyon"].latitude == single.latitude
+    assert adresse.requests == 2
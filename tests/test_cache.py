@@ -0,0 +1,64 @@
+"""Tests pour le cache persistant de géocodage."""
+import time
+import pytest
+from pipeline.cache import GeocodingCache
+from pipeline.models import GeocodingResult
+
+
+class TestGeocodingCache:
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = GeocodingCache(tmp_path / "geo.sqlite", max_entries=3)
+        yield cache
+        cache.close()
+
+    def test_roundtrip_and_counters(self, cache):
+        cache.put_many([GeocodingResult(original_address="Paris", latitude=48.85, score=0.9)])
+        found = cache.get_many(["  paris ", "Lyon"])
+
+        assert found["  paris "].latitude == 48.85
+        assert found["  paris "].original_address == "  paris "
+        assert "Lyon" not in found
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "geo.sqlite"
+        first = GeocodingCache(path)
+        first.put_many([GeocodingResult(original_address="Paris", score=0.9)])
+        first.close()
+
+        second = GeocodingCache(path)
+        assert "Paris" in second.get_many(["Paris"])
+        second.close()
+
+    def test_expired_and_negative_entries(self, tmp_path):
+        cache = GeocodingCache(tmp_path / "geo.sqlite", ttl=60, negative_ttl=0)
+        cache.put_many([
+            GeocodingResult(original_address="Paris", score=0.9),
+            GeocodingResult(original_address="nulle part", score=0),
+        ])
+        time.sleep(0.01)
+
+        found = cache.get_many(["Paris", "nulle part"])
+        assert list(found) == ["Paris"]
+        cache.close()
+
+    def test_lru_eviction(self, cache):
+        for name in ["a1", "b2", "c3"]:
+            cache.put_many([GeocodingResult(original_address=name, score=0.9)])
+            time.sleep(0.01)
+        cache.get_many(["a1"])
+        cache.put_many([GeocodingResult(original_address="d4", score=0.9)])
+
+        assert len(cache) == 3
+        assert set(cache.get_many(["a1", "b2", "c3", "d4"])) == {"a1", "c3", "d4"}
+
+    def test_failed_lookups_are_not_cached(self, cache):
+        cache.put_many([
+            GeocodingResult(original_address="nulle part", score=0),
+            GeocodingResult(original_address="panne", score=0, failed=True),
+        ])
+        assert set(cache.get_many(["nulle part", "panne"])) == {"nulle part"}
+        assert "failed" not in cache._conn.execute("SELECT payload FROM geocoding").fetchone()[0]
@@ -0,0 +1,86 @@
+"""Tests pour les points de reprise."""
+import asyncio
+
+import pytest
+from pipeline.checkpoint import FetchCheckpoint
+from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("pipeline.checkpoint.STATE_DIR", tmp_path)
+    return tmp_path
+
+
+def make_fetcher(monkeypatch, pages: list, failing: set = frozenset()):
+    """Fetcher servant 230 produits ; les pages de `failing` échouent."""
+    fetcher = OpenFoodFactsFetcher()
+
+    def page(params):
+        pages.append(params["page"])
+        if params["page"] in failing:
+            raise ConnectionError("réseau coupé")
+        start = (params["page"] - 1) * params["page_size"]
+        codes = range(start, min(start + params["page_size"], 230))
+        return {"count": 230, "products": [{"code": str(c)} for c in codes]}
+
+    async def fake_async(client, endpoint, params=None):
+        await asyncio.sleep(0)
+        return page(params)
+
+    monkeypatch.setattr(fetcher, "_make_request", lambda endpoint, params=None: page(params))
+    monkeypatch.setattr(fetcher, "_amake_request", fake_async)
+    return fetcher
+
+
+class TestFetchCheckpoint:
+    def test_resume_after_failed_page(self, monkeypatch):
+        pages = []
+        checkpoint = FetchCheckpoint.start("chocolats", max_items=1000)
+        fetcher = make_fetcher(monkeypatch, pages, failing={3})
+        products = list(fetcher.fetch_all("chocolats", 1000, verbose=False, checkpoint=checkpoint))
+        assert len(products) == 200
+
+        checkpoint = FetchCheckpoint.load("chocolats")
+        assert (checkpoint.state.last_page, checkpoint.state.records) == (2, 200)
+        assert not checkpoint.state.complete
+
+        pages.clear()
+        fetcher = make_fetcher(monkeypatch, pages)
+        products = list(fetcher.fetch_all("chocolats", 1000, verbose=False, checkpoint=checkpoint))
+
+        assert [p["code"] for p in products] == [str(c) for c in range(230)]
+        assert pages == [3]
+        assert FetchCheckpoint.load("chocolats").state.complete
+
+    def test_complete_crawl_is_replayed_without_requests(self, monkeypatch):
+        pages = []
+        checkpoint = FetchCheckpoint.start("chocolats", max_items=1000)
+        list(make_fetcher(monkeypatch, pages).fetch_all("chocolats", 1000, verbose=False, checkpoint=checkpoint))
+
+        pages.clear()
+        checkpoint = FetchCheckpoint.load("chocolats")
+        products = list(make_fetcher(monkeypatch, pages).fetch_all(
+            "chocolats", 1000, verbose=False, checkpoint=checkpoint
+        ))
+        assert len(products) == 230
+        assert pages == []
+
+    def test_unsaved_lines_are_overwritten(self):
+        checkpoint = FetchCheckpoint.start("chocolats", max_items=10)
+        checkpoint.page_done(1, [{"code": "1"}])
+        # Arrêt entre l'écriture des produits et celle de l'état
+        with open(checkpoint.records_path, "a", encoding="utf-8") as f:
+            f.write('{"code": "2"}\n{"code"')
+
+        checkpoint = FetchCheckpoint.load("chocolats")
+        assert list(checkpoint.records()) == [{"code": "1"}]
+        checkpoint.page_done(2, [{"code": "2"}])
+        assert list(checkpoint.records()) == [{"code": "1"}, {"code": "2"}]
+
+    def test_clear(self, state_dir):
+        checkpoint = FetchCheckpoint.start("chocolats", max_items=10)
+        checkpoint.page_done(1, [{"code": "1"}])
+        checkpoint.clear()
+        assert FetchCheckpoint.load("chocolats") is None
+        assert list(state_dir.iterdir()) == []
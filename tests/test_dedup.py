@@ -0,0 +1,58 @@
+"""Tests pour la détection des quasi-doublons."""
+import pytest
+import pandas as pd
+from pipeline.dedup import NearDuplicateDetector, SeenCodes
+from pipeline.main import transform
+from pipeline.quality import QualityAnalyzer
+from pipeline.transformer import DataTransformer
+
+
+class TestNearDuplicateDetector:
+
+    @pytest.fixture
+    def sample_df(self):
+        return pd.DataFrame({
+            'code': ['001', '002', '003', '004', '005'],
+            'product_name': ['Chocolat Noir 70%', 'chocolat noir 70 %', 'Tablette Lait Noisettes', None, None],
+            'brands': ['Lindt', 'LINDT', 'Milka', 'Milka', 'Milka'],
+            'energy_100g': [2280, 2290, 2250, 2000, 2000],
+        })
+
+    def test_groups_near_identical_products(self, sample_df):
+        groups = NearDuplicateDetector().find_groups(sample_df)
+        assert groups[1] == groups[0] == 0
+        assert groups[2] == 2
+
+    def test_products_without_name_are_kept(self, sample_df):
+        mask = NearDuplicateDetector().duplicate_mask(sample_df)
+        assert mask.tolist() == [False, True, False, False, False]
+
+    def test_near_duplicate_rate(self, sample_df):
+        assert NearDuplicateDetector().near_duplicate_rate(sample_df) == pytest.approx(20.0)
+        assert NearDuplicateDetector().near_duplicate_rate(sample_df.iloc[:0]) == 0.0
+
+    def test_transformer_step(self, sample_df):
+        transformer = DataTransformer(sample_df)
+        result = transformer.remove_near_duplicates().get_result()
+        assert result['code'].tolist() == ['001', '003', '004', '005']
+        assert transformer.transformations_applied == ["Quasi-doublons supprimés: 1"]
+        assert transformer.near_duplicates_pct == pytest.approx(20.0)
+
+    def test_pipeline_reports_rate_before_removal(self, sample_df):
+        df_clean, transformer = transform(sample_df, near_duplicates=True)
+        metrics = QualityAnalyzer(df_clean).analyze(near_duplicates_pct=transformer.near_duplicates_pct)
+
+        assert len(df_clean) == 4
+        assert metrics.near_duplicates_pct == pytest.approx(20.0)
+
+
+class TestSeenCodes:
+
+    def test_codes_of_previous_chunks_are_dropped(self):
+        with SeenCodes() as seen:
+            first = seen.mark(pd.Series([str(i) for i in range(1200)]))
+            second = seen.mark(pd.Series(['5', '1199', '1200', '1200', None]))
+
+        assert first.all()
+        # Les doublons internes au morceau restent à `remove_duplicates`
+        assert second.tolist() == [False, False, True, True, True]
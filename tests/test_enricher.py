@@ -0,0 +1,127 @@
+"""Tests pour l'enrichissement."""
+import pytest
+from benchmarks.servers import StubConfig, StubServer, AdresseHandler
+from pipeline import config
+from pipeline.enricher import DataEnricher
+from pipeline.models import GeocodingResult
+from pipeline.normalization import canonicalize_address
+
+
+class TestCanonicalization:
+    def test_folds_case_accents_and_punctuation(self):
+        assert canonicalize_address("  Épicerie   du Marché! ") == "epicerie du marche"
+
+    def test_chain_aliases(self):
+        assert canonicalize_address("CARREFOUR Market") == "carrefour"
+        assert canonicalize_address("E.Leclerc") == "leclerc"
+        assert canonicalize_address("Super U") == "systeme u"
+        assert canonicalize_address("Carrefour City") == "carrefour"
+
+    def test_chain_branches_stay_distinct(self):
+        assert canonicalize_address("Carrefour City Lyon") == "carrefour lyon"
+        assert canonicalize_address("Carrefour Montreuil") == "carrefour montreuil"
+        assert canonicalize_address("Super U Rennes") != canonicalize_address("Hyper U Nantes")
+
+
+class TestDataEnricher:
+
+    @pytest.fixture
+    def enricher(self, tmp_path):
+        with DataEnricher(cache_path=tmp_path / "geo.sqlite") as enricher:
+            yield enricher
+
+    def test_extract_addresses_deduplicates_variants(self, enricher):
+        products = [
+            {"stores": "Carrefour, Intermarché"},
+            {"stores": "carrefour "},
+            {"stores": "CARREFOUR Market,Intermarche"},
+            {"stores": None},
+        ]
+        assert sorted(enricher.extract_addresses(products)) == ["carrefour", "intermarche"]
+
+    def test_enrich_products_maps_variants_through_index(self, enricher):
+        products = [{"code": "1", "stores": "Carrefour City, Lidl"}, {"code": "2", "stores": "carrefour"}]
+        enricher.extract_addresses(products)
+        geo_cache = {"carrefour": GeocodingResult(
+            original_address="carrefour", latitude=48.8, longitude=2.3, score=0.8, city="Paris"
+        )}
+
+        enriched = enricher.enrich_products(products, geo_cache, {})
+
+        assert [p["city"] for p in enriched] == ["Paris", "Paris"]
+        assert enricher.get_stats()["successfully_enriched"] == 2
+
+    def test_enrich_dataframe_joins_on_first_store(self, enricher):
+        import pandas as pd
+
+        df = pd.DataFrame(
+            {"code": ["1", "2", "3"], "stores": ["Lidl, Carrefour", None, "Monoprix"]},
+            index=[10, 11, 12],
+        )
+        enricher.extract_addresses(df)
+        geo_cache = {
+            "lidl": GeocodingResult(original_address="lidl", latitude=45.0, score=0.9),
+            "monoprix": GeocodingResult(original_address="monoprix", score=0.2),
+        }
+
+        enriched = enricher.enrich_dataframe(df, geo_cache, {})
+
+        assert list(enriched.index) == [10, 11, 12]
+        assert enriched["latitude"].tolist()[0] == 45.0
+        assert enriched["geocoding_score"].isna().tolist() == [False, True, False]
+        stats = enricher.get_stats()
+        assert (stats["successfully_enriched"], stats["failed_enrichment"]) == (1, 1)
+
+
+class TestPersistentGeocodingCache:
+
+    @pytest.fixture
+    def adresse(self, monkeypatch):
+        with StubServer(AdresseHandler, StubConfig(not_found_rate=0)) as server:
+            monkeypatch.setattr(config.ADRESSE_CONFIG, "base_url", server.url)
+            monkeypatch.setattr(config.ADRESSE_CONFIG, "rate_limit", 0)
+            yield server
+
+    def test_second_run_is_served_from_fresh_cache(self, adresse, tmp_path):
+        addresses = ["Épicerie 1 Lyon", "Épicerie 2 Lille", "Épicerie 3 Paris"]
+        with DataEnricher(cache_path=tmp_path / "geo.sqlite") as enricher:
+            first = enricher.build_geocoding_cache(addresses)
+        requests = adresse.requests
+
+        with DataEnricher(cache_path=tmp_path / "geo.sqlite") as enricher:
+            second = enricher.build_geocoding_cache(addresses)
+            assert enricher.get_stats()["cache"]["entries"] == 3
+
+        assert adresse.requests == requests
+        assert {a: r.latitude for a, r in second.items()} == {a: r.latitude for a, r in first.items()}
+
+    def test_interrupted_geocoding_resumes_from_cache(self, adresse, tmp_path, monkeypatch):
+        monkeypatch.setattr("pipeline.enricher.GEOCODING_CHECKPOINT_EVERY", 2)
+        addresses = ["Épicerie 1 Lyon", "Épicerie 2 Lille", "Épicerie 3 Paris"]
+
+        with DataEnricher(cache_path=tmp_path / "geo.sqlite") as enricher:
+            fetch_all = enricher.geocoder.fetch_all
+
+            def interrupted(missing, bulk=True):
+                for count, result in enumerate(fetch_all(missing, bulk=bulk)):
+                    if count == 2:
+                        raise KeyboardInterrupt  # arrêt après un premier enregistrement
+                    yield result
+
+            monkeypatch.setattr(enricher.geocoder, "fetch_all", interrupted)
+            with pytest.raises(KeyboardInterrupt):
+                enricher.build_geocoding_cache(addresses)
+
+        with DataEnricher(cache_path=tmp_path / "geo.sqlite") as enricher:
+            requested = []
+            fetch_all = enricher.geocoder.fetch_all
+
+            def recording(missing, bulk=True):
+                requested.extend(missing)
+                return fetch_all(missing, bulk=bulk)
+
+            monkeypatch.setattr(enricher.geocoder, "fetch_all", recording)
+            cache = enricher.build_geocoding_cache(addresses)
+
+        assert len(requested) == 1
+        assert set(cache) == set(addresses)
@@ -1,7 +1,25 @@
 """Tests pour les fetchers."""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
 import pytest
-from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
+
 from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.fetchers.base import retry_after_seconds
+from pipeline.fetchers.http_cache import OfflineCacheMiss, ResponseCache
+from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
+from pipeline.fetchers.rate_limiter import (
+    AdaptiveThrottle,
+    SharedTokenBucket,
+    TokenBucket,
+    bucket_for,
+    install_shared_buckets,
+)
 
 
 class TestOpenFoodFactsFetcher:
@@ -37,3 +55,323 @@ class TestAdresseFetcher:
         fetcher = AdresseFetcher()
         result = fetcher.geocode_single("")
         assert result.score == 0
+
+
+class TestBaseFetcherClient:
+    def test_client_is_reused_between_requests(self):
+        fetcher = AdresseFetcher()
+        assert fetcher.client is fetcher.client
+
+    def test_context_manager_closes_client(self):
+        with AdresseFetcher() as fetcher:
+            client = fetcher.client
+        assert client.is_closed
+        assert fetcher._client is None
+
+
+class TestConcurrentEngine:
+    def test_fetch_batch_runs_concurrently_and_keeps_order(self, monkeypatch):
+        fetcher = AdresseFetcher()
+        in_flight = {"current": 0, "max": 0}
+
+        async def fake_request(client, endpoint, params=None):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            await asyncio.sleep(0.01)
+            in_flight["current"] -= 1
+            return {"features": [{
+                "properties": {"label": params["q"], "score": 0.9},
+                "geometry": {"coordinates": [2.3, 48.8]},
+            }]}
+
+        monkeypatch.setattr(fetcher, "_amake_request", fake_request)
+        addresses = [f"adresse {i}" for i in range(20)]
+        results = fetcher.fetch_batch(addresses)
+
+        assert [r.original_address for r in results] == addresses
+        assert in_flight["max"] > 1
+
+    def test_first_error_cancels_other_workers(self):
+        fetcher = AdresseFetcher()
+        cancelled = []
+
+        async def call(client, item):
+            if item == 0:
+                raise ValueError("échec")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(client.is_closed)
+                raise
+
+        with pytest.raises(ValueError):
+            list(fetcher._run_concurrent(call, range(4), workers=4))
+
+        # Les requêtes en vol sont annulées avant la fermeture du client
+        assert cancelled == [False, False, False]
+
+    def test_token_bucket_spaces_requests(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.04
+
+    def test_shared_token_bucket_limits_across_processes(self):
+        context = multiprocessing.get_context()
+        bucket = SharedTokenBucket(rate=50, capacity=1, context=context)
+        with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=context,
+            initializer=install_shared_buckets,
+            initargs=({"test": bucket},),
+        ) as pool:
+            times = [t for batch in pool.map(_acquire_shared, [5, 5]) for t in batch]
+
+        # 10 jetons à 50/s : au moins 9 intervalles de 20 ms, tous processus confondus
+        assert max(times) - min(times) >= 0.17
+
+
+def _acquire_shared(count: int) -> list[float]:
+    bucket = bucket_for("test", 1.0)
+    times = []
+    for _ in range(count):
+        bucket.acquire()
+        times.append(time.monotonic())
+    return times
+
+
+class TestBulkGeocoding:
+    def test_geocode_bulk_parses_csv_and_falls_back_on_errors(self, monkeypatch):
+        def handler(request):
+            assert request.url.path == "/search/csv/"
+            body = (
+                "q,latitude,longitude,result_label,result_score,result_postcode,"
+                "result_citycode,result_city,result_status\n"
+                "paris,48.85,2.35,Paris,0.9,75001,75056,Paris,ok\n"
+                "nulle part,,,,,,,,not-found\n"
+                "lyon,,,,,,,,error\n"
+            )
+            return httpx.Response(200, text=body)
+
+        async def fake_request(client, endpoint, params=None):
+            return {"features": [{
+                "properties": {"label": "Lyon", "score": 0.8, "city": "Lyon"},
+                "geometry": {"coordinates": [4.83, 45.76]},
+            }]}
+
+        fetcher = AdresseFetcher()
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(fetcher, "_amake_request", fake_request)
+
+        results = {r.original_address: r for r in fetcher.geocode_bulk(["paris", "nulle part", "lyon"])}
+
+        assert results["paris"].latitude == 48.85
+        assert results["paris"].is_valid
+        assert results["nulle part"].score == 0
+        assert results["lyon"].city == "Lyon"
+        assert fetcher.stats["csv_fallbacks"] == 1
+
+    def test_geocode_bulk_yields_blank_addresses(self):
+        def handler(request):
+            return httpx.Response(200, text="q,latitude,longitude,result_score,result_status\nparis,48.85,2.35,0.9,ok\n")
+
+        fetcher = AdresseFetcher()
+        fetcher.cache = None
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        results = list(fetcher.geocode_bulk(["paris", "", "   "]))
+
+        assert len(results) == 3
+        assert sorted(r.original_address for r in results if r.score == 0) == ["", "   "]
+
+    def test_online_bulk_run_is_replayed_offline(self, tmp_path):
+        def handler(request):
+            body = (
+                "q,latitude,longitude,result_label,result_score,result_postcode,"
+                "result_citycode,result_city,result_status\n"
+                "paris,48.85,2.35,Paris,0.9,75001,75056,Paris,ok\n"
+                "nulle part,,,,,,,,not-found\n"
+            )
+            return httpx.Response(200, text=body)
+
+        online = AdresseFetcher()
+        online.cache = ResponseCache("adresse", tmp_path)
+        online._client = httpx.Client(transport=httpx.MockTransport(handler))
+        expected = {r.original_address: r for r in online.geocode_bulk(["paris", "nulle part"])}
+
+        offline = AdresseFetcher()
+        offline.cache = ResponseCache("adresse", tmp_path, offline=True)
+        replayed = {r.original_address: r for r in offline.geocode_bulk(["paris", "nulle part"])}
+
+        assert replayed == expected
+        assert not any(r.failed for r in replayed.values())
+        assert offline.stats["cache_hits"] == 2
+
+    def test_transport_errors_are_marked_failed(self, monkeypatch):
+        def handler(request):
+            raise httpx.ConnectError("réseau coupé")
+
+        monkeypatch.setattr("time.sleep", lambda seconds: None)
+        fetcher = AdresseFetcher()
+        fetcher.cache = None
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        result = fetcher.geocode_single("paris")
+        assert result.score == 0 and result.failed
+
+    def test_csv_upload_honours_retry_after(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("time.sleep", sleeps.append)
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "1"}),
+            httpx.Response(200, text="q,latitude,longitude,result_score,result_status\nparis,48.85,2.35,0.9,ok\n"),
+        ])
+        fetcher = AdresseFetcher()
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+
+        results, failed = fetcher._geocode_csv_chunk(["paris"])
+
+        assert [r.original_address for r in results] == ["paris"] and failed == []
+        rate = fetcher.get_stats()["rate"]
+        assert 1 in sleeps
+        assert rate["decreases"] == 1
+        assert rate["retry_after_seconds"] == 1
+
+
+class TestOpenFoodFactsCrawl:
+    def test_fetch_all_stops_at_available_count(self, monkeypatch):
+        fetcher = OpenFoodFactsFetcher()
+        pages = []
+
+        def page(params):
+            pages.append(params["page"])
+            start = (params["page"] - 1) * params["page_size"]
+            codes = range(start, min(start + params["page_size"], 230))
+            return {"count": 230, "products": [{"code": str(c)} for c in codes]}
+
+        async def fake_async(client, endpoint, params=None):
+            await asyncio.sleep(0)
+            return page(params)
+
+        monkeypatch.setattr(fetcher, "_make_request", lambda endpoint, params=None: page(params))
+        monkeypatch.setattr(fetcher, "_amake_request", fake_async)
+
+        products = list(fetcher.fetch_all("chocolats", max_items=1000, verbose=False))
+
+        assert [p["code"] for p in products] == [str(c) for c in range(230)]
+        assert sorted(pages) == [1, 2, 3]
+
+
+class TestResponseCache:
+    def test_revalidation_and_offline_replay(self, tmp_path):
+        seen_headers = []
+
+        def handler(request):
+            seen_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"features": []}, headers={"ETag": '"v1"'})
+
+        fetcher = AdresseFetcher()
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(handler))
+        fetcher.cache = ResponseCache("adresse", directory=tmp_path, max_age=0)
+
+        assert fetcher._make_request("/search/", {"q": "paris"}) == {"features": []}
+        assert fetcher._make_request("/search/", {"q": "paris"}) == {"features": []}
+        assert seen_headers == [None, '"v1"']
+        assert fetcher.stats["cache_revalidated"] == 1
+
+        fetcher.cache = ResponseCache("adresse", directory=tmp_path, offline=True)
+        assert fetcher._make_request("/search/", {"q": "paris"}) == {"features": []}
+        assert len(seen_headers) == 2
+        with pytest.raises(OfflineCacheMiss):
+            fetcher._make_request("/search/", {"q": "lyon"})
+
+
+class TestAdaptiveThrottle:
+    def test_additive_increase_up_to_max_rate(self):
+        bucket = TokenBucket(rate=10)
+        throttle = AdaptiveThrottle(bucket, max_rate=12, increase=0.5)
+        throttle.observe(200, 0.05)
+        assert bucket.rate == pytest.approx(10.5)
+        for _ in range(20):
+            throttle.observe(200, 0.05)
+        assert bucket.rate == 12
+
+    def test_multiplicative_decrease_once_per_cooldown(self):
+        bucket = TokenBucket(rate=10)
+        throttle = AdaptiveThrottle(bucket, decrease=0.5, cooldown=60, min_factor=0.1)
+        throttle.observe(429, 0.05)
+        throttle.observe(503, 0.05)  # même rafale : ignoré
+        assert bucket.rate == 5
+        assert throttle.get_stats()["decreases"] == 1
+
+    def test_rising_latency_slows_down(self):
+        bucket = TokenBucket(rate=10)
+        throttle = AdaptiveThrottle(bucket, latency_factor=2.0, cooldown=60)
+        for _ in range(5):
+            throttle.observe(200, 0.05)
+        for _ in range(10):
+            throttle.observe(200, 1.0)
+        assert bucket.rate < 10
+        assert throttle.get_stats()["decreases"] == 1
+
+    def test_shared_rate_is_adjusted_once_across_processes(self):
+        context = multiprocessing.get_context()
+        bucket = SharedTokenBucket(rate=10, context=context)
+        with ProcessPoolExecutor(
+            max_workers=4,
+            mp_context=context,
+            initializer=install_shared_buckets,
+            initargs=({"test": bucket},),
+        ) as pool:
+            list(pool.map(_observe_shared, [[200] * 100] * 4))
+            assert bucket.rate == 12  # plafond commun, jamais dépassé
+
+            # Même rafale de 429 dans chaque processus : une seule baisse,
+            # puis pas de remontée pendant le délai entre deux baisses
+            decreases = sum(pool.map(_observe_shared, [[429, 200, 200]] * 4))
+
+        assert decreases == 1
+        assert bucket.rate == 6
+
+    def test_retry_after_pauses_bucket(self):
+        bucket = TokenBucket(rate=1000)
+        throttle = AdaptiveThrottle(bucket)
+        throttle.observe(429, 0.01, retry_after=0.5)
+        assert bucket._reserve() == pytest.approx(0.5, abs=0.05)
+        assert bucket._reserve() == pytest.approx(0.5, abs=0.05)  # puis au débit (1 ms)
+
+    def test_retry_after_header_formats(self):
+        assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "3"})) == 3
+        date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        assert 25 < retry_after_seconds(httpx.Response(429, headers={"Retry-After": date})) <= 30
+        assert retry_after_seconds(httpx.Response(429)) is None
+
+    def test_request_honours_retry_after(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("time.sleep", sleeps.append)
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "1"}),
+            httpx.Response(200, json={"features": []}),
+        ])
+        fetcher = AdresseFetcher()
+        fetcher.cache = None
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+
+        assert fetcher._make_request("/search/", {"q": "paris"}) == {"features": []}
+
+        rate = fetcher.get_stats()["rate"]
+        assert 1 in sleeps  # attente de tenacity = Retry-After, pas le backoff de 2 s
+        assert rate["decreases"] == 1
+        assert rate["retry_after_seconds"] == 1
+        assert rate["current_rate"] < rate["base_rate"]
+
+
+def _observe_shared(statuses: list) -> int:
+    throttle = AdaptiveThrottle(bucket_for("test", 1.0), base_rate=10, max_rate=12, cooldown=60)
+    for status in statuses:
+        throttle.observe(status, 0.01)
+        assert throttle.bucket.rate <= 12
+    return throttle.stats["decreases"]
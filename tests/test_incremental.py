@@ -0,0 +1,27 @@
+"""Tests pour le mode incrémental."""
+import pandas as pd
+from pipeline.incremental import filter_changed, merge_delta, max_last_modified
+
+
+class TestIncremental:
+    def test_filter_changed_keeps_new_and_modified(self):
+        existing = pd.DataFrame({"code": [1, 2], "last_modified_t": [100, 200]})
+        products = [
+            {"code": "1", "last_modified_t": 100},
+            {"code": "2", "last_modified_t": 250},
+            {"code": "3", "last_modified_t": 50},
+        ]
+        assert [p["code"] for p in filter_changed(products, existing)] == ["2", "3"]
+
+    def test_merge_delta_replaces_by_code(self):
+        existing = pd.DataFrame({"code": ["001", "002"], "name": ["a", "b"]})
+        delta = pd.DataFrame({"code": ["002", "003"], "name": ["b2", "c"]})
+
+        merged = merge_delta(existing, delta)
+
+        assert merged.set_index("code")["name"].to_dict() == {"001": "a", "002": "b2", "003": "c"}
+
+    def test_max_last_modified_keeps_previous_watermark(self):
+        df = pd.DataFrame({"last_modified_t": [10.0, None]})
+        assert max_last_modified(df, 50) == 50
+        assert max_last_modified(df) == 10
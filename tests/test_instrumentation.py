@@ -0,0 +1,113 @@
+"""Tests pour l'instrumentation des runs."""
+import json
+
+import httpx
+import pytest
+import pandas as pd
+
+from pipeline.fetchers.adresse import AdresseFetcher
+from pipeline.instrumentation import Histogram, RunMetrics, current_metrics
+from pipeline.transformer import DataTransformer
+
+
+class TestHistogram:
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 2.0):
+            histogram.observe(value)
+        assert histogram.counts == [1, 2]
+        assert histogram.count == 3
+        assert histogram.sum == pytest.approx(2.55)
+
+
+class TestRunMetrics:
+
+    def test_stage_accumulates_calls(self):
+        metrics = RunMetrics("test")
+        for _ in range(3):
+            with metrics.stage("transformation"):
+                sum(range(1000))
+        stage = metrics.to_dict()["stages"]["transformation"]
+        assert stage["calls"] == 3
+        assert stage["wall_seconds"] >= 0
+        assert stage["peak_rss_bytes"] > 0
+
+    def test_stage_activates_metrics(self):
+        metrics = RunMetrics("test")
+        with metrics.stage("acquisition"):
+            current_metrics().record_request("OpenFoodFacts", 0.2, 200)
+        assert current_metrics() is not metrics
+        assert metrics.to_dict()["requests"]["OpenFoodFacts"]["status"] == {"200": 1}
+
+    def test_timed_counts_items(self):
+        metrics = RunMetrics("test")
+        assert list(metrics.timed("acquisition", iter([1, 2]))) == [1, 2]
+        assert metrics.stages["acquisition"]["calls"] == 3  # 2 éléments + fin de l'itérateur
+
+    def test_prometheus_format(self):
+        metrics = RunMetrics("chocolats")
+        with metrics.stage("storage"):
+            pass
+        metrics.record_request("Adresse", 0.03, 200)
+        metrics.record_request("Adresse", 3.0, "ConnectTimeout")
+        metrics.record_retry("Adresse")
+        metrics.record_transformations([{"step": "remove_duplicates", "rows_in": 10, "rows_out": 8, "seconds": 0.1}])
+
+        text = metrics.to_prometheus()
+        assert "# TYPE pipeline_request_duration_seconds histogram" in text
+        assert 'pipeline_request_duration_seconds_bucket{run="chocolats",api="Adresse",le="0.05"} 1' in text
+        assert 'pipeline_request_duration_seconds_bucket{run="chocolats",api="Adresse",le="+Inf"} 2' in text
+        assert 'pipeline_requests_total{run="chocolats",api="Adresse",status="ConnectTimeout"} 1' in text
+        assert 'pipeline_request_retries_total{run="chocolats",api="Adresse"} 1' in text
+        assert 'pipeline_transformation_rows_out{run="chocolats",position="0",step="remove_duplicates"} 8' in text
+        assert 'pipeline_stage_wall_seconds{run="chocolats",stage="storage"}' in text
+
+    def test_export(self, tmp_path):
+        metrics = RunMetrics("chocolats")
+        metrics.record_retry("Adresse")
+        json_path, prom_path = metrics.export(tmp_path, "chocolats_metrics")
+        assert json.loads(json_path.read_text())["requests"]["Adresse"]["retries"] == 1
+        assert prom_path.read_text().endswith("\n")
+
+
+class TestRequestInstrumentation:
+
+    def test_requests_and_retries_are_recorded(self, monkeypatch):
+        monkeypatch.setattr("time.sleep", lambda seconds: None)  # attentes de tenacity
+        responses = iter([httpx.Response(503), httpx.Response(200, json={"features": []})])
+        fetcher = AdresseFetcher()
+        fetcher.cache = None
+        fetcher._client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)))
+
+        metrics = RunMetrics("test")
+        with metrics.stage("enrichment"):
+            fetcher._make_request("/search/", {"q": "Paris"})
+
+        report = metrics.to_dict()["requests"]["API Adresse"]
+        assert report["status"] == {"503": 1, "200": 1}
+        assert report["retries"] == 1
+        assert fetcher.stats["retries"] == 1
+
+
+class TestTransformerStepMetrics:
+
+    def test_rows_in_and_out_per_step(self):
+        df = pd.DataFrame({
+            'code': ['001', '001', '002'],
+            'product_name': ['a', 'a', 'b'],
+            'sugars_100g': [10.0, 10.0, None],
+        })
+        transformer = (
+            DataTransformer(df, lazy=True)
+            .remove_duplicates()
+            .handle_missing_values()
+            .select_columns(['code', 'sugars_100g'])
+        )
+        transformer.get_result()
+        steps = [(m["step"], m["rows_in"], m["rows_out"]) for m in transformer.step_metrics]
+        assert steps == [
+            ("remove_duplicates", 3, 2),
+            ("handle_missing_values", 2, 2),
+            ("select_columns", 2, 2),
+        ]
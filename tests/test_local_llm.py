@@ -0,0 +1,106 @@
+"""Tests pour le modèle local des recommandations IA."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+import pandas as pd
+from pipeline import local_llm
+from pipeline.main import write_quality_reports
+from pipeline.local_llm import LocalLLM, LLMManager, install_shared_llm, get_local_llm
+from pipeline.quality import QualityAnalyzer
+
+
+class FakeModel:
+    """Modèle factice : un token par appel du callback, jusqu'à `max_tokens`."""
+
+    def generate(self, prompt, max_tokens=200, callback=None):
+        tokens = []
+        for i in range(max_tokens):
+            if callback and not callback(i, "x"):
+                break
+            tokens.append("x")
+        return f"{prompt}:{''.join(tokens)}"
+
+
+def fake_loader(model_path):
+    return FakeModel()
+
+
+def _ask(prompt: str) -> str:
+    return get_local_llm().generate(prompt, max_tokens=2)
+
+
+@pytest.fixture(autouse=True)
+def no_shared_llm(monkeypatch):
+    monkeypatch.setattr(local_llm, "_shared", None)
+    monkeypatch.setattr(local_llm, "_instance", None)
+
+
+class TestLocalLLM:
+    def test_model_is_loaded_once_on_first_use(self, tmp_path):
+        llm = LocalLLM(tmp_path / "model.gguf", loader=fake_loader)
+        assert llm.stats["loads"] == 0
+
+        assert llm.generate("a", max_tokens=3) == "a:xxx"
+        assert llm.generate_many(["b", "c"], max_tokens=1) == ["b:x", "c:x"]
+        assert llm.get_stats()["loads"] == 1
+        assert llm.get_stats()["generations"] == 3
+
+    def test_generation_stops_at_timeout(self, tmp_path):
+        llm = LocalLLM(tmp_path / "model.gguf", loader=fake_loader)
+        assert llm.generate("a", max_tokens=100, timeout=0) == "a:"
+        assert llm.stats["timeouts"] == 1
+
+    def test_no_model_configured(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GPT4ALL_MODEL_PATH", str(tmp_path / "absent.gguf"))
+        assert get_local_llm() is None
+        assert "désactivées" in QualityAnalyzer(pd.DataFrame({"code": ["1"]})).generate_ai_recommendations()
+
+    def test_instance_is_reused(self, monkeypatch, tmp_path):
+        path = tmp_path / "model.gguf"
+        path.touch()
+        monkeypatch.setenv("GPT4ALL_MODEL_PATH", str(path))
+        assert get_local_llm() is get_local_llm()
+
+    def test_quality_reports_are_batched(self, tmp_path):
+        llm = LocalLLM(tmp_path / "model.gguf", loader=fake_loader)
+        install_shared_llm(llm)
+        analyzers = [QualityAnalyzer(pd.DataFrame({"code": [str(i)]})) for i in range(3)]
+
+        recommendations = QualityAnalyzer.generate_ai_recommendations_many(analyzers)
+
+        assert len(recommendations) == 3
+        assert all("Donne 5 recommandations" in r for r in recommendations)
+        assert llm.stats["loads"] == 1
+
+    def test_manager_shares_one_model_across_processes(self, tmp_path):
+        context = multiprocessing.get_context()
+        with LLMManager(ctx=context) as manager:
+            llm = manager.LocalLLM(tmp_path / "model.gguf", fake_loader)
+            with ProcessPoolExecutor(
+                max_workers=2,
+                mp_context=context,
+                initializer=install_shared_llm,
+                initargs=(llm,),
+            ) as pool:
+                answers = list(pool.map(_ask, ["a", "b", "c"]))
+
+            assert answers == ["a:xx", "b:xx", "c:xx"]
+            assert llm.get_stats()["loads"] == 1
+
+    def test_category_reports_share_one_batch(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("pipeline.quality.REPORTS_DIR", tmp_path)
+        calls = []
+        llm = LocalLLM(tmp_path / "model.gguf", loader=fake_loader)
+        monkeypatch.setattr(llm, "generate_many", lambda prompts: calls.append(prompts) or ["ok"] * len(prompts))
+        results = {
+            "chocolats": {"quality": QualityAnalyzer(pd.DataFrame({"code": ["1"]})).analyze().dict()},
+            "biscuits": {"quality": QualityAnalyzer(pd.DataFrame({"code": ["2", "2"]})).analyze().dict()},
+            "sodas": {"error": "ConnectError"},
+        }
+
+        write_quality_reports(results, llm)
+
+        assert len(calls) == 1 and len(calls[0]) == 2
+        assert "report_path" not in results["sodas"]
+        assert "## 🤖 Recommandations IA\nok" in open(results["biscuits"]["report_path"], encoding="utf-8").read()
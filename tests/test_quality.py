@@ -0,0 +1,86 @@
+"""Tests pour l'analyse de qualité."""
+import pytest
+import pandas as pd
+from pipeline.quality import QualityAnalyzer, QualityAccumulator, HyperLogLog
+
+
+class TestQualityAccumulator:
+
+    @pytest.fixture
+    def sample_df(self):
+        return pd.DataFrame({
+            'code': ['001', '002', '001', '003', '004', '002'],
+            'name': ['a', None, 'a', 'b', None, 'c'],
+            'geocoding_score': [0.9, None, 0.0, 0.7, 0.4, None],
+        })
+
+    def test_chunks_match_full_analysis(self, sample_df):
+        expected = QualityAnalyzer(sample_df).analyze()
+
+        accumulator = QualityAccumulator()
+        for start in range(0, len(sample_df), 4):
+            accumulator.update(sample_df.iloc[start:start + 4])
+        metrics = accumulator.to_metrics()
+
+        assert metrics.duplicates_count == expected.duplicates_count
+        assert metrics.completeness_score == expected.completeness_score
+        assert metrics.null_counts == expected.null_counts
+        assert metrics.geocoding_success_rate == expected.geocoding_success_rate
+        assert metrics.avg_geocoding_score == expected.avg_geocoding_score
+        assert metrics.quality_grade == expected.quality_grade
+
+    def test_missing_column_in_chunk_counts_as_null(self, sample_df):
+        accumulator = QualityAccumulator()
+        accumulator.update(sample_df[['code', 'name']].iloc[:3])
+        accumulator.update(sample_df.iloc[3:])
+        assert accumulator.to_metrics().null_counts['geocoding_score'] == 4
+
+    def test_analyze_matches_column_scans(self, sample_df):
+        analyzer = QualityAnalyzer(sample_df)
+        metrics = analyzer.analyze()
+        duplicates, _ = analyzer.count_duplicates()
+        geo_rate, geo_avg = analyzer.calculate_geocoding_stats()
+
+        assert metrics.completeness_score == round(analyzer.calculate_completeness(), 3)
+        assert metrics.null_counts == analyzer.calculate_null_counts()
+        assert metrics.duplicates_count == duplicates
+        assert metrics.geocoding_success_rate == round(geo_rate, 2)
+        assert metrics.avg_geocoding_score == round(geo_avg, 3)
+
+    def test_merge_across_workers(self, sample_df):
+        expected = QualityAnalyzer(sample_df).analyze()
+        left = QualityAccumulator().update(sample_df.iloc[:3])
+        right = QualityAccumulator().update(sample_df.iloc[3:])
+        assert left.merge(right).to_metrics() == expected
+
+    def test_null_ids_across_chunks_and_workers(self):
+        df = pd.DataFrame({'code': ['001', None, '002', None, '001', None, '003', float('nan')]})
+        expected = QualityAnalyzer(df).analyze().duplicates_count
+
+        chunked = QualityAccumulator()
+        for start in range(0, len(df), 3):
+            chunked.update(df.iloc[start:start + 3])
+        left = QualityAccumulator().update(df.iloc[:4])
+        right = QualityAccumulator().update(df.iloc[4:])
+
+        assert chunked.duplicates == expected
+        assert left.merge(right).duplicates == expected
+        assert None not in chunked._seen_ids
+
+    def test_approximate_duplicates(self):
+        df = pd.DataFrame({'code': [str(i % 5000) for i in range(20000)]})
+        halves = [QualityAccumulator(approximate=True).update(part) for part in (df.iloc[:10000], df.iloc[10000:])]
+        metrics = halves[0].merge(halves[1]).to_metrics()
+        assert metrics.duplicates_count == pytest.approx(15000, rel=0.01)
+
+        with pytest.raises(ValueError):
+            QualityAccumulator().merge(halves[1])
+
+
+class TestHyperLogLog:
+
+    def test_distinct_estimate(self):
+        sketch = HyperLogLog()
+        sketch.add(pd.Series(range(50000)))
+        sketch.add(pd.Series(range(25000)))
+        assert sketch.count() == pytest.approx(50000, rel=0.03)
@@ -0,0 +1,120 @@
+"""Tests pour le stockage."""
+import json
+import pytest
+import pandas as pd
+from pipeline import storage
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "RAW_DIR", tmp_path)
+    monkeypatch.setattr(storage, "PROCESSED_DIR", tmp_path)
+    return tmp_path
+
+
+class TestChunkWriters:
+    @pytest.mark.parametrize("compression", ["zstd", "gzip", "none"])
+    def test_raw_archive_round_trip(self, data_dirs, compression):
+        records = [{"code": "001", "nested": {"a": [1, 2]}}, {"code": "002", "name": "café"}]
+        with storage.RawArchiveWriter("raw", compression) as writer:
+            writer.write_many(records[:1])
+            assert list(writer.tee(iter(records[1:]))) == records[1:]
+
+        assert writer.count == 2
+        assert list(storage.iter_raw_archive(writer.filepath)) == records
+
+    def test_raw_archive_reads_legacy_json(self, data_dirs):
+        path = data_dirs / "legacy.json"
+        path.write_text(json.dumps([{"code": "001"}], indent=2), encoding="utf-8")
+        assert list(storage.iter_raw_archive(path)) == [{"code": "001"}]
+
+    def test_empty_raw_archive_is_not_created(self, data_dirs):
+        with storage.RawArchiveWriter("raw") as writer:
+            writer.write_many([])
+        assert not writer.filepath.exists()
+
+    def test_parquet_chunk_writer_appends_row_groups(self, data_dirs):
+        import pyarrow.parquet as pq
+
+        with storage.ParquetChunkWriter("products") as writer:
+            writer.write(pd.DataFrame({"code": ["001", "002"], "value": [1.0, None]}))
+            writer.write(pd.DataFrame({"value": [3.0], "code": ["003"]}))
+
+        assert pq.ParquetFile(writer.filepath).num_row_groups == 2
+        df = storage.load_parquet(writer.filepath)
+        assert df["code"].tolist() == ["001", "002", "003"]
+
+
+class TestArrowSchema:
+    def test_schema_is_stable_across_inferred_dtypes(self, data_dirs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        first = pd.DataFrame({"code": [1, 2], "nova_group": [4.0, None], "sugar_category": pd.Categorical(["faible", None])})
+        second = pd.DataFrame({"sugar_category": ["élevé", "x"], "code": ["003", "004"], "nova_group": ["3", "n/a"]})
+        # Run sans sel ni géocodage, puis run avec : mêmes colonnes écrites
+        third = pd.DataFrame({"code": ["005"]})
+        fourth = pd.DataFrame({"code": ["006"], "salt_100g": [0.2], "geocoding_score": [0.9], "latitude": [48.8]})
+        paths = [storage.save_parquet(df, f"run{i}") for i, df in enumerate([first, second, third, fourth])]
+
+        schemas = [pq.read_schema(path) for path in paths]
+        assert all(schema.equals(schemas[0]) for schema in schemas)
+        assert schemas[0].names == storage.PRODUCT_SCHEMA.names
+        assert schemas[0].field("code").type == pa.string()
+        assert schemas[0].field("nova_group").type == pa.int64()
+
+        df = storage.load_parquet(paths[1])
+        assert df["nova_group"].isna().tolist() == [False, True]
+        assert storage.load_parquet(paths[0])["sugar_category"].isna().tolist() == [False, True]
+
+    def test_unknown_columns_are_text(self):
+        schema = storage.arrow_schema(["extra", "energy_100g", "code"])
+        assert schema.names == storage.PRODUCT_SCHEMA.names + ["extra"]
+        assert str(schema.field("extra").type) == "string"
+
+
+class TestPartitionedDataset:
+    def test_projection_and_partition_filters(self, data_dirs, monkeypatch):
+        monkeypatch.setattr(storage, "DATASET_DIR", data_dirs / "dataset")
+        df = pd.DataFrame({
+            "code": ["001", "002"],
+            "brands": ["x", "y"],
+            "nutriscore_grade": ["a", "e"],
+        })
+        storage.save_parquet(df.copy(), "chocolats", partitioned=True, run_date="2026-01-01")
+        storage.save_parquet(df.copy(), "biscuits", partitioned=True, run_date="2026-01-01")
+
+        result = storage.load_dataset(
+            "chocolats",
+            columns=["code"],
+            filters=[("nutriscore_grade", "=", "a")],
+        )
+
+        assert list(result.columns) == ["code"]
+        assert result["code"].tolist() == ["001"]
+
+    def test_new_run_replaces_partition(self, data_dirs, monkeypatch):
+        monkeypatch.setattr(storage, "DATASET_DIR", data_dirs / "dataset")
+        first = pd.DataFrame({"code": ["001", "002"]})
+        second = pd.DataFrame({"code": ["001", "002", "003"]})
+
+        storage.save_parquet(first, "chocolats", partitioned=True, run_date="2026-01-01")
+        with storage.ParquetChunkWriter("chocolats", partitioned=True, run_date="2026-01-01") as writer:
+            writer.write(second.iloc[:2])
+            writer.write(second.iloc[2:])
+
+        result = storage.load_dataset("chocolats", "2026-01-01")
+        assert sorted(result["code"]) == ["001", "002", "003"]
+        assert len(list((data_dirs / "dataset").rglob("*.parquet"))) == 1
+
+    def test_interrupted_run_keeps_previous_snapshot(self, data_dirs, monkeypatch):
+        monkeypatch.setattr(storage, "DATASET_DIR", data_dirs / "dataset")
+        storage.save_parquet(pd.DataFrame({"code": ["001"]}), "chocolats", partitioned=True, run_date="2026-01-01")
+
+        with pytest.raises(RuntimeError):
+            with storage.ParquetChunkWriter("chocolats", partitioned=True, run_date="2026-01-01") as writer:
+                writer.write(pd.DataFrame({"code": ["002"]}))
+                raise RuntimeError("run interrompu")
+
+        assert storage.load_dataset("chocolats")["code"].tolist() == ["001"]
+        assert [p.name.startswith(".") for p in (data_dirs / "dataset").rglob("*")].count(True) == 0
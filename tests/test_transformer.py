@@ -39,3 +39,111 @@ class TestDataTransformer:
             .get_result()
         )
         assert len(transformer.transformations_applied) >= 2
+
+
+class TestLazyDataTransformer:
+
+    @pytest.fixture
+    def products_df(self):
+        return pd.DataFrame({
+            'code': ['001', '002', '001', '003', '004', '005'],
+            'brands': ['  Lindt ', None, 'Lindt', 'MILKA', None, 'Côte d\'Or'],
+            'sugars_100g': [45.0, None, 45.0, 3.0, 20.0, 500.0],
+            'geocoding_score': [0.9, None, 0.9, 0.2, 0.7, None],
+        })
+
+    @staticmethod
+    def chain(transformer):
+        return (
+            transformer
+            .remove_duplicates()
+            .filter_outliers(['sugars_100g'])
+            .handle_missing_values()
+            .normalize_text_columns(['brands'])
+            .add_derived_columns()
+        )
+
+    def test_lazy_matches_eager(self, products_df):
+        eager = self.chain(DataTransformer(products_df))
+        lazy = self.chain(DataTransformer(products_df, lazy=True))
+
+        assert lazy.transformations_applied == []
+        pd.testing.assert_frame_equal(lazy.get_result(), eager.get_result())
+        assert lazy.transformations_applied == eager.transformations_applied
+
+    def test_lazy_does_not_modify_input(self, products_df):
+        expected = products_df.copy()
+        self.chain(DataTransformer(products_df, lazy=True)).get_result()
+        pd.testing.assert_frame_equal(products_df, expected)
+
+    def test_lazy_skips_unselected_columns(self, products_df):
+        transformer = self.chain(DataTransformer(products_df, lazy=True)).select_columns(['code', 'sugar_category'])
+        result = transformer.get_result()
+
+        assert list(result.columns) == ['code', 'sugar_category']
+        assert "Ajout: is_geocoded" not in transformer.get_summary()
+        assert not any(t.startswith('geocoding_score') for t in transformer.transformations_applied)
+
+    def test_custom_step_does_not_copy_produced_frame(self, products_df):
+        seen = []
+        transformer = (
+            DataTransformer(products_df, lazy=True)
+            .remove_duplicates()
+            .apply_custom(lambda df: seen.append(df) or df, "capture")
+        )
+        result = transformer.get_result()
+
+        assert seen[0] is result
+        assert seen[0] is not products_df
+
+    def test_custom_step_on_input_works_on_a_copy(self, products_df):
+        expected = products_df.copy()
+
+        def mutate(df):
+            df['brands'] = 'x'
+            return df
+
+        DataTransformer(products_df, lazy=True).apply_custom(mutate, "mutate").get_result()
+        pd.testing.assert_frame_equal(products_df, expected)
+
+
+
+class TestCompactDtypes:
+
+    @pytest.fixture
+    def wide_df(self):
+        n = 1000
+        return pd.DataFrame({
+            'code': [f'{i:04d}' for i in range(n)],
+            'brands': ['lindt', 'milka', None, 'lindt'] * (n // 4),
+            'nova_group': [4, 3] * (n // 2),
+            'latitude': [48.8566 + i / 1e4 for i in range(n)],
+            'salt_100g': [0.25, 0.5, None, 1.0] * (n // 4),
+        })
+
+    def test_compaction_and_savings(self, wide_df):
+        transformer = DataTransformer(wide_df).compact_dtypes()
+        result = transformer.get_result()
+
+        assert isinstance(result['brands'].dtype, pd.CategoricalDtype)
+        assert result['code'].dtype == wide_df['code'].dtype  # cardinalité trop élevée
+        assert result['nova_group'].dtype == 'int8'
+        assert result['salt_100g'].dtype == 'float32'  # valeurs exactes en float32
+        assert result['latitude'].dtype == 'float64'  # float32 perdrait en précision
+        assert set(transformer.bytes_saved) == {'brands', 'nova_group', 'salt_100g'}
+        assert all(saved > 0 for saved in transformer.bytes_saved.values())
+        pd.testing.assert_frame_equal(result.astype(wide_df.dtypes.to_dict()), wide_df)
+
+    def test_compacted_frame_interoperates(self, wide_df, tmp_path, monkeypatch):
+        from pipeline import storage
+        from pipeline.quality import QualityAnalyzer
+
+        monkeypatch.setattr(storage, "PROCESSED_DIR", tmp_path)
+        compact = DataTransformer(wide_df).compact_dtypes().get_result()
+
+        assert QualityAnalyzer(compact).analyze() == QualityAnalyzer(wide_df).analyze()
+        path = storage.save_parquet(compact, "compact")
+        pd.testing.assert_frame_equal(
+            storage.load_parquet(path),
+            storage.load_parquet(storage.save_parquet(wide_df, "plain")),
+        )
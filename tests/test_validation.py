@@ -0,0 +1,55 @@
+"""Tests pour la validation par lots des produits."""
+import pytest
+import pandas as pd
+from pipeline.models import GeocodingResult, Product
+from pipeline.validation import ProductValidator
+
+
+class TestProductValidator:
+
+    @pytest.fixture
+    def products(self):
+        return [
+            {'code': '001', 'nutriscore_grade': 'A', 'sugars_100g': 12.5, 'nova_group': 4, 'stores': 'Carrefour'},
+            {'code': '002', 'nutriscore_grade': 'z', 'fat_100g': -3.0, 'nova_group': '3'},
+            {'code': None, 'nutriscore_grade': 'b'},
+            {'code': 4, 'nutriscore_grade': None, 'salt_100g': 'n/a', 'nova_group': 2.5},
+        ]
+
+    def test_matches_pydantic_model(self, products):
+        df = ProductValidator().validate(pd.DataFrame(products))
+
+        expected = []
+        for record in products:
+            record = {k: v for k, v in record.items() if v is not None and v != 'n/a'}
+            if 'code' not in record:
+                continue
+            record['code'] = str(record['code'])
+            if record.get('nova_group') == 2.5:
+                del record['nova_group']
+            expected.append(Product(**record).model_dump(exclude={'fetched_at'}))
+
+        assert df['code'].tolist() == [p['code'] for p in expected]
+        for col in ['nutriscore_grade', 'sugars_100g', 'fat_100g', 'salt_100g', 'nova_group']:
+            values = df[col].astype(object).where(df[col].notna(), None).tolist()
+            assert values == [p[col] for p in expected], col
+        assert df['stores'].tolist()[0] == 'Carrefour'
+
+    def test_rejection_counts(self, products):
+        validator = ProductValidator()
+        validator.validate(pd.DataFrame(products[:2]))
+        validator.validate(pd.DataFrame(products[2:]))
+
+        assert validator.rejections == {
+            'nutriscore_grade: invalide': 1,
+            'fat_100g: négatif': 1,
+            'code manquant': 1,
+            'salt_100g: type invalide': 1,
+            'nova_group: type invalide': 1,
+        }
+        assert validator.get_stats()['rejected_values'] == 5
+
+
+def test_geocoding_result_from_trusted():
+    fields = {'original_address': 'Paris', 'latitude': 48.85, 'longitude': 2.35, 'score': 0.9}
+    assert GeocodingResult.from_trusted(**fields) == GeocodingResult(**fields)